@@ -3,16 +3,40 @@ from tkinter import ttk, filedialog, messagebox
 from datetime import datetime
 import asyncio
 import threading
+import importlib
+import sys
+import time
 import psutil
 import platform
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import random
 import os
-
-# Dummy async AI backend functions
-from protocol.models.geminiOllama import run_gemini_async
-from protocol.models.cai import run_cai_async
+from time import perf_counter
+
+# Heavy modules (matplotlib, langchain, PyCharacterAI, cv2) are imported on
+# first use or warmed in the background once the window is up, see warm_up()
+from protocol.models.responseCache import cache as response_cache
+from protocol.models.backends import default_registry, AUTO
+from protocol.models.scheduler import JobScheduler, PRIORITY_GUI, PRIORITY_TERMINAL
+from panel.consoleLog import ConsoleLog
+from panel.systemMetrics import MetricsSampler, make_gpu_reader
+
+# Console refresh rate (~30 updates/s, streamed chunks are coalesced in between) and how many lines it keeps
+CONSOLE_FLUSH_MS = 33
+CONSOLE_MAX_LINES = int(os.getenv("CONSOLE_MAX_LINES", "2000"))
+
+# System graph: sample rate, how far back it goes and how often it is redrawn
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "1.0"))
+METRICS_HISTORY = float(os.getenv("METRICS_HISTORY", "30"))
+GPU_READER = os.getenv("GPU_READER", "auto")
+GRAPH_REFRESH_MS = int(max(METRICS_INTERVAL, 0.25) * 1000)
+GRAPH_MAX_POINTS = 600
+
+# Backend modules to import in the background after the first paint (WARM_BACKENDS=0 to turn off)
+WARM_BACKENDS = os.getenv("WARM_BACKENDS", "1") != "0"
+WARM_MODULES = [
+    "protocol.models.geminiOllama",
+    "protocol.models.cai",
+    "matplotlib.backends.backend_tkagg",
+]
 
 async def dummy_image_gen(model_name: str, prompt: str) -> str:
     await asyncio.sleep(1)
@@ -46,16 +70,31 @@ class AdminPanel(tk.Tk):
         self.loop = asyncio.new_event_loop()
         threading.Thread(target=self.loop.run_forever, daemon=True).start()
 
-        self.cpu_data, self.ram_data, self.gpu_data = [], [], []
+        self.sampler = MetricsSampler(METRICS_INTERVAL, METRICS_HISTORY, make_gpu_reader(GPU_READER))
+        self.sampler.start()
         self.graph_visible = False
+        self.graph_built = False
+        self.graph_background = None
         self.uploaded_file_content = None
         self.modeltube_on = False
+        self.console_log = ConsoleLog(max_lines=CONSOLE_MAX_LINES)
+        # Model backends, their modules load on first use, see protocol/models/backends.py
+        self.backends = default_registry()
+        # Every prompt goes through the scheduler: priorities, per-backend caps and rate limits
+        self.scheduler = JobScheduler(self.loop, on_finish=self.on_job_finished)
 
         self.create_styles()
         self.create_widgets()
 
-        self.after(1000, self.update_system_stats)
+        self.after(CONSOLE_FLUSH_MS, self.flush_console)
+        self.after(GRAPH_REFRESH_MS, self.update_system_stats)
         threading.Thread(target=self.terminal_input_listener, daemon=True).start()
+        if WARM_BACKENDS:
+            self.after_idle(self.warm_up)
+        # Health probes feed the auto routing, they run on the asyncio loop. Only loaded
+        # (or warmed) backends are probed, probing the others would import them
+        warm = WARM_MODULES if WARM_BACKENDS else ()
+        self.after_idle(lambda: asyncio.run_coroutine_threadsafe(self.backends.health_loop(warm=warm), self.loop))
 
     def create_styles(self):
         style = ttk.Style(self)
@@ -97,7 +136,7 @@ class AdminPanel(tk.Tk):
                                            state="readonly", 
                                            width=40,     # approx 40 characters wide
                                            style="Big.TCombobox")  # Use big style
-        self.model_dropdown['values'] = ["Gemini Model", "Character.AI Model"]
+        self.model_dropdown['values'] = self.backends.names() + [AUTO]
         self.model_dropdown.current(0)
         self.model_dropdown.grid(row=1, column=0, padx=(0, 30), sticky="w")
         self.model_dropdown.config(height=10)  # Show 10 items in dropdown list
@@ -158,6 +197,19 @@ class AdminPanel(tk.Tk):
         self.graph_frame.grid(row=5, column=0, sticky="nsew", padx=30, pady=10)
         self.graph_frame.grid_remove()
 
+        self.generation_handlers = {
+            "None": self.handle_none_generation,
+            "Image Generation (Dummy)": self.handle_image_generation,
+            "Audio Generation (Dummy)": self.handle_audio_generation,
+            "Video Generation (Dummy)": self.handle_video_generation,
+            "File Upload (Dummy)": self.handle_file_upload_generation,
+        }
+
+    def build_graph(self):
+        # matplotlib is only imported the first time the graph is shown
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         self.fig, self.ax = plt.subplots(figsize=(14, 4), dpi=100)
         self.ax.set_facecolor("#121212")
         self.ax.tick_params(colors="white")
@@ -165,31 +217,36 @@ class AdminPanel(tk.Tk):
             spine.set_color('white')
         self.ax.set_ylim(0, 100)
         self.ax.set_title("System Usage (%)", color="white", fontsize=18)
-        self.ax.set_xlabel("Time (seconds ago)", color="white", fontsize=14)
+        # Fixed axes so the background can be cached and only the lines redrawn
+        if METRICS_HISTORY >= 3600:
+            self.graph_scale, unit = 60.0, "minutes"
+        else:
+            self.graph_scale, unit = 1.0, "seconds"
+        self.ax.set_xlim(METRICS_HISTORY / self.graph_scale, 0)
+        self.ax.set_xlabel(f"Time ({unit} ago)", color="white", fontsize=14)
         self.ax.set_ylabel("Usage %", color="white", fontsize=14)
 
-        self.cpu_line, = self.ax.plot([], [], color="cyan", linewidth=3, label="CPU")
-        self.ram_line, = self.ax.plot([], [], color="magenta", linewidth=3, label="RAM")
-        self.gpu_line, = self.ax.plot([], [], color="yellow", linewidth=3, label="GPU")
+        self.cpu_line, = self.ax.plot([], [], color="cyan", linewidth=3, label="CPU", animated=True)
+        self.ram_line, = self.ax.plot([], [], color="magenta", linewidth=3, label="RAM", animated=True)
+        self.gpu_line, = self.ax.plot([], [], color="yellow", linewidth=3, label="GPU", animated=True)
 
         self.ax.legend(loc="upper right", facecolor="#121212", labelcolor="white")
 
         self.fig.tight_layout()
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-        self.generation_handlers = {
-            "None": self.handle_none_generation,
-            "Image Generation (Dummy)": self.handle_image_generation,
-            "Audio Generation (Dummy)": self.handle_audio_generation,
-            "Video Generation (Dummy)": self.handle_video_generation,
-            "File Upload (Dummy)": self.handle_file_upload_generation,
-        }
-
-        self.ai_models = {
-            "Gemini Model": run_gemini_async,
-            "Character.AI Model": run_cai_async,
-        }
+        self.canvas.mpl_connect("draw_event", self.on_graph_draw)
+        self.graph_built = True
+
+    def warm_up(self):
+        # Runs once the window is idle: import backends off the Tk thread so the first prompt is fast
+        def load():
+            for name in WARM_MODULES:
+                try:
+                    importlib.import_module(name)
+                except Exception as e:
+                    self.log(f"Background load of {name} failed: {e}")
+        threading.Thread(target=load, daemon=True).start()
 
     def on_gen_type_change(self, event=None):
         if self.gen_type_var.get() == "File Upload (Dummy)":
@@ -225,20 +282,54 @@ class AdminPanel(tk.Tk):
 
         self.log(f"[{model_choice} | {gen_type}] Input: {user_input}")
 
-        handler = self.generation_handlers.get(gen_type, self.handle_none_generation)
-        asyncio.run_coroutine_threadsafe(handler(model_choice, user_input), self.loop)
+        self.submit_prompt(model_choice, gen_type, user_input, PRIORITY_GUI)
         self.input_field.delete(0, tk.END)
 
+    def submit_prompt(self, model_name, gen_type, prompt, priority):
+        handler = self.generation_handlers.get(gen_type, self.handle_none_generation)
+        if gen_type != "None":
+            lane = gen_type
+        elif model_name == AUTO:
+            # Auto jobs queue behind the backend they will most likely be routed to
+            ranked = self.backends.ranked()
+            lane = ranked[0].name if ranked else model_name
+        else:
+            lane = model_name
+        job = self.scheduler.submit(lane, lambda: handler(model_name, prompt), priority, prompt)
+        self.log(f"Job #{job.id} queued on {lane}. (/cancel {job.id} to stop it)")
+
+    def on_job_finished(self, job):
+        # Called on the asyncio loop, log() is thread-safe
+        detail = f" ({job.error})" if job.error else ""
+        self.log(f"Job #{job.id} {job.state}{detail}: waited {job.queue_wait:.2f}s in queue, ran {job.run_time:.2f}s")
+
     async def handle_none_generation(self, model_name, prompt):
-        ai_func = self.ai_models.get(model_name)
-        if not ai_func:
+        route = {}
+        if model_name == AUTO:
+            ai_stream = self.backends.stream_auto(prompt, route)
+        elif self.backends.get(model_name):
+            ai_stream = self.backends.get(model_name).run(prompt)
+            route["backend"] = model_name
+        else:
             self.log("Unknown AI model selected.")
             return
+        # Chunks go into one console entry as they arrive
+        entry = self.console_log.start_entry(datetime.now().strftime("[%H:%M:%S] "))
+        start = perf_counter()
+        first_token = None
         try:
-            response = await ai_func(prompt)
+            async for chunk in ai_stream:
+                if first_token is None:
+                    first_token = perf_counter() - start
+                self.console_log.append(entry, chunk)
         except Exception as e:
-            response = f"AI error: {str(e)}"
-        self.log(response)
+            self.console_log.append(entry, f"AI error: {str(e)}")
+            raise   # so the scheduler records the job as failed
+        finally:
+            self.console_log.end_entry(entry)
+        total = perf_counter() - start
+        first = f"{first_token:.2f}s" if first_token is not None else "n/a"
+        self.log(f"[{route.get('backend', model_name)}] first token {first}, total {total:.2f}s")
 
     async def handle_image_generation(self, model_name, prompt):
         response = await dummy_image_gen(model_name, prompt)
@@ -262,61 +353,96 @@ class AdminPanel(tk.Tk):
     def handle_simple_command(self, command):
         command = command.lower().strip()
         if command == "/clear":
-            self.console.configure(state=tk.NORMAL)
-            self.console.delete("1.0", tk.END)
-            self.console.configure(state=tk.DISABLED)
+            self.console_log.clear()
         elif command == "/help":
-            self.log("Commands available: /clear, /help, /status, /togglegraph, /modeltube")
+            self.log("Commands available: /clear, /help, /status, /togglegraph, /modeltube, /cache, /cache clear, /tools, /backends, /jobs, /cancel <id>")
         elif command == "/status":
             self.show_system_status()
         elif command == "/togglegraph":
             self.toggle_graph()
         elif command == "/modeltube":
             self.toggle_modeltube()
+        elif command == "/cache":
+            self.log(response_cache.summary())
+        elif command == "/cache clear":
+            response_cache.clear()
+            self.log("Response cache cleared.")
+        elif command == "/tools":
+            tool_runner = sys.modules.get("protocol.tools.toolRunner")
+            self.log(tool_runner.timing_summary() if tool_runner else "No tools have run yet.")
+        elif command == "/backends":
+            self.log(self.backends.summary())
+        elif command == "/jobs":
+            self.log(self.scheduler.summary())
+        elif command.startswith("/cancel"):
+            job_id = command[len("/cancel"):].strip().lstrip("#")
+            if not job_id.isdigit():
+                self.log("Usage: /cancel <job id>")
+            elif not self.scheduler.cancel(int(job_id)):
+                self.log(f"No queued or running job #{job_id}.")
         else:
             self.log(f"Unknown command: {command}")
 
     def log(self, message):
+        # Safe from any thread, the Tk thread picks it up in flush_console
         timestamp = datetime.now().strftime("[%H:%M:%S] ")
-        full_msg = f"{timestamp}{message}\n"
-        self.console.configure(state=tk.NORMAL)
-        self.console.insert(tk.END, full_msg)
-        self.console.see(tk.END)
-        self.console.configure(state=tk.DISABLED)
-        print(full_msg, end='')  # Also print to terminal
+        self.console_log.put(f"{timestamp}{message}\n")
 
-    def update_system_stats(self):
-        cpu_percent = psutil.cpu_percent()
-        ram_percent = psutil.virtual_memory().percent
-        gpu_percent = self.get_gpu_usage_percent()
-
-        self.cpu_data.append(cpu_percent)
-        self.ram_data.append(ram_percent)
-        self.gpu_data.append(gpu_percent)
-
-        max_len = 30
-        if len(self.cpu_data) > max_len:
-            self.cpu_data.pop(0)
-            self.ram_data.pop(0)
-            self.gpu_data.pop(0)
-
-        if self.graph_visible:
-            self.cpu_line.set_data(range(len(self.cpu_data)), self.cpu_data)
-            self.ram_line.set_data(range(len(self.ram_data)), self.ram_data)
-            self.gpu_line.set_data(range(len(self.gpu_data)), self.gpu_data)
-            self.ax.set_xlim(0, max_len)
-            self.ax.set_ylim(0, 100)
-            self.canvas.draw_idle()
-
-        self.after(1000, self.update_system_stats)
+    def flush_console(self):
+        # Apply everything queued since the last tick in one batch, then trim and scroll once
+        ops = self.console_log.drain()
+        if ops:
+            self.console.configure(state=tk.NORMAL)
+            for op in ops:
+                kind = op[0]
+                if kind == "clear":
+                    self.console.delete("1.0", tk.END)
+                    for mark in self.console.mark_names():
+                        if mark.startswith("stream"):
+                            self.console.mark_unset(mark)
+                elif kind == "text":
+                    self.console.insert(tk.END, op[1])
+                    print(op[1], end='')  # Also print to terminal
+                elif kind == "start":
+                    # The mark sits before the entry's newline, chunks are inserted there
+                    self.console.insert(tk.END, op[2] + "\n")
+                    self.console.mark_set(f"stream{op[1]}", "end-2c")
+                elif kind == "chunk":
+                    self.console.insert(f"stream{op[1]}", op[2])
+                elif kind == "end":
+                    self.console.mark_unset(f"stream{op[1]}")
+                    print(op[2])
+            excess = int(self.console.index("end-1c").split(".")[0]) - 1 - CONSOLE_MAX_LINES
+            if excess > 0:
+                self.console.delete("1.0", f"{excess + 1}.0")
+            self.console.see(tk.END)
+            self.console.configure(state=tk.DISABLED)
+        # Come back right away if there is still a backlog
+        self.after(1 if self.console_log.pending() else CONSOLE_FLUSH_MS, self.flush_console)
 
-    def get_gpu_usage_percent(self):
-        # Dummy GPU usage for now
-        return random.randint(0, 100)
+    def update_system_stats(self):
+        # Samples come from the sampler thread, here we only redraw the lines
+        if self.graph_visible and self.graph_background is not None:
+            ages, values = self.sampler.series(GRAPH_MAX_POINTS)
+            ages = ages / self.graph_scale
+            for column, line in enumerate((self.cpu_line, self.ram_line, self.gpu_line)):
+                line.set_data(ages, values[:, column])
+            self.canvas.restore_region(self.graph_background)
+            for line in (self.cpu_line, self.ram_line, self.gpu_line):
+                self.ax.draw_artist(line)
+            self.canvas.blit(self.ax.bbox)
+
+        self.after(GRAPH_REFRESH_MS, self.update_system_stats)
+
+    def on_graph_draw(self, event=None):
+        # Full redraws (first show, resize) refresh the cached background
+        self.graph_background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for line in (self.cpu_line, self.ram_line, self.gpu_line):
+            self.ax.draw_artist(line)
 
     def show_system_status(self):
-        cpu = psutil.cpu_percent()
-        ram = psutil.virtual_memory().percent
+        sample = self.sampler.latest()
+        cpu, ram = (round(float(sample[0]), 1), round(float(sample[1]), 1)) if sample is not None else ("?", "?")
         disk = psutil.disk_usage('/').percent
         os_info = platform.system() + " " + platform.release()
         status_message = (f"System Status:\n"
@@ -329,6 +455,8 @@ class AdminPanel(tk.Tk):
     def toggle_graph(self):
         self.graph_visible = not self.graph_visible
         if self.graph_visible:
+            if not self.graph_built:
+                self.build_graph()
             self.graph_frame.grid()
         else:
             self.graph_frame.grid_remove()
@@ -347,17 +475,25 @@ class AdminPanel(tk.Tk):
         while True:
             try:
                 cmd = input()
+            except EOFError:
+                return  # no terminal attached (pythonw, stdin closed)
+            try:
                 if cmd.strip():
                     self.log(f"[Terminal] Executing command: {cmd.strip()}")
                     if cmd.startswith("/"):
                         self.handle_simple_command(cmd)
                     else:
-                        asyncio.run_coroutine_threadsafe(
-                            self.generation_handlers.get(self.gen_type_var.get(), self.handle_none_generation)(
-                                self.model_var.get(), cmd.strip()), self.loop)
+                        self.submit_prompt(self.model_var.get(), self.gen_type_var.get(), cmd.strip(), PRIORITY_TERMINAL)
             except Exception as e:
                 self.log(f"Terminal input listener error: {e}")
 
 def runAdminPanel():
     app = AdminPanel()
+    if os.getenv("STARTUP_PROBE"):
+        # Used by test/benchStartup.py: report time from process start to first paint, then quit
+        def report_first_paint():
+            first_paint = time.time() - psutil.Process().create_time()
+            print(f"FIRST_PAINT {first_paint:.3f}", flush=True)
+            app.destroy()
+        app.after_idle(report_first_paint)
     app.mainloop()
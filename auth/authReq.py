@@ -1,53 +1,25 @@
-import websocket
-import json
-import os
-from api import key
-VTS_WEBSOCKET_URL = "ws://127.0.0.1:8001"
-TOKEN_FILE = "token.json"
+import asyncio
+from vtsClient import VTSClient, VTSError
+from authMsg import current_Stat
 
-PLUGIN_NAME = "FanoPlugin"
-PLUGIN_DEV = "Fano"
 
+async def check_auth_async():
+    # Connecting authenticates (with the cached token, or asks VTS for a new one)
+    async with VTSClient() as vts:
+        print("[WS] Connected and authenticated with VTS.")
+        hotkeys, stats = await asyncio.gather(
+            vts.request("HotkeysInCurrentModelRequest"),
+            vts.send(current_Stat),
+        )
+        print(hotkeys)
+        print(stats)
 
-def check_auth():
 
+def check_auth():
     try:
-        ws = websocket.create_connection(VTS_WEBSOCKET_URL)
-        print("[WS] Connected to VTS.")
-
-        auth_msg = {
-            "apiName": "VTubeStudioPublicAPI",
-            "apiVersion": "1.0",
-            "requestID": "check-auth-1",
-            "messageType": "AuthenticationRequest",
-            "data": {
-                "pluginName": PLUGIN_NAME,
-                "pluginDeveloper": PLUGIN_DEV,
-                "authenticationToken": token
-            }
-        }
-
-        ws.send(json.dumps(auth_msg))
-        response = json.loads(ws.recv())
-
-        chekc = {
-	        "apiName": "VTubeStudioPublicAPI",
-	        "apiVersion": "1.0",
-	        "requestID": "SomeID",
-	        "messageType": "HotkeysInCurrentModelRequest"}
-
-
-        ws.send(json.dumps(chekc))
-        res = json.loads(ws.recv())
-
-        print(res)
-
-        if response.get("data", {}).get("authenticated"):
-            print("[AUTH] Successfully authenticated with VTS.")
-        else:
-            print("[AUTH] Authentication failed.")
-            print(response)
-        ws.close()
+        asyncio.run(check_auth_async())
+    except VTSError as e:
+        print(f"[AUTH] Authentication failed: {e}")
     except Exception as e:
         print(f"[ERROR] {e}")
 
@@ -55,4 +27,3 @@ def check_auth():
 #  Run this
 if __name__ == "__main__":
     check_auth()
-    
@@ -0,0 +1,206 @@
+import json
+import uuid
+import random
+import asyncio
+import websockets
+
+VTS_WEBSOCKET_URL = "ws://127.0.0.1:8001"
+TOKEN_FILE = "token.json"
+
+PLUGIN_NAME = "FanoPlugin"
+PLUGIN_DEV = "Fano"
+
+
+class VTSError(Exception):
+    """VTube Studio answered with an APIError."""
+
+    def __init__(self, data):
+        self.data = data or {}
+        self.error_id = self.data.get("errorID")
+        super().__init__(f"VTS error {self.error_id}: {self.data.get('message', '')}")
+
+
+class VTSClient:
+    """
+    One long-lived connection to the VTube Studio API.
+
+    Authenticates once (the token is cached in token.json, a new one is only
+    requested when VTS rejects it), then lets any number of requests be in
+    flight at once: every request gets a unique requestID and the reader task
+    hands each response to the caller waiting on that ID. If the socket drops
+    it reconnects and re-authenticates in the background, pending requests
+    fail with ConnectionError and new ones wait for the connection.
+    """
+
+    def __init__(self, url=VTS_WEBSOCKET_URL, token_file=TOKEN_FILE, plugin_name=PLUGIN_NAME,
+                 plugin_dev=PLUGIN_DEV, request_timeout=10.0, max_backoff=10.0):
+        self.url = url
+        self.token_file = token_file
+        self.plugin_name = plugin_name
+        self.plugin_dev = plugin_dev
+        self.request_timeout = request_timeout
+        self.max_backoff = max_backoff
+        self.ws = None
+        self.token = self.load_token()
+        self.pending = {}
+        self.connected = asyncio.Event()
+        self.send_lock = asyncio.Lock()
+        self.reader = None
+        self.reconnector = None
+        self.closing = False
+        self.authenticated = False    # set once the first connect succeeded; only then do we auto-reconnect
+        self.reconnects = 0
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # token cache
+
+    def load_token(self):
+        try:
+            with open(self.token_file, "r", encoding="utf-8") as f:
+                return json.load(f).get("authenticationToken")
+        except (OSError, ValueError):
+            return None
+
+    def save_token(self, token):
+        with open(self.token_file, "w", encoding="utf-8") as f:
+            json.dump({"authenticationToken": token}, f)
+
+    # connection
+
+    async def connect(self):
+        """Opens the socket and authenticates, raising if VTS is not reachable or access was denied."""
+        self.closing = False
+        try:
+            await self.open()
+        except Exception:
+            # The caller gets the error; don't keep retrying (and prompting the user in VTS) behind its back
+            self.closing = True
+            raise
+
+    async def open(self):
+        self.ws = await websockets.connect(self.url, max_size=None)
+        self.reader = asyncio.create_task(self.read_loop(self.ws))
+        try:
+            await self.authenticate()
+        except Exception:
+            await self.ws.close()
+            raise
+        self.authenticated = True
+        self.connected.set()
+
+    async def authenticate(self):
+        if self.token:
+            response = await self.raw_request("AuthenticationRequest", self.auth_data(self.token))
+            if response.get("authenticated"):
+                return
+        # No token or VTS revoked it: ask for a new one (the user has to click Allow in VTS)
+        response = await self.raw_request(
+            "AuthenticationTokenRequest",
+            {"pluginName": self.plugin_name, "pluginDeveloper": self.plugin_dev},
+            timeout=max(self.request_timeout, 60),
+        )
+        self.token = response.get("authenticationToken")
+        if not self.token:
+            raise VTSError({"message": "no authentication token in the response"})
+        self.save_token(self.token)
+        response = await self.raw_request("AuthenticationRequest", self.auth_data(self.token))
+        if not response.get("authenticated"):
+            raise VTSError({"message": response.get("reason", "authentication refused")})
+
+    def auth_data(self, token):
+        return {"pluginName": self.plugin_name, "pluginDeveloper": self.plugin_dev, "authenticationToken": token}
+
+    async def read_loop(self, ws):
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                future = self.pending.pop(message.get("requestID"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if ws is self.ws:
+                self.connected.clear()
+                for future in self.pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("VTS connection lost"))
+                self.pending.clear()
+                if self.authenticated and not self.closing and (self.reconnector is None or self.reconnector.done()):
+                    self.reconnector = asyncio.create_task(self.reconnect())
+
+    async def reconnect(self):
+        attempt = 0
+        while not self.closing:
+            delay = min(self.max_backoff, 0.2 * 2 ** attempt) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(delay)
+            try:
+                await self.open()
+                self.reconnects += 1
+                print("[VTS] reconnected")
+                return
+            except Exception as e:
+                attempt += 1
+                print(f"[VTS] reconnect failed ({e}), retrying")
+
+    async def close(self):
+        self.closing = True
+        self.connected.clear()
+        if self.reconnector is not None:
+            self.reconnector.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+        if self.reader is not None:
+            await asyncio.gather(self.reader, return_exceptions=True)
+
+    # requests
+
+    async def raw_request(self, message_type, data=None, timeout=None):
+        request_id = uuid.uuid4().hex
+        message = {
+            "apiName": "VTubeStudioPublicAPI",
+            "apiVersion": "1.0",
+            "requestID": request_id,
+            "messageType": message_type,
+        }
+        if data is not None:
+            message["data"] = data
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            async with self.send_lock:
+                await self.ws.send(json.dumps(message))
+            response = await asyncio.wait_for(future, timeout or self.request_timeout)
+        except websockets.ConnectionClosed:
+            raise ConnectionError("VTS connection lost") from None
+        finally:
+            self.pending.pop(request_id, None)
+            # The reader may have failed the future while the send was still failing
+            if future.done() and not future.cancelled():
+                future.exception()
+        if response.get("messageType") == "APIError":
+            raise VTSError(response.get("data"))
+        return response.get("data", {})
+
+    async def request(self, message_type, data=None, timeout=None):
+        """Sends one request once connected and returns the response's data."""
+        await asyncio.wait_for(self.connected.wait(), timeout or self.request_timeout)
+        return await self.raw_request(message_type, data, timeout)
+
+    async def send(self, template, timeout=None):
+        """Sends a message template such as the ones in authMsg.py, with a fresh requestID."""
+        return await self.request(template["messageType"], template.get("data"), timeout)
+
+    async def inject_parameters(self, values, face_found=True, mode="set"):
+        """Sets tracking parameters, values being {parameter id: value}."""
+        return await self.request("InjectParameterDataRequest", {
+            "faceFound": face_found,
+            "mode": mode,
+            "parameterValues": [{"id": key, "value": float(value)} for key, value in values.items()],
+        })
@@ -0,0 +1,83 @@
+# panel/consoleLog.py
+import queue
+import itertools
+from collections import deque
+
+CLEAR = object()   # queued by clear() so the widget is wiped on the Tk thread
+
+
+class ConsoleLog:
+    """
+    Thread-safe buffer between log() callers and the Tk console widget.
+    Any thread can put() lines or stream into an entry, only the Tk thread
+    drains them, in batches, from an after() callback. lines keeps a capped
+    ring of what is on screen.
+    """
+
+    def __init__(self, max_lines=2000, batch_size=1000):
+        self.queue = queue.SimpleQueue()
+        self.lines = deque(maxlen=max_lines)
+        self.max_lines = max_lines
+        self.batch_size = batch_size
+        self.streams = {}   # open entry id -> chunks so far, drain side only
+        self.ids = itertools.count(1)
+
+    def put(self, text):
+        self.queue.put(text)
+
+    def clear(self):
+        self.queue.put(CLEAR)
+
+    def start_entry(self, prefix):
+        """Opens a console entry that chunks are appended to as they arrive, returns its id."""
+        entry = next(self.ids)
+        self.queue.put(("start", entry, prefix))
+        return entry
+
+    def append(self, entry, text):
+        self.queue.put(("chunk", entry, text))
+
+    def end_entry(self, entry):
+        self.queue.put(("end", entry))
+
+    def drain(self):
+        """
+        Takes up to batch_size queued items off the queue and returns them as
+        widget operations, merging neighbours so the widget is touched as
+        little as possible:
+            ("clear",) ("text", text) ("start", id, prefix) ("chunk", id, text) ("end", id, full_text)
+        """
+        ops = []
+        for _ in range(self.batch_size):
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is CLEAR:
+                ops = [("clear",)]
+                self.lines.clear()
+                self.streams.clear()
+            elif isinstance(item, str):
+                self.lines.extend(item.splitlines())
+                if ops and ops[-1][0] == "text":
+                    ops[-1] = ("text", ops[-1][1] + item)
+                else:
+                    ops.append(("text", item))
+            elif item[0] == "start":
+                self.streams[item[1]] = [item[2]]
+                ops.append(item)
+            elif item[1] in self.streams:
+                if item[0] == "chunk":
+                    self.streams[item[1]].append(item[2])
+                    if ops and ops[-1][:2] == ("chunk", item[1]):
+                        ops[-1] = ("chunk", item[1], ops[-1][2] + item[2])
+                    else:
+                        ops.append(item)
+                else:
+                    text = "".join(self.streams.pop(item[1]))
+                    self.lines.extend(text.splitlines())
+                    ops.append(("end", item[1], text))
+        return ops
+
+    def pending(self):
+        return self.queue.qsize()
@@ -0,0 +1,160 @@
+# panel/systemMetrics.py
+import math
+import shutil
+import subprocess
+import threading
+import time
+import numpy as np
+import psutil
+
+CHANNELS = ("cpu", "ram", "gpu")
+
+
+class RingBuffer:
+    """Preallocated NumPy ring of (timestamp, values) rows, one writer thread and any readers."""
+
+    def __init__(self, capacity, channels=len(CHANNELS)):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, channels), np.nan, dtype=np.float32)
+        self.index = 0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def append(self, timestamp, values):
+        with self.lock:
+            self.times[self.index] = timestamp
+            self.values[self.index] = values
+            self.index = (self.index + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def snapshot(self):
+        """Copies of (times, values), oldest first."""
+        with self.lock:
+            if self.count < self.capacity:
+                return self.times[:self.count].copy(), self.values[:self.count].copy()
+            order = np.r_[self.index:self.capacity, 0:self.index]
+            return self.times[order], self.values[order]
+
+    def latest(self):
+        with self.lock:
+            if not self.count:
+                return None
+            return self.values[self.index - 1].copy()
+
+
+# GPU readers: callables returning utilisation in percent (nan when unknown)
+
+class NullGpuReader:
+    name = "none"
+
+    def __call__(self):
+        return math.nan
+
+
+class FakeGpuReader:
+    """Deterministic wave, for CI and machines without a GPU."""
+    name = "fake"
+
+    def __init__(self, period=60.0):
+        self.period = period
+        self.start = time.monotonic()
+
+    def __call__(self):
+        phase = (time.monotonic() - self.start) / self.period * 2 * math.pi
+        return 50 + 40 * math.sin(phase)
+
+
+class NvmlGpuReader:
+    name = "nvml"
+
+    def __init__(self, device=0):
+        import pynvml
+        pynvml.nvmlInit()
+        self.nvml = pynvml
+        self.handle = pynvml.nvmlDeviceGetHandleByIndex(device)
+
+    def __call__(self):
+        return float(self.nvml.nvmlDeviceGetUtilizationRates(self.handle).gpu)
+
+
+class NvidiaSmiGpuReader:
+    name = "nvidia-smi"
+
+    def __init__(self, device=0):
+        if shutil.which("nvidia-smi") is None:
+            raise RuntimeError("nvidia-smi not found")
+        self.cmd = ["nvidia-smi", f"--id={device}", "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"]
+
+    def __call__(self):
+        out = subprocess.run(self.cmd, capture_output=True, text=True, timeout=2).stdout
+        return float(out.strip().splitlines()[0])
+
+
+GPU_READERS = {
+    "nvml": NvmlGpuReader,
+    "nvidia-smi": NvidiaSmiGpuReader,
+    "fake": FakeGpuReader,
+    "none": NullGpuReader,
+}
+
+
+def make_gpu_reader(name="auto"):
+    """Builds a GPU reader by name, 'auto' tries the real ones and falls back to none."""
+    if name != "auto":
+        return GPU_READERS[name]()
+    for candidate in ("nvml", "nvidia-smi"):
+        try:
+            return GPU_READERS[candidate]()
+        except Exception:
+            continue
+    return NullGpuReader()
+
+
+class MetricsSampler(threading.Thread):
+    """
+    Samples CPU, RAM and GPU usage every `interval` seconds on its own thread
+    into a ring buffer sized for `history_seconds`, so the Tk thread only
+    reads arrays and never waits on psutil or the GPU driver.
+    """
+
+    def __init__(self, interval=1.0, history_seconds=30, gpu_reader=None):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.history_seconds = history_seconds
+        self.gpu_reader = gpu_reader or NullGpuReader()
+        self.buffer = RingBuffer(max(2, int(math.ceil(history_seconds / interval))))
+        self.stopped = threading.Event()
+
+    def run(self):
+        psutil.cpu_percent(None)   # first call only primes the counters
+        next_tick = time.monotonic()
+        while not self.stopped.is_set():
+            try:
+                gpu = self.gpu_reader()
+            except Exception:
+                gpu = math.nan
+            self.buffer.append(time.monotonic(), (psutil.cpu_percent(None), psutil.virtual_memory().percent, gpu))
+            next_tick += self.interval
+            self.stopped.wait(max(0.0, next_tick - time.monotonic()))
+
+    def stop(self):
+        self.stopped.set()
+
+    def latest(self):
+        """Latest (cpu, ram, gpu) sample or None before the first one."""
+        return self.buffer.latest()
+
+    def series(self, max_points=600):
+        """
+        Returns (ages, values) for plotting: ages in seconds before now and a
+        (n, 3) array, averaged down to at most max_points rows so drawing cost
+        stays flat however long the history window is.
+        """
+        times, values = self.buffer.snapshot()
+        if len(times) > max_points:
+            factor = int(math.ceil(len(times) / max_points))
+            rows = len(times) // factor * factor
+            times = times[-rows:].reshape(-1, factor).mean(axis=1)
+            values = values[-rows:].reshape(-1, factor, values.shape[1]).mean(axis=1)
+        return time.monotonic() - times, values
@@ -1,6 +1,21 @@
+import os
+import sys
+import json
+from abc import ABC, abstractmethod
+
 import cv2
+import numpy as np
 import mediapipe as mp
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from protocol.framePipeline import FramePipeline, Processor, MultiProcessor
+from protocol.adaptiveDetection import AdaptiveProcessor
+from protocol.backgroundEffects import BackgroundEffect, refine_mask, MODEL_SIZES
+
+VISION_RECORDS = os.getenv("VISION_RECORDS")   # JSONL path for per-frame records, off when unset
+
 # Initialize mediapipe solutions
 mp_face_detection = mp.solutions.face_detection
 mp_face_mesh = mp.solutions.face_mesh
@@ -11,131 +26,306 @@ mp_objectron = mp.solutions.objectron
 mp_drawing = mp.solutions.drawing_utils
 mp_drawing_styles = mp.solutions.drawing_styles
 
-def run_detection(choice):
-    cap = cv2.VideoCapture(0)
-    
-    if choice == '1':  # Face Detection
-        with mp_face_detection.FaceDetection(min_detection_confidence=0.5) as detector:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = detector.process(frame_rgb)
-                if results.detections:
-                    for detection in results.detections:
-                        mp_drawing.draw_detection(frame, detection)
-                cv2.imshow("Face Detection", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-    
-    elif choice == '2':  # Face Mesh
-        with mp_face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5) as mesh:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = mesh.process(frame_rgb)
-                if results.multi_face_landmarks:
-                    for face_landmarks in results.multi_face_landmarks:
-                        mp_drawing.draw_landmarks(
-                            frame,
-                            face_landmarks,
-                            mp_face_mesh.FACEMESH_TESSELATION,
-                            mp_drawing_styles.get_default_face_mesh_tesselation_style(),
-                            mp_drawing_styles.get_default_face_mesh_contours_style()
-                        )
-                cv2.imshow("Face Mesh", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-
-    elif choice == '3':  # Hand Tracking
-        with mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5) as hands:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = hands.process(frame_rgb)
-                if results.multi_hand_landmarks:
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        mp_drawing.draw_landmarks(
-                            frame,
-                            hand_landmarks,
-                            mp_hands.HAND_CONNECTIONS,
-                            mp_drawing_styles.get_default_hand_landmarks_style(),
-                            mp_drawing_styles.get_default_hand_connections_style()
-                        )
-                cv2.imshow("Hand Tracking", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-
-    elif choice == '4':  # Pose Estimation
-        with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = pose.process(frame_rgb)
-                if results.pose_landmarks:
-                    mp_drawing.draw_landmarks(
-                        frame,
-                        results.pose_landmarks,
-                        mp_pose.POSE_CONNECTIONS,
-                        mp_drawing_styles.get_default_pose_landmarks_style()
-                    )
-                cv2.imshow("Pose Estimation", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-
-    elif choice == '5':  # Selfie Segmentation
-        with mp_selfie_segmentation.SelfieSegmentation(model_selection=1) as segmenter:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = segmenter.process(frame_rgb)
-
-                condition = results.segmentation_mask > 0.1
-                bg_image = cv2.GaussianBlur(frame, (55, 55), 0)
-                output_frame = cv2.where(condition[..., None], frame, bg_image)
-
-                cv2.imshow("Selfie Segmentation (Background Blur)", output_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-
-    elif choice == '6':  # Objectron (3D Object Detection) - Box detection
-        with mp_objectron.Objectron(static_image_mode=False,
-                                   max_num_objects=5,
-                                   min_detection_confidence=0.5,
-                                   min_tracking_confidence=0.5,
-                                   model_name='Cup') as objectron:
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
-                    break
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = objectron.process(frame_rgb)
-                if results.detected_objects:
-                    for detected_object in results.detected_objects:
-                        mp_drawing.draw_landmarks(
-                            frame,
-                            detected_object.landmarks_2d,
-                            mp_objectron.BOX_CONNECTIONS)
-                        mp_drawing.draw_axis(frame, detected_object.rotation,
-                                             detected_object.translation)
-                cv2.imshow("Objectron - Cup Detection", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
 
-    else:
+# Each mode is a Processor: the pipeline captures, converts to RGB once and
+# calls process() on its inference thread, then draw() on the display side.
+
+def landmark_list(landmarks, fields=("x", "y", "z")):
+    return [[round(getattr(p, f), 5) for f in fields] for p in landmarks.landmark]
+
+
+# For adaptive mode: landmark lists <-> one (N, 2) array of normalized points
+
+def landmark_points(lists):
+    if not lists:
+        return None
+    return np.array([(p.x, p.y) for landmarks in lists for p in landmarks.landmark], np.float32)
+
+
+def moved_landmarks(lists, points):
+    out, i = [], 0
+    for landmarks in lists:
+        copy = type(landmarks)()
+        copy.CopyFrom(landmarks)
+        for p in copy.landmark:
+            p.x, p.y = float(points[i, 0]), float(points[i, 1])
+            i += 1
+        out.append(copy)
+    return out
+
+
+class MediaPipeProcessor(Processor, ABC):
+    """A mediapipe solution created in open(), so it lives on the inference thread."""
+    model = None
+
+    @abstractmethod
+    def make(self):
+        """The mediapipe solution object."""
+
+    def open(self):
+        self.model = self.make()
+
+    def process(self, rgb):
+        return self.model.process(rgb)
+
+    def reset(self):
+        # Video-mode solutions track between frames; a fresh graph starts clean
+        self.close()
+        self.open()
+
+    def close(self):
+        # Also called after a failed open()
+        if self.model is not None:
+            self.model.close()
+            self.model = None
+
+
+class FaceDetectionProcessor(MediaPipeProcessor):
+    name = "Face Detection"
+    key = "face_detection"
+
+    def make(self):
+        return mp_face_detection.FaceDetection(min_detection_confidence=0.5)
+
+    def to_record(self, results):
+        faces = []
+        for detection in results.detections or []:
+            box = detection.location_data.relative_bounding_box
+            faces.append({"box": [round(box.xmin, 5), round(box.ymin, 5), round(box.width, 5), round(box.height, 5)],
+                          "score": round(detection.score[0], 4)})
+        return faces
+
+    def points(self, results):
+        if not results.detections:
+            return None
+        return np.array([(k.x, k.y) for d in results.detections for k in d.location_data.relative_keypoints],
+                        np.float32)
+
+    def moved(self, results, points):
+        detections, i = [], 0
+        for detection in results.detections:
+            copy = type(detection)()
+            copy.CopyFrom(detection)
+            keypoints = copy.location_data.relative_keypoints
+            old = np.array([(k.x, k.y) for k in keypoints], np.float32)
+            new = points[i:i + len(keypoints)]
+            for k, (x, y) in zip(keypoints, new):
+                k.x, k.y = float(x), float(y)
+            dx, dy = np.mean(new - old, axis=0)
+            box = copy.location_data.relative_bounding_box
+            box.xmin += float(dx)
+            box.ymin += float(dy)
+            i += len(keypoints)
+            detections.append(copy)
+        return results._replace(detections=detections)
+
+    def draw(self, frame, results):
+        if results.detections:
+            for detection in results.detections:
+                mp_drawing.draw_detection(frame, detection)
+        return frame
+
+
+class FaceMeshProcessor(MediaPipeProcessor):
+    name = "Face Mesh"
+    key = "face_mesh"
+
+    def make(self):
+        return mp_face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+    def to_record(self, results):
+        return [landmark_list(face) for face in results.multi_face_landmarks or []]
+
+    def points(self, results):
+        return landmark_points(results.multi_face_landmarks)
+
+    def moved(self, results, points):
+        return results._replace(multi_face_landmarks=moved_landmarks(results.multi_face_landmarks, points))
+
+    def draw(self, frame, results):
+        if results.multi_face_landmarks:
+            for face_landmarks in results.multi_face_landmarks:
+                mp_drawing.draw_landmarks(
+                    frame,
+                    face_landmarks,
+                    mp_face_mesh.FACEMESH_TESSELATION,
+                    mp_drawing_styles.get_default_face_mesh_tesselation_style(),
+                    mp_drawing_styles.get_default_face_mesh_contours_style()
+                )
+        return frame
+
+
+class HandsProcessor(MediaPipeProcessor):
+    name = "Hand Tracking"
+    key = "hands"
+
+    def make(self):
+        return mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+    def to_record(self, results):
+        hands = results.multi_hand_landmarks or []
+        sides = results.multi_handedness or []
+        return [{"side": side.classification[0].label, "landmarks": landmark_list(hand)}
+                for hand, side in zip(hands, sides)]
+
+    def points(self, results):
+        return landmark_points(results.multi_hand_landmarks)
+
+    def moved(self, results, points):
+        return results._replace(multi_hand_landmarks=moved_landmarks(results.multi_hand_landmarks, points))
+
+    def draw(self, frame, results):
+        if results.multi_hand_landmarks:
+            for hand_landmarks in results.multi_hand_landmarks:
+                mp_drawing.draw_landmarks(
+                    frame,
+                    hand_landmarks,
+                    mp_hands.HAND_CONNECTIONS,
+                    mp_drawing_styles.get_default_hand_landmarks_style(),
+                    mp_drawing_styles.get_default_hand_connections_style()
+                )
+        return frame
+
+
+class PoseProcessor(MediaPipeProcessor):
+    name = "Pose Estimation"
+    key = "pose"
+
+    def make(self):
+        return mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+    def to_record(self, results):
+        if not results.pose_landmarks:
+            return None
+        return landmark_list(results.pose_landmarks, ("x", "y", "z", "visibility"))
+
+    def points(self, results):
+        return landmark_points([results.pose_landmarks] if results.pose_landmarks else None)
+
+    def moved(self, results, points):
+        return results._replace(pose_landmarks=moved_landmarks([results.pose_landmarks], points)[0])
+
+    def draw(self, frame, results):
+        if results.pose_landmarks:
+            mp_drawing.draw_landmarks(
+                frame,
+                results.pose_landmarks,
+                mp_pose.POSE_CONNECTIONS,
+                mp_drawing_styles.get_default_pose_landmarks_style()
+            )
+        return frame
+
+
+class SelfieSegmentationProcessor(MediaPipeProcessor):
+    name = "Selfie Segmentation (Background Blur)"
+    key = "segmentation"
+    model_selection = 1
+
+    def __init__(self, effect=None):
+        self.effect = effect or BackgroundEffect()
+
+    def make(self):
+        return mp_selfie_segmentation.SelfieSegmentation(model_selection=self.model_selection)
+
+    def process(self, rgb):
+        # Feed the model its own input size, the mask comes back at that size too
+        small = cv2.resize(rgb, MODEL_SIZES[self.model_selection], interpolation=cv2.INTER_AREA)
+        return refine_mask(self.model.process(small).segmentation_mask)
+
+    def to_record(self, alpha):
+        # The mask itself is too big for a per-frame record, keep how much of the frame is person
+        return {"person": round(float(np.mean(alpha >= 0.5)), 4)}
+
+    def draw(self, frame, alpha):
+        return self.effect.apply(frame, alpha)
+
+
+class ObjectronProcessor(MediaPipeProcessor):
+    name = "Objectron - Cup Detection"
+    key = "objectron"
+
+    def make(self):
+        return mp_objectron.Objectron(static_image_mode=False,
+                                      max_num_objects=5,
+                                      min_detection_confidence=0.5,
+                                      min_tracking_confidence=0.5,
+                                      model_name='Cup')
+
+    def to_record(self, results):
+        return [{"box": landmark_list(obj.landmarks_2d, ("x", "y")),
+                 "translation": np.round(obj.translation, 5).tolist()}
+                for obj in results.detected_objects or []]
+
+    def draw(self, frame, results):
+        if results.detected_objects:
+            for detected_object in results.detected_objects:
+                mp_drawing.draw_landmarks(
+                    frame,
+                    detected_object.landmarks_2d,
+                    mp_objectron.BOX_CONNECTIONS)
+                mp_drawing.draw_axis(frame, detected_object.rotation,
+                                     detected_object.translation)
+        return frame
+
+
+PROCESSORS = {
+    '1': FaceDetectionProcessor,
+    '2': FaceMeshProcessor,
+    '3': HandsProcessor,
+    '4': PoseProcessor,
+    '5': SelfieSegmentationProcessor,
+    '6': ObjectronProcessor,
+}
+COMBINED = '8'
+COMBINED_MODES = '2+3+4'   # face mesh, hands and pose on one capture
+
+
+def make_processor(choice):
+    """
+    One mode, or several joined with '+' (e.g. '2+3') run together on each
+    frame. A trailing 'a' (e.g. '2a', '8a') detects only every DETECT_EVERY
+    frames and tracks the landmarks in between.
+    """
+    adaptive = choice.endswith('a')
+    choice = choice.rstrip('a')
+    if choice == COMBINED:
+        choice = COMBINED_MODES
+    modes = choice.split('+')
+    if not all(mode in PROCESSORS for mode in modes):
+        return None
+    processors = [PROCESSORS[mode]() for mode in modes]
+    if adaptive:
+        processors = [AdaptiveProcessor(p) for p in processors]
+    if len(processors) == 1:
+        return processors[0]
+    return MultiProcessor(processors)
+
+
+def run_detection(choice, source=0):
+    if choice == '7':  # Face tracking -> VTube Studio, has its own capture and send loop
+        import asyncio
+        from protocol.faceTracking import stream_to_vts
+        asyncio.run(stream_to_vts(source))
+        return
+
+    processor = make_processor(choice)
+    if processor is None:
         print("Invalid choice")
+        return
 
-    cap.release()
-    cv2.destroyAllWindows()
+    if VISION_RECORDS:
+        with open(VISION_RECORDS, "a", encoding="utf-8") as out:
+            def write(record):
+                out.write(json.dumps(record) + "\n")
+            pipeline = FramePipeline(processor, source, on_record=write)
+            pipeline.run()
+    else:
+        pipeline = FramePipeline(processor, source)
+        pipeline.run()
+    print(pipeline.summary())
+    for p in getattr(processor, "processors", [processor]):
+        if isinstance(p, AdaptiveProcessor):
+            print(f"[{p.name}] {p.stats()}")
 
 def main():
     print("""
@@ -146,6 +336,9 @@ def main():
     4 - Pose Estimation
     5 - Selfie Segmentation (Background Blur)
     6 - Objectron (3D Object Detection - Cup)
+    7 - Face Tracking to VTube Studio
+    8 - Face Mesh + Hands + Pose in one pass (or combine any, e.g. 1+3)
+    add 'a' for adaptive: detect every few frames, track in between (e.g. 2a)
     q - Quit
     """)
 
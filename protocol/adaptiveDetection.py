@@ -0,0 +1,161 @@
+# protocol/adaptiveDetection.py
+# Runs a mode's detector only every N frames and moves its landmarks along
+# with pyramidal Lucas-Kanade optical flow in between. Tracking is checked
+# forwards and backwards; when too few points survive, or the whole picture
+# changes at once (a cut, the camera bumped), detection runs again right away.
+import os
+import sys
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from protocol.framePipeline import Processor
+
+DETECT_EVERY = int(os.getenv("DETECT_EVERY", "5"))            # frames per detection when tracking holds
+TRACK_MIN_QUALITY = float(os.getenv("TRACK_MIN_QUALITY", "0.6"))   # share of points that must track
+MOTION_SPIKE = float(os.getenv("MOTION_SPIKE", "12"))          # mean gray level change that forces detection
+FB_MAX_PX = 1.5           # forward-backward error allowed per point, in tracking pixels
+TRACK_WIDTH = 640         # frames are tracked at most this wide
+MOTION_SIZE = (64, 48)    # thumbnail for the motion check
+
+LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class AdaptiveProcessor(Processor):
+    """
+    Wraps a processor whose results have trackable points, i.e. one that
+    implements points(results) and moved(results, points). Results keep the
+    wrapped processor's type, so its draw() and to_record() work unchanged.
+    Processors without points (see Processor.points) detect every frame.
+    """
+
+    def __init__(self, processor, every=DETECT_EVERY, min_quality=TRACK_MIN_QUALITY, motion_spike=MOTION_SPIKE):
+        self.processor = processor
+        self.name = f"{processor.name} (adaptive, 1/{every})"
+        self.key = processor.key
+        self.trackable = type(processor).points is not Processor.points
+        self.every = every
+        self.min_quality = min_quality
+        self.motion_spike = motion_spike
+        self.forget()
+        self.detections = 0
+        self.tracked = 0
+        self.idle = 0
+        self.reasons = {"interval": 0, "quality": 0, "motion": 0, "lost": 0}
+
+    def forget(self):
+        """Drops what is being tracked (not the stats), so the next frame is detected from scratch."""
+        self.results = None
+        self.track_points = None  # tracked points in tracking pixels, (N, 1, 2) float32
+        self.gray = None
+        self.thumb = None         # thumbnail at the last detection, for the motion check
+        self.frame_shape = None   # tracking frame size at the last detection
+        self.since_detect = 0
+
+    def reset(self):
+        self.forget()
+        self.processor.reset()
+
+    def open(self):
+        self.processor.open()
+
+    def close(self):
+        self.processor.close()
+
+    def draw(self, frame, results):
+        return self.processor.draw(frame, results)
+
+    def to_record(self, results):
+        return self.processor.to_record(results)
+
+    def points(self, results):
+        return self.processor.points(results)
+
+    def moved(self, results, points):
+        return self.processor.moved(results, points)
+
+    def process(self, rgb):
+        if not self.trackable:
+            self.detections += 1
+            return self.processor.process(rgb)
+        scale = min(1.0, TRACK_WIDTH / rgb.shape[1])
+        small = cv2.resize(rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else rgb
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        thumb = cv2.resize(gray, MOTION_SIZE, interpolation=cv2.INTER_AREA)
+
+        reason = self.needs_detection(gray, thumb)
+        if reason == "idle":
+            # Nothing was found last time and the picture hasn't changed, so nothing would be now
+            self.idle += 1
+            self.since_detect += 1
+            return self.results
+        if reason is None:
+            tracked = self.track(gray)
+            if tracked is None:
+                reason = "quality"
+            else:
+                self.tracked += 1
+                self.since_detect += 1
+                self.gray = gray
+                size = np.array([gray.shape[1], gray.shape[0]], np.float32)
+                self.results = self.processor.moved(self.results, tracked.reshape(-1, 2) / size)
+                return self.results
+
+        self.reasons[reason] += 1
+        self.detect(rgb, gray, thumb)
+        return self.results
+
+    def needs_detection(self, gray, thumb):
+        if self.frame_shape is not None and self.frame_shape != gray.shape:
+            # Another video or camera mode: nothing tracked so far applies to it
+            self.forget()
+            return "lost"
+        if self.gray is None or self.track_points is None:
+            # Nothing to track: still only detect every N frames unless the picture changes
+            if self.thumb is not None and self.since_detect + 1 < self.every and not self.moved_a_lot(thumb):
+                return "idle"
+            return "lost"
+        if self.since_detect + 1 >= self.every:
+            return "interval"
+        if self.moved_a_lot(thumb):
+            return "motion"
+        return None
+
+    def moved_a_lot(self, thumb):
+        return float(np.mean(cv2.absdiff(thumb, self.thumb))) > self.motion_spike
+
+    def track(self, gray):
+        """New point positions, or None when tracking isn't trustworthy."""
+        nxt, status, _ = cv2.calcOpticalFlowPyrLK(self.gray, gray, self.track_points, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.gray, nxt, None, **LK_PARAMS)
+        error = np.linalg.norm((back - self.track_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < FB_MAX_PX)
+        if good.mean() < self.min_quality:
+            return None
+        # Points that lost track move with the median of the ones that didn't
+        shift = np.median((nxt - self.track_points)[good], axis=0)
+        self.track_points = np.where(good[:, None, None], nxt, self.track_points + shift).astype(np.float32)
+        return self.track_points
+
+    def detect(self, rgb, gray, thumb):
+        self.results = self.processor.process(rgb)
+        self.detections += 1
+        self.since_detect = 0
+        self.thumb = thumb
+        self.frame_shape = gray.shape
+        points = self.processor.points(self.results)
+        if points is None or len(points) == 0:
+            self.track_points = self.gray = None
+            return
+        size = np.array([gray.shape[1], gray.shape[0]], np.float32)
+        self.track_points = (np.asarray(points, np.float32)[:, :2] * size).reshape(-1, 1, 2)
+        self.gray = gray
+
+    def stats(self):
+        frames = self.detections + self.tracked + self.idle
+        return {"frames": frames, "detections": self.detections, "tracked": self.tracked, "idle": self.idle,
+                "detect_share": self.detections / max(frames, 1), **self.reasons}
@@ -0,0 +1,330 @@
+# protocol/audioCapture.py
+# One audio input for the whole app. The source pushes chunks from its own
+# callback thread into a ring buffer; any number of async consumers (VAD,
+# STT, level meters) read from it at their own pace. The writer never takes a
+# lock or waits on a reader: a reader that falls a whole buffer behind just
+# skips ahead and counts the samples it lost.
+import os
+import wave
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from time import perf_counter, sleep
+
+import numpy as np
+
+RATE = 16000
+CHUNK = 512
+BUFFER_SECONDS = float(os.getenv("AUDIO_BUFFER_SECONDS", "10"))
+AUDIO_SOURCE = os.getenv("AUDIO_SOURCE", "microphone")   # microphone, synthetic, or a WAV file path
+
+
+class AudioRing:
+    """
+    Single-writer ring of float32 samples. `written` only ever grows and is
+    published after the samples are in place, so readers need no lock: they
+    copy what is between their position and `written`, then drop whatever
+    the writer lapped while they were copying.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.written = 0
+
+    def write(self, chunk):
+        n = len(chunk)
+        if n > self.capacity:
+            chunk, n = chunk[-self.capacity:], self.capacity
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = chunk[:first]
+        self.data[:n - first] = chunk[first:]
+        self.written += n
+
+    def read(self, position, limit=None):
+        """(samples, new position, samples lost) for everything after position."""
+        written = self.written
+        lost = max(0, written - position - self.capacity)
+        position += lost
+        end = written if limit is None else min(written, position + limit)
+        n = end - position
+        start = position % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.concatenate([self.data[start:start + first], self.data[:n - first]])
+        # Anything the writer overwrote while we copied is garbage, drop it
+        lapped = self.written - self.capacity - position
+        if lapped > 0:
+            out = out[lapped:]
+            lost += lapped
+        return out, end, lost
+
+    def last(self, n):
+        """The most recent n samples (fewer right after start)."""
+        return self.read(max(0, self.written - n))[0]
+
+
+# Sources: start(callback, done) calls callback(float32 chunk) from their own
+# thread and done() when they run out; stop() ends them.
+
+class MicrophoneSource:
+    name = "microphone"
+
+    def __init__(self, rate=RATE, chunk=CHUNK, device=None):
+        self.rate = rate
+        self.chunk = chunk
+        self.device = device
+        self.pa = None
+        self.stream = None
+        self.errors = 0
+
+    def start(self, callback, done):
+        import pyaudio
+
+        def on_audio(in_data, frame_count, time_info, status):
+            # An exception here would abort the stream for every consumer in the process
+            try:
+                callback(np.frombuffer(in_data, dtype=np.int16).astype(np.float32) / 32768)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"[Audio] capture callback failed, carrying on: {e!r}")
+            return (None, pyaudio.paContinue)
+
+        self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(format=pyaudio.paInt16, channels=1, rate=self.rate, input=True,
+                                   frames_per_buffer=self.chunk, input_device_index=self.device,
+                                   stream_callback=on_audio)
+        self.stream.start_stream()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.pa.terminate()
+            self.stream = None
+
+
+class ThreadedSource(ABC):
+    """Base for sources that generate audio themselves, paced like a real device (speed x real time)."""
+    name = "threaded"
+
+    def __init__(self, rate=RATE, chunk=CHUNK, speed=1.0):
+        self.rate = rate
+        self.chunk = chunk
+        self.speed = speed
+        self.running = False
+        self.thread = None
+
+    @abstractmethod
+    def read(self, n):
+        """Next n samples, or fewer / None at the end."""
+
+    def start(self, callback, done):
+        self.running = True
+
+        def run():
+            start = perf_counter()
+            sent = 0
+            while self.running:
+                chunk = self.read(self.chunk)
+                if chunk is None or len(chunk) == 0:
+                    break
+                if self.speed:
+                    delay = start + (sent + len(chunk)) / self.rate / self.speed - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
+                callback(chunk)
+                sent += len(chunk)
+            done()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+
+class FileSource(ThreadedSource):
+    """A WAV file (mono 16-bit at the capture rate), optionally looped."""
+    name = "file"
+
+    def __init__(self, path, loop=False, **kwargs):
+        super().__init__(**kwargs)
+        with wave.open(path, "rb") as wf:
+            if wf.getframerate() != self.rate or wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit audio at {self.rate} Hz")
+            audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            if wf.getnchannels() > 1:
+                audio = audio.reshape(-1, wf.getnchannels()).mean(axis=1)
+        self.audio = audio.astype(np.float32) / 32768
+        self.loop = loop
+        self.position = 0
+
+    def read(self, n):
+        if self.position >= len(self.audio):
+            if not self.loop:
+                return None
+            self.position = 0
+        chunk = self.audio[self.position:self.position + n]
+        self.position += n
+        return chunk
+
+
+class SyntheticSource(ThreadedSource):
+    """Endless tone bursts over low noise: `on` seconds of 'speech', `off` seconds of quiet."""
+    name = "synthetic"
+
+    def __init__(self, on=1.5, off=1.0, level=0.2, noise=0.002, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.on, self.off = on, off
+        self.level, self.noise = level, noise
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+
+    def read(self, n):
+        t = (self.position + np.arange(n)) / self.rate
+        self.position += n
+        loud = (t % (self.on + self.off)) < self.on
+        tone = np.sin(2 * np.pi * 160 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+        return (self.level * loud * tone + self.noise * self.rng.standard_normal(n)).astype(np.float32)
+
+
+def make_source(name=AUDIO_SOURCE):
+    if name == "microphone":
+        return MicrophoneSource()
+    if name == "synthetic":
+        return SyntheticSource()
+    return FileSource(name)
+
+
+class Subscription:
+    """Async iterator over new audio for one consumer, see AudioCapture.subscribe()."""
+
+    def __init__(self, capture, max_seconds=None, from_start=False):
+        self.capture = capture
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+        self.wake_pending = False
+        self.position = 0 if from_start else capture.ring.written
+        self.limit = None if max_seconds is None else self.position + int(max_seconds * capture.rate)
+        self.lost = 0
+
+    def notify(self):
+        # Called on the audio thread: at most one wake-up queued per consumer
+        if not self.wake_pending:
+            self.wake_pending = True
+            try:
+                self.loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                # Its loop has closed (asyncio.run() per utterance) before it unsubscribed
+                self.close()
+
+    def _wake(self):
+        self.wake_pending = False
+        self.event.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            if self.limit is not None and self.position >= self.limit:
+                break
+            if self.capture.ring.written > self.position:
+                remaining = None if self.limit is None else self.limit - self.position
+                chunk, self.position, lost = self.capture.ring.read(self.position, remaining)
+                self.lost += lost
+                if len(chunk):
+                    return chunk
+            if self.capture.finished:
+                break
+            self.event.clear()
+            # Re-check after clearing, the writer may have run in between
+            if self.capture.ring.written > self.position or self.capture.finished:
+                continue
+            await self.event.wait()
+        self.close()
+        raise StopAsyncIteration
+
+    def close(self):
+        self.capture.unsubscribe(self)
+
+    async def aclose(self):
+        self.close()
+
+
+class AudioCapture:
+    """
+    Keeps one source running and fans its audio out to subscribers.
+    subscribe() can be called from any event loop; the stream stays open
+    between utterances so there is no device start-up cost per utterance.
+    """
+
+    def __init__(self, source=None, buffer_seconds=BUFFER_SECONDS):
+        self.source = source or make_source()
+        self.rate = self.source.rate
+        self.ring = AudioRing(int(buffer_seconds * self.rate))
+        self.subscribers = ()     # replaced, never mutated, so the audio thread can iterate it safely
+        self.lock = threading.Lock()
+        self.running = False
+        self.finished = False
+        self.callbacks = 0
+        self.callback_time = 0.0
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.finished = False
+            self.source.start(self.on_audio, self.on_done)
+        return self
+
+    def stop(self):
+        self.running = False
+        self.source.stop()
+        self.on_done()
+
+    def on_audio(self, chunk):
+        start = perf_counter()
+        self.ring.write(chunk)
+        for sub in self.subscribers:
+            sub.notify()
+        self.callbacks += 1
+        self.callback_time += perf_counter() - start
+
+    def on_done(self):
+        self.finished = True
+        for sub in self.subscribers:
+            sub.notify()
+
+    def subscribe(self, max_seconds=None, from_start=False):
+        """New audio from now on (or everything still buffered) as an async iterator of float32 chunks."""
+        sub = Subscription(self, max_seconds, from_start)
+        with self.lock:
+            self.subscribers = self.subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not sub)
+
+    def level(self, seconds=0.1):
+        """RMS level of the most recent audio in dBFS, for meters."""
+        recent = self.ring.last(int(seconds * self.rate))
+        if len(recent) == 0:
+            return -120.0
+        return float(10 * np.log10(np.mean(np.square(recent, dtype=np.float64)) + 1e-12))
+
+
+capture = None
+capture_lock = threading.Lock()
+
+def get_capture():
+    """The shared capture for AUDIO_SOURCE, started on first use."""
+    global capture
+    with capture_lock:
+        if capture is None:
+            capture = AudioCapture().start()
+        return capture
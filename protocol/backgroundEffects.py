@@ -0,0 +1,99 @@
+# protocol/backgroundEffects.py
+# Background effects for selfie segmentation: blur, a solid color or a
+# replacement image. The model sees a frame scaled down to its own input
+# size and the mask is cleaned up at that size; the blur runs at a fraction
+# of the frame size and is scaled back up; the blend only touches the box
+# around the person. Replacement backgrounds are resized once and cached.
+import os
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+BG_EFFECT = os.getenv("BG_EFFECT", "blur")           # blur, color, image
+BG_IMAGE = os.getenv("BG_IMAGE", "")
+BG_COLOR = tuple(int(c) for c in os.getenv("BG_COLOR", "0,177,64").split(","))   # BGR
+BLUR_SCALE = float(os.getenv("BG_BLUR_SCALE", "0.25"))
+BLUR_SIZE = 55            # kernel size at full resolution
+MASK_LOW, MASK_HIGH = 0.1, 0.5    # model confidence ramped to 0..1 alpha between these
+MODEL_SIZES = {0: (256, 256), 1: (256, 144)}    # selfie segmentation input, per model_selection
+
+
+def refine_mask(mask, low=MASK_LOW, high=MASK_HIGH):
+    """Model confidence (at model resolution) -> float32 alpha with a soft edge."""
+    alpha = np.clip((mask - low) / (high - low), 0.0, 1.0).astype(np.float32)
+    return cv2.GaussianBlur(alpha, (3, 3), 0)
+
+
+def blur_background(frame, scale=BLUR_SCALE, size=BLUR_SIZE):
+    """The same look as a size x size Gaussian at full resolution, blurred at `scale` of the size."""
+    height, width = frame.shape[:2]
+    small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    kernel = max(3, int(size * scale) | 1)
+    small = cv2.GaussianBlur(small, (kernel, kernel), 0)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+@lru_cache(maxsize=8)
+def replacement_background(source, width, height):
+    """A color (BGR tuple) or image path filled to width x height, computed once per size."""
+    if isinstance(source, tuple):
+        image = np.empty((height, width, 3), np.uint8)
+        image[:] = source
+    else:
+        picture = cv2.imread(source)
+        if picture is None:
+            raise ValueError(f"Can't read background image {source!r}")
+        # Cover the frame and crop the overflow, like a desktop wallpaper
+        scale = max(width / picture.shape[1], height / picture.shape[0])
+        picture = cv2.resize(picture, (max(width, round(picture.shape[1] * scale)),
+                                       max(height, round(picture.shape[0] * scale))),
+                             interpolation=cv2.INTER_AREA)
+        top, left = (picture.shape[0] - height) // 2, (picture.shape[1] - width) // 2
+        image = np.ascontiguousarray(picture[top:top + height, left:left + width])
+    image.flags.writeable = False
+    return image
+
+
+def person_box(alpha, width, height, margin=1):
+    """(y0, y1, x0, x1) in frame pixels around everything alpha > 0, or None."""
+    rows = np.flatnonzero(alpha.max(axis=1) > 0)
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(alpha.max(axis=0) > 0)
+    mh, mw = alpha.shape
+    return (max(0, (rows[0] - margin) * height // mh), min(height, (rows[-1] + 1 + margin) * height // mh),
+            max(0, (cols[0] - margin) * width // mw), min(width, (cols[-1] + 1 + margin) * width // mw))
+
+
+class BackgroundEffect:
+    def __init__(self, effect=BG_EFFECT, image=BG_IMAGE, color=BG_COLOR, blur_scale=BLUR_SCALE):
+        if effect not in ("blur", "color", "image"):
+            raise ValueError(f"Unknown background effect {effect!r}")
+        if effect == "image" and not image:
+            raise ValueError("The image background needs BG_IMAGE")
+        self.effect = effect
+        self.image = image
+        self.color = tuple(color)
+        self.blur_scale = blur_scale
+
+    def background(self, frame):
+        height, width = frame.shape[:2]
+        if self.effect == "blur":
+            return blur_background(frame, self.blur_scale)
+        source = self.color if self.effect == "color" else self.image
+        return replacement_background(source, width, height).copy()
+
+    def apply(self, frame, alpha):
+        """frame with its background replaced, alpha being refine_mask()'s output at model resolution."""
+        height, width = frame.shape[:2]
+        out = self.background(frame)
+        box = person_box(alpha, width, height)
+        if box is None:
+            return out
+        y0, y1, x0, x1 = box
+        # Scaling the small mask up is cheap; the blend, the expensive part, stays inside the box
+        crop = cv2.resize(alpha, (width, height), interpolation=cv2.INTER_LINEAR)[y0:y1, x0:x1, None]
+        bg = out[y0:y1, x0:x1]
+        out[y0:y1, x0:x1] = bg + (frame[y0:y1, x0:x1].astype(np.float32) - bg) * crop
+        return out
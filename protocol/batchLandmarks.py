@@ -0,0 +1,221 @@
+# protocol/batchLandmarks.py
+# Headless landmark extraction over recorded video: no camera, no window.
+# Each video goes to one worker process running the chosen solution, and
+# its landmarks are saved as an NPZ of fixed-shape arrays (NaN where nothing
+# was found) with a timestamp per frame. Outputs are written under a temp
+# name and renamed when complete, so a rerun skips finished videos.
+#   python protocol/batchLandmarks.py videos/ -o landmarks/ -s face_mesh -w 4
+import os
+import sys
+import argparse
+import multiprocessing
+from queue import Empty
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+PROGRESS_EVERY = 100      # frames between progress messages from a worker
+
+
+# Columns per solution: (items per frame, shape of one item, record -> list of items)
+
+def detection_items(record):
+    return [d["box"] + [d["score"]] for d in record]
+
+def hand_items(record):
+    return [h["landmarks"] for h in record]
+
+def pose_items(record):
+    return [record] if record else []
+
+COLUMNS = {
+    "face_detection": (4, (5,), detection_items),      # xmin, ymin, width, height, score
+    "face_mesh": (1, (468, 3), list),
+    "hands": (2, (21, 3), hand_items),
+    "pose": (1, (33, 4), pose_items),                  # x, y, z, visibility
+}
+
+
+def find_videos(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found += [os.path.join(root, name) for name in files if name.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def output_path(video, root, out_dir):
+    """
+    out_dir/<video path relative to its input folder>.npz. Videos given as
+    files keep their path (relative to the working directory when inside it),
+    so same-named files from different folders don't overwrite each other.
+    """
+    if os.path.isdir(root):
+        name = os.path.relpath(video, root)
+    else:
+        name = os.path.relpath(os.path.abspath(video))
+        if name.startswith(os.pardir):
+            name = os.path.splitdrive(os.path.abspath(video))[1].lstrip(os.sep)
+    return os.path.join(out_dir, name + ".npz")
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return max(count, 0)
+
+
+# Worker processes: each builds its processor once, in the pool initializer
+
+worker_processor = None
+worker_progress = None
+
+def init_worker(solution, every, progress, factory=None):
+    global worker_processor, worker_progress
+    cv2.setNumThreads(1)    # one video per worker, the pool is the parallelism
+    if factory is None:
+        from protocol import CameraProtocol
+        processors = {cls.key: cls for cls in CameraProtocol.PROCESSORS.values()}
+        factory = processors[solution]
+    processor = factory()
+    if every > 1:
+        from protocol.adaptiveDetection import AdaptiveProcessor
+        processor = AdaptiveProcessor(processor, every)
+    processor.open()
+    worker_processor = processor
+    worker_progress = progress
+
+
+def extract_file(video, out_path, solution):
+    """Runs the worker's processor over every frame of video and saves the NPZ, returns the frame count."""
+    items, shape, get_items = COLUMNS[solution]
+    processor = worker_processor
+    # The worker's processor is reused across videos; nothing tracked in the last one applies here
+    processor.reset()
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise RuntimeError(f"{video}: can't open")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    times, landmarks, counts = [], [], []
+    while True:
+        success, frame = cap.read()
+        if not success:
+            break
+        times.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+        found = get_items(processor.to_record(processor.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))) or [])
+        row = np.full((items,) + shape, np.nan, np.float32)
+        for i, item in enumerate(found[:items]):
+            row[i] = item
+        landmarks.append(row)
+        counts.append(min(len(found), items))
+        if worker_progress is not None and len(times) % PROGRESS_EVERY == 0:
+            worker_progress.put((video, PROGRESS_EVERY))
+    height, width = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    cap.release()
+    if worker_progress is not None:
+        worker_progress.put((video, len(times) % PROGRESS_EVERY))
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    partial = out_path + ".partial.npz"
+    np.savez_compressed(
+        partial,
+        t=np.array(times, np.float64),
+        count=np.array(counts, np.int8),
+        landmarks=np.array(landmarks, np.float32).reshape((len(times), items) + shape),
+        solution=solution, source=video, fps=fps, width=width, height=height,
+    )
+    os.replace(partial, out_path)
+    return len(times)
+
+
+def run(paths, out_dir, solution="face_mesh", workers=2, every=1, overwrite=False, factory=None, progress=True):
+    """
+    Extracts landmarks from every video under paths into out_dir.
+    Returns (frames done, wall seconds, {video: error} for the videos that failed).
+    """
+    if solution not in COLUMNS:
+        raise ValueError(f"Unknown solution {solution!r}, pick one of {', '.join(COLUMNS)}")
+    jobs = []
+    for root in paths:
+        for video in find_videos([root]):
+            out_path = output_path(video, root, out_dir)
+            if overwrite or not os.path.exists(out_path):
+                jobs.append((video, out_path))
+    total = sum(frame_count(video) for video, _ in jobs)
+    start = perf_counter()
+    frames_done = files_done = 0
+    frames = {}         # video -> frames reported so far
+    failed = {}
+
+    with multiprocessing.Manager() as manager:
+        queue = manager.Queue()
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(solution, every, queue, factory)) as pool:
+            pending = {pool.submit(extract_file, video, out_path, solution): video for video, out_path in jobs}
+            while pending:
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    video = pending.pop(future)
+                    try:
+                        future.result()
+                        files_done += 1
+                    except Exception as e:
+                        failed[video] = e
+                        print(f"\n{video}: failed ({e})")
+                try:
+                    while True:
+                        name, count = queue.get_nowait()
+                        frames[name] = frames.get(name, 0) + count
+                        frames_done += count
+                except Empty:
+                    pass
+                if progress:
+                    wall = perf_counter() - start
+                    rate = frames_done / max(wall, 1e-9)
+                    eta = (total - frames_done) / rate if rate and total > frames_done else 0
+                    print(f"\r{files_done}/{len(jobs)} files, {frames_done}/{total} frames, "
+                          f"{rate:6.1f} fps, ETA {eta:5.0f}s", end="", flush=True)
+    if progress:
+        print()
+    # Frames of videos that failed were never saved
+    saved = sum(count for video, count in frames.items() if video not in failed)
+    return saved, perf_counter() - start, failed
+
+
+def load(path):
+    """The arrays of one output file as a dict."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract MediaPipe landmarks from video files into NPZ arrays.")
+    parser.add_argument("paths", nargs="+", help="video files or folders")
+    parser.add_argument("-o", "--out", default="landmarks")
+    parser.add_argument("-s", "--solution", default="face_mesh", choices=sorted(COLUMNS))
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--every", type=int, default=1, help="detect every N frames, track in between")
+    parser.add_argument("--overwrite", action="store_true", help="redo videos that already have output")
+    args = parser.parse_args()
+    frames, wall, failed = run(args.paths, args.out, args.solution, args.workers, args.every, args.overwrite)
+    print(f"Extracted {frames} frames in {wall:.1f}s ({frames / max(wall, 1e-9):.1f} fps) with {args.workers} workers")
+    if failed:
+        print(f"{len(failed)} video(s) failed, rerun to retry them:")
+        for video, error in failed.items():
+            print(f"  {video}: {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# protocol/batchTranscribe.py
+# Transcribes a folder of recordings. Files are cut at silences into pieces
+# of up to 30 s, the pieces are spread over a pool of worker processes that
+# each hold their own Whisper model, and every finished piece is appended to
+# a JSONL file right away, so an interrupted run picks up where it stopped.
+#   python protocol/batchTranscribe.py recordings/ -o transcripts.jsonl -w 4
+import os
+import sys
+import json
+import wave
+import shutil
+import argparse
+import subprocess
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from protocol.vad import VoiceActivityDetector
+
+RATE = 16000
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".opus", ".webm")
+MAX_PIECE_SECONDS = 30.0
+PAD_SECONDS = 0.2
+
+
+def find_audio(folder):
+    found = []
+    for root, _, files in os.walk(folder):
+        found += [os.path.join(root, name) for name in files if name.lower().endswith(AUDIO_EXTENSIONS)]
+    return sorted(found)
+
+
+def load_audio(path, rate=RATE):
+    """Mono float32 at `rate`. 16-bit WAVs are read directly, anything else goes through ffmpeg."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() == 2:
+                channels, source_rate = wf.getnchannels(), wf.getframerate()
+                audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+                if channels > 1:
+                    audio = audio.reshape(-1, channels).mean(axis=1)
+                if source_rate != rate:
+                    positions = np.arange(0, len(audio), source_rate / rate)
+                    audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+                return audio
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError(f"{path}: needs ffmpeg to decode")
+    out = subprocess.run(["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-f", "s16le", "-ac", "1",
+                          "-ar", str(rate), "-"], capture_output=True, check=True).stdout
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768
+
+
+def split_at_silence(audio, rate=RATE, max_seconds=MAX_PIECE_SECONDS, pad=PAD_SECONDS):
+    """
+    (start, end) sample ranges covering the speech in `audio`, each at most
+    max_seconds long. Neighbouring speech is grouped into one piece and pieces
+    are cut in the gaps between utterances; a single utterance longer than
+    max_seconds is cut hard.
+    """
+    limit, margin = int(max_seconds * rate), int(pad * rate)
+    pieces = []
+    for start, end in VoiceActivityDetector(rate).segments(audio):
+        start, end = max(0, start - margin), min(len(audio), end + margin)
+        if pieces and end - pieces[-1][0] <= limit:
+            pieces[-1] = (pieces[-1][0], end)
+            continue
+        while end - start > limit:
+            pieces.append((start, start + limit))
+            start += limit
+        pieces.append((start, end))
+    return pieces
+
+
+# Worker processes: each loads its own model once, in the pool initializer
+
+worker_segments = None
+
+def init_worker(size, device, threads, segments=None):
+    global worker_segments
+    if segments is not None:
+        worker_segments = segments
+        return
+    # Split the cores between the workers instead of every worker using all of them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from protocol.whisperModel import WhisperManager
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    worker_segments = WhisperManager(size, device, warmup=False).segments
+
+
+def transcribe_piece(name, index, offset, audio):
+    segments = [
+        {"start": round(offset + start, 2), "end": round(offset + end, 2), "text": text}
+        for start, end, text in worker_segments(audio)
+    ]
+    return {
+        "file": name,
+        "piece": index,
+        "start": round(offset, 2),
+        "end": round(offset + len(audio) / RATE, 2),
+        "segments": segments,
+        "text": " ".join(s["text"] for s in segments if s["text"]),
+    }
+
+
+def read_progress(path):
+    """From an earlier run's JSONL: files that are complete, and the pieces done of the others."""
+    finished, pieces = set(), {}
+    if not os.path.exists(path):
+        return finished, pieces
+    # Drop a last line that was cut short by the interruption, new records are appended after it
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("done"):
+                finished.add(record["file"])
+            else:
+                pieces.setdefault(record["file"], set()).add(record["piece"])
+    return finished, pieces
+
+
+def run(folder, out_path, workers=2, size="base", device="cpu", max_seconds=MAX_PIECE_SECONDS, segments=None,
+        progress=True):
+    """
+    Transcribes every audio file under folder into out_path. Returns (seconds
+    of audio transcribed by this run, wall seconds, {file: error} for the files
+    that failed). A failed file is left unfinished, so a rerun tries it again.
+    """
+    paths = find_audio(folder)
+    finished, done_pieces = read_progress(out_path)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    start = perf_counter()
+    audio_seconds = 0.0
+    in_flight = {}
+    remaining = {}      # file -> pieces still running
+    durations = {}
+    this_run = {}       # file -> seconds of it transcribed by this run, not an earlier one
+    failed = {}
+
+    with open(out_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(workers, initializer=init_worker, initargs=(size, device, threads, segments)) as pool:
+
+        def write(record):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        def finish(name):
+            nonlocal audio_seconds
+            write({"file": name, "done": True, "duration": round(durations[name], 2)})
+            audio_seconds += this_run[name]
+
+        def fail(name, error):
+            failed[name] = error
+            print(f"\n{name}: failed ({error})")
+            # The file's other pieces are of no use without this one
+            for future, other in list(in_flight.items()):
+                if other == name and future.cancel():
+                    del in_flight[future]
+
+        def collect(block):
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED) if block else (
+                [f for f in in_flight if f.done()], None)
+            for future in done:
+                name = in_flight.pop(future, None)
+                if name is None or name in failed:
+                    continue
+                try:
+                    write(future.result())
+                except Exception as e:
+                    fail(name, e)
+                    continue
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    finish(name)
+            wall = perf_counter() - start
+            if done and progress:
+                print(f"\r{audio_seconds:8.0f}s of audio in {wall:6.0f}s, {audio_seconds / wall:6.1f}x real time",
+                      end="", flush=True)
+
+        for path in paths:
+            name = os.path.relpath(path, folder)
+            if name in finished:
+                continue
+            try:
+                audio = load_audio(path)
+                pieces = split_at_silence(audio, RATE, max_seconds)
+            except Exception as e:
+                fail(name, e)
+                continue
+            durations[name] = len(audio) / RATE
+            todo = [(i, s, e) for i, (s, e) in enumerate(pieces) if i not in done_pieces.get(name, ())]
+            remaining[name] = len(todo)
+            # On resume only the pieces left count, as their share of the file's speech
+            spoken = sum(e - s for s, e in pieces)
+            this_run[name] = durations[name] * (sum(e - s for _, s, e in todo) / spoken if spoken else 1.0)
+            if not todo:
+                finish(name)
+                continue
+            for index, s, e in todo:
+                # Keep the queue short so long archives don't pile up in memory
+                while len(in_flight) >= workers * 2:
+                    collect(block=True)
+                if name in failed:
+                    break
+                future = pool.submit(transcribe_piece, name, index, s / RATE, audio[s:e])
+                in_flight[future] = name
+            collect(block=False)
+        while in_flight:
+            collect(block=True)
+    if progress:
+        print()
+    return audio_seconds, perf_counter() - start, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a folder of recordings into resumable JSONL.")
+    parser.add_argument("folder")
+    parser.add_argument("-o", "--out", default="transcripts.jsonl")
+    parser.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("-m", "--model", default=os.getenv("WHISPER_MODEL", "base"))
+    parser.add_argument("-d", "--device", default="cpu", help="cpu, cuda or auto (one model per worker)")
+    parser.add_argument("--max-seconds", type=float, default=MAX_PIECE_SECONDS)
+    args = parser.parse_args()
+    audio_seconds, wall, failed = run(args.folder, args.out, args.workers, args.model, args.device, args.max_seconds)
+    print(f"Transcribed {audio_seconds:.0f}s of audio in {wall:.1f}s "
+          f"({audio_seconds / max(wall, 1e-9):.1f} audio-seconds per wall-second) with {args.workers} workers")
+    if failed:
+        print(f"{len(failed)} file(s) failed, rerun to retry them:")
+        for name, error in failed.items():
+            print(f"  {name}: {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# protocol/faceTracking.py
+# Face mesh -> VTube Studio tracking parameters, streamed at a fixed rate.
+# Capture, inference and sending run decoupled and only ever hand over the
+# newest value, so when inference slows down frames are skipped instead of
+# piling up and the avatar lags by one inference at most.
+import os
+import sys
+import asyncio
+import threading
+from time import perf_counter
+from collections import deque
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from auth.vtsClient import VTSClient
+from protocol.framePipeline import Latest, FrameSource
+
+TRACKING_RATE = float(os.getenv("VTS_TRACKING_RATE", "60"))
+STALE_AFTER = float(os.getenv("VTS_STALE_AFTER", "0.25"))   # seconds, older params are never sent
+LATENCY_SAMPLES = 3600    # capture-to-send latencies kept for stats(), a minute at 60 Hz
+
+# Face mesh landmark indices
+NOSE, CHIN, FOREHEAD = 1, 152, 10
+CHEEK_L, CHEEK_R = 234, 454
+EYE_L = (159, 145, 33, 133)     # upper lid, lower lid, outer corner, inner corner
+EYE_R = (386, 374, 263, 362)
+LIP_UP, LIP_DOWN, MOUTH_L, MOUTH_R = 13, 14, 61, 291
+
+# Aspect ratios that map to fully closed / fully open
+EYE_CLOSED, EYE_OPEN = 0.12, 0.28
+MOUTH_CLOSED, MOUTH_OPEN = 0.05, 0.55
+PITCH_NEUTRAL = 0.1   # the nose tip sits a bit below the middle of the face when looking straight
+
+
+def ramp(value, low, high):
+    return float(np.clip((value - low) / (high - low), 0.0, 1.0))
+
+
+def landmarks_to_params(landmarks, width, height):
+    """
+    VTS parameters from one face's landmarks (N x 3 array, normalized like
+    MediaPipe's): head angles in degrees, eye openness and mouth open in 0..1.
+    """
+    pts = landmarks[:, :2] * (width, height)
+
+    face_width = np.linalg.norm(pts[CHEEK_R] - pts[CHEEK_L])
+    face_height = np.linalg.norm(pts[CHIN] - pts[FOREHEAD])
+    center_x = (pts[CHEEK_L, 0] + pts[CHEEK_R, 0]) / 2
+    center_y = (pts[FOREHEAD, 1] + pts[CHIN, 1]) / 2
+
+    yaw = (pts[NOSE, 0] - center_x) / (face_width / 2)
+    pitch = (center_y - pts[NOSE, 1]) / (face_height / 2) + PITCH_NEUTRAL
+    dx, dy = pts[EYE_R[2]] - pts[EYE_L[2]]
+
+    def eye_open(eye):
+        up, down, outer, inner = eye
+        return ramp(np.linalg.norm(pts[up] - pts[down]) / np.linalg.norm(pts[outer] - pts[inner]),
+                    EYE_CLOSED, EYE_OPEN)
+
+    mouth = np.linalg.norm(pts[LIP_UP] - pts[LIP_DOWN]) / np.linalg.norm(pts[MOUTH_R] - pts[MOUTH_L])
+    return {
+        "FaceAngleX": float(np.degrees(np.arcsin(np.clip(yaw, -1, 1)))),
+        "FaceAngleY": float(np.degrees(np.arcsin(np.clip(pitch, -1, 1)))),
+        "FaceAngleZ": float(np.degrees(np.arctan2(dy, dx))),
+        "EyeOpenLeft": eye_open(EYE_L),
+        "EyeOpenRight": eye_open(EYE_R),
+        "MouthOpen": ramp(mouth, MOUTH_CLOSED, MOUTH_OPEN),
+    }
+
+
+def make_face_mesh():
+    """Landmarker for the tracker: RGB frame -> landmark array of the first face, or None. Has a close()."""
+    import mediapipe as mp
+    mesh = mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=False,
+                                           min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+    def detect(frame_rgb):
+        results = mesh.process(frame_rgb)
+        if not results.multi_face_landmarks:
+            return None
+        return np.array([(p.x, p.y, p.z) for p in results.multi_face_landmarks[0].landmark], dtype=np.float32)
+    detect.close = mesh.close
+    return detect
+
+
+class FaceTracker:
+    """
+    Capture thread -> inference thread -> send loop, each handing over only
+    the latest item. Every item carries its capture time, so the sender can
+    drop parameters older than `stale_after` and measure capture-to-send latency.
+    """
+
+    def __init__(self, source=0, rate=TRACKING_RATE, stale_after=STALE_AFTER, mesh_factory=make_face_mesh):
+        self.source = source if isinstance(source, FrameSource) else FrameSource(source)
+        self.rate = rate
+        self.stale_after = stale_after
+        self.mesh_factory = mesh_factory
+        self.params = Latest()
+        self.thread = None
+        self.inferred = 0
+        self.skipped_frames = 0    # captured but overtaken before inference got to them
+        self.sent = 0
+        self.stale = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.error = None
+
+    def start(self):
+        self.source.start()
+        self.thread = threading.Thread(target=self.inference_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.source.stop()
+        self.params.close()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def inference_loop(self):
+        detect = None
+        try:
+            detect = self.mesh_factory()
+            frames = self.source.frames
+            seen = 0
+            while True:
+                seq, frame = frames.wait(seen)
+                if seq == seen:
+                    if frames.closed:
+                        break
+                    continue
+                self.skipped_frames += seq - seen - 1
+                seen = seq
+                landmarks = detect(cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB))
+                self.inferred += 1
+                if landmarks is not None:
+                    height, width = frame.image.shape[:2]
+                    self.params.put((frame.captured_at, landmarks_to_params(landmarks, width, height)))
+        except Exception as e:
+            self.error = e
+        finally:
+            # stream() only stops once the mailbox is closed, whatever happened here
+            try:
+                if getattr(detect, "close", None) is not None:
+                    detect.close()
+            except Exception as e:
+                self.error = self.error or e
+            finally:
+                self.params.close()
+
+    async def stream(self, vts, duration=None):
+        """
+        Sends the newest parameters every 1/rate seconds until capture ends (or
+        `duration`). Raises what stopped the inference thread, if anything did.
+        """
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.rate
+        start = next_tick = loop.time()
+        sent_seq = 0
+        while not self.params.closed and (duration is None or loop.time() - start < duration):
+            next_tick += interval
+            seq, item = self.params.get()
+            if seq != sent_seq:
+                sent_seq = seq
+                captured_at, values = item
+                age = perf_counter() - captured_at
+                if age > self.stale_after:
+                    self.stale += 1
+                else:
+                    self.latencies.append(age)
+                    await vts.inject_parameters(values)
+                    self.sent += 1
+            # Skip ticks that were missed rather than bursting to catch up
+            now = loop.time()
+            if next_tick < now:
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        lat = np.array(self.latencies or [0.0]) * 1000
+        return {
+            "captured": self.source.captured,
+            "inferred": self.inferred,
+            "skipped_frames": self.skipped_frames,
+            "sent": self.sent,
+            "stale": self.stale,
+            "latency_p50_ms": float(np.percentile(lat, 50)),
+            "latency_p99_ms": float(np.percentile(lat, 99)),
+        }
+
+
+async def stream_to_vts(source=0, rate=TRACKING_RATE):
+    """Tracks the face from a camera index or video file and drives the VTS model until capture ends."""
+    tracker = FaceTracker(source, rate)
+    async with VTSClient() as vts:
+        tracker.start()
+        try:
+            await tracker.stream(vts)
+        finally:
+            tracker.stop()
+    print(tracker.stats())
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else 0
+    asyncio.run(stream_to_vts(int(src) if str(src).isdigit() else src))
@@ -0,0 +1,401 @@
+# protocol/framePipeline.py
+# Camera pipeline in three stages that never wait on each other: a capture
+# thread, an inference thread and a display (or sink) loop. Each stage hands
+# the next one only its newest item, so when inference is slower than the
+# camera, frames are dropped instead of queued and what's shown stays current.
+import threading
+from time import perf_counter, sleep
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+class Latest:
+    """Single-slot mailbox between threads: put() overwrites, readers only see the newest value."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.value = None
+        self.seq = 0
+        self.taken = 0
+        self.closed = False
+
+    def put(self, value):
+        with self.cond:
+            self.value = value
+            self.seq += 1
+            self.cond.notify_all()
+
+    def get(self):
+        with self.cond:
+            return self.seq, self.value
+
+    def wait(self, after, timeout=0.5):
+        """Blocks until there is something newer than sequence number `after` (or closed)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > after or self.closed, timeout)
+            if self.seq > self.taken:
+                self.taken = self.seq
+                self.cond.notify_all()
+            return self.seq, self.value
+
+    def wait_taken(self):
+        """Blocks until a reader has picked up the current value, for producers that must not overwrite."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.taken >= self.seq or self.closed)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class Frame:
+    __slots__ = ("image", "index", "captured_at")
+
+    def __init__(self, image, index, captured_at):
+        self.image = image
+        self.index = index
+        self.captured_at = captured_at
+
+
+class FrameSource:
+    """
+    Capture thread for a camera index or a video file. Only the newest frame
+    is kept in `frames`. A file is played back at its own frame rate, like a
+    camera would deliver it, unless realtime=False. With drop=False capture
+    waits for the consumer instead, so offline runs see every frame.
+    """
+
+    def __init__(self, source=0, realtime=None, loop=False, drop=True):
+        self.source = source
+        self.realtime = isinstance(source, str) if realtime is None else realtime
+        self.loop = loop
+        self.drop = drop
+        self.frames = Latest()
+        self.running = False
+        self.thread = None
+        self.captured = 0
+        self.fps = None
+        self.started_at = None
+
+    def start(self):
+        self.running = True
+        self.started_at = perf_counter()
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.frames.close()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def capture_loop(self):
+        cap = cv2.VideoCapture(self.source)
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        interval = 1.0 / self.fps if self.realtime else 0
+        next_frame = perf_counter()
+        try:
+            while self.running and cap.isOpened():
+                if interval:
+                    delay = next_frame - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
+                    next_frame += interval
+                if not self.drop:
+                    self.frames.wait_taken()
+                success, image = cap.read()
+                if not success:
+                    if self.loop and self.captured:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+                self.frames.put(Frame(image, self.captured, perf_counter()))
+                self.captured += 1
+        finally:
+            cap.release()
+            self.running = False
+            self.frames.close()
+
+
+class Processor:
+    """
+    One camera mode. process() gets the RGB frame and returns its results,
+    draw() renders them onto the BGR frame for display. open() and close()
+    run on the inference thread, so models are created where they are used.
+    """
+    name = "processor"
+    key = "processor"
+
+    def open(self):
+        pass
+
+    def process(self, rgb):
+        return None
+
+    def draw(self, frame, results):
+        return frame
+
+    def to_record(self, results):
+        """Plain (JSON-able) data from process()'s results, for records."""
+        return results
+
+    def points(self, results):
+        """Trackable points of the results as (N, 2) normalized x, y, or None if there are none."""
+        return None
+
+    def moved(self, results, points):
+        """The results with their points() moved to `points` (same order), see adaptiveDetection."""
+        return results
+
+    def reset(self):
+        """Forgets state carried from frame to frame, e.g. before starting on another video."""
+        pass
+
+    def close(self):
+        pass
+
+
+class MultiProcessor(Processor):
+    """
+    Several modes on the same frame: one capture and one RGB conversion,
+    then every processor runs in parallel on the shared (read-only) RGB
+    array. Each processor gets its own worker thread, so open(), process()
+    and close() of one model always run on the same thread.
+    """
+
+    def __init__(self, processors):
+        self.processors = list(processors)
+        self.name = " + ".join(p.name for p in self.processors)
+        self.key = "+".join(p.key for p in self.processors)
+        self.workers = []
+
+    def open(self):
+        self.workers = [ThreadPoolExecutor(1) for _ in self.processors]
+        futures = [w.submit(p.open) for w, p in zip(self.workers, self.processors)]
+        # Let every open() finish before raising, so close() sees a settled state
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def process(self, rgb):
+        rgb.flags.writeable = False
+        futures = [w.submit(p.process, rgb) for w, p in zip(self.workers, self.processors)]
+        return {p.key: f.result() for p, f in zip(self.processors, futures)}
+
+    def draw(self, frame, results):
+        for p in self.processors:
+            frame = p.draw(frame, results[p.key])
+        return frame
+
+    def to_record(self, results):
+        return {p.key: p.to_record(results[p.key]) for p in self.processors}
+
+    def reset(self):
+        for w, p in zip(self.workers, self.processors):
+            w.submit(p.reset).result()
+
+    def close(self):
+        error = None
+        for w, p in zip(self.workers, self.processors):
+            try:
+                w.submit(p.close).result()
+            except Exception as e:
+                error = error or e
+            w.shutdown()
+        self.workers = []
+        if error is not None:
+            raise error
+
+
+def make_record(processor, result, source):
+    """
+    One timestamped record for a Result: frame index, time in seconds (the
+    video's own timeline for files, since capture start for cameras) and the data.
+    """
+    frame = result.frame
+    if isinstance(source.source, str):
+        t = frame.index / source.fps
+    else:
+        t = frame.captured_at - source.started_at
+    record = {"frame": frame.index, "t": round(t, 4)}
+    data = processor.to_record(result.results)
+    if isinstance(processor, MultiProcessor):
+        record.update(data)
+    else:
+        record[processor.key] = data
+    return record
+
+
+class Result:
+    __slots__ = ("frame", "results", "started_at", "inferred_at")
+
+    def __init__(self, frame, results, started_at, inferred_at):
+        self.frame = frame
+        self.results = results
+        self.started_at = started_at
+        self.inferred_at = inferred_at
+
+
+# Sinks: show(image) returns False when the user asked to stop
+
+class WindowSink:
+    def __init__(self, title):
+        self.title = title
+
+    def show(self, image):
+        cv2.imshow(self.title, image)
+        return cv2.waitKey(1) & 0xFF != ord('q')
+
+    def close(self):
+        cv2.destroyWindow(self.title)
+
+
+class NullSink:
+    """Discards frames, for headless runs and benchmarks."""
+
+    def show(self, image):
+        return True
+
+    def close(self):
+        pass
+
+
+class StageTimes:
+    """Rolling latency samples (seconds) and completion times for one stage."""
+
+    def __init__(self, window=300):
+        self.latency = deque(maxlen=window)
+        self.done = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, latency, now):
+        self.latency.append(latency)
+        self.done.append(now)
+        self.count += 1
+
+    def fps(self):
+        if len(self.done) < 2:
+            return 0.0
+        return (len(self.done) - 1) / (self.done[-1] - self.done[0])
+
+    def p50_ms(self):
+        return float(np.median(self.latency)) * 1000 if self.latency else 0.0
+
+
+class FramePipeline:
+    """
+    source -> processor -> sink. run() drives the display stage on the
+    calling thread (cv2 windows want the main thread) and returns the stats.
+    on_record, if given, gets make_record()'s dict for every inferred frame,
+    called on the inference thread.
+    """
+
+    def __init__(self, processor, source=0, sink=None, report_every=5.0, on_record=None):
+        self.processor = processor
+        self.on_record = on_record
+        self.source = source if isinstance(source, FrameSource) else FrameSource(source)
+        self.sink = sink or WindowSink(processor.name)
+        self.report_every = report_every
+        self.results = Latest()
+        self.thread = None
+        self.error = None
+        self.dropped = 0          # captured frames that inference never saw
+        self.wait = StageTimes()      # capture -> inference start
+        self.inference = StageTimes()
+        self.display = StageTimes()   # draw + show
+        self.total = StageTimes()     # capture -> shown
+
+    def inference_loop(self):
+        frames = self.source.frames
+        seen = 0
+        try:
+            self.processor.open()
+            while True:
+                seq, frame = frames.wait(seen)
+                if seq == seen:
+                    if frames.closed:
+                        break
+                    continue
+                self.dropped += seq - seen - 1
+                seen = seq
+                started = perf_counter()
+                # One color conversion per frame, whatever the processor does with it
+                results = self.processor.process(cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB))
+                done = perf_counter()
+                self.wait.add(started - frame.captured_at, started)
+                self.inference.add(done - started, done)
+                result = Result(frame, results, started, done)
+                if self.on_record is not None:
+                    self.on_record(make_record(self.processor, result, self.source))
+                self.results.put(result)
+        except Exception as e:
+            self.error = e
+        finally:
+            # Whatever close() does, the display loop must see the mailbox closed or run() never returns
+            try:
+                self.processor.close()
+            except Exception as e:
+                self.error = self.error or e
+            finally:
+                self.results.close()
+
+    def run(self, max_seconds=None):
+        self.source.start()
+        self.thread = threading.Thread(target=self.inference_loop, daemon=True)
+        self.thread.start()
+        start = last_report = perf_counter()
+        seen = 0
+        try:
+            while max_seconds is None or perf_counter() - start < max_seconds:
+                seq, result = self.results.wait(seen, timeout=0.05)
+                if seq == seen:
+                    if self.results.closed:
+                        break
+                    continue
+                seen = seq
+                began = perf_counter()
+                image = self.processor.draw(result.frame.image, result.results)
+                keep_going = self.sink.show(image)
+                now = perf_counter()
+                self.display.add(now - began, now)
+                self.total.add(now - result.frame.captured_at, now)
+                if not keep_going:
+                    break
+                if self.report_every and now - last_report >= self.report_every:
+                    last_report = now
+                    print(self.summary())
+        finally:
+            self.source.stop()
+            self.thread.join(timeout=5)
+            self.sink.close()
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+    def stats(self):
+        return {
+            "captured": self.source.captured,
+            "inferred": self.inference.count,
+            "shown": self.display.count,
+            "dropped": self.dropped,
+            "capture_fps": self.source.fps,
+            "inference_fps": self.inference.fps(),
+            "display_fps": self.display.fps(),
+            "wait_ms": self.wait.p50_ms(),
+            "inference_ms": self.inference.p50_ms(),
+            "display_ms": self.display.p50_ms(),
+            "latency_ms": self.total.p50_ms(),
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"[{self.processor.name}] {s['inference_fps']:.1f} fps inferred, {s['display_fps']:.1f} shown, "
+                f"{s['dropped']}/{s['captured']} dropped | p50 wait {s['wait_ms']:.1f} ms, "
+                f"inference {s['inference_ms']:.1f} ms, display {s['display_ms']:.1f} ms, "
+                f"capture->shown {s['latency_ms']:.1f} ms")
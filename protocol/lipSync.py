@@ -0,0 +1,110 @@
+# protocol/lipSync.py
+# Mouth movement from audio. The whole buffer is cut into overlapping windows
+# at once (one window per animation frame) and RMS loudness and spectral
+# centroid are computed for all of them in a few NumPy calls, before the
+# audio starts playing. The values are then sent to VTS in step with playback.
+import os
+import sys
+import asyncio
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from protocol.tts import wav_bytes_to_audio
+
+LIP_SYNC_FPS = float(os.getenv("LIP_SYNC_FPS", "60"))
+SILENCE_DB = -50.0     # at or below this the mouth is closed
+LOUD_DB = -12.0        # at or above this it is fully open
+FORM_LOW_HZ, FORM_HIGH_HZ = 600.0, 2800.0   # centroid range mapped to mouth form -1 ("oo") .. 1 ("ee")
+SMOOTH_FRAMES = 3
+
+
+def frames(audio, sample_rate, fps=LIP_SYNC_FPS):
+    """(frame count, window) view of the audio and the hop: one window per frame, each twice the hop long."""
+    hop = max(1, int(round(sample_rate / fps)))
+    window = 2 * hop
+    count = max(1, int(np.ceil(len(audio) / hop)))
+    padded = np.zeros(count * hop + window, dtype=np.float32)
+    # Windows are centred on their frame time
+    padded[hop:hop + len(audio)] = audio
+    return sliding_window_view(padded, window)[::hop][:count], hop
+
+
+def lip_sync_values(audio, sample_rate, fps=LIP_SYNC_FPS):
+    """
+    Mouth open (0..1) and mouth form (-1..1) for every 1/fps seconds of mono
+    float audio. Returns (times, mouth_open, mouth_form) arrays.
+    """
+    windows, hop = frames(np.asarray(audio, dtype=np.float32), sample_rate, fps)
+    times = np.arange(len(windows)) * hop / sample_rate
+
+    rms = np.sqrt(np.mean(windows ** 2, axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-9))
+    mouth_open = np.clip((db - SILENCE_DB) / (LOUD_DB - SILENCE_DB), 0.0, 1.0)
+
+    spectrum = np.abs(np.fft.rfft(windows * np.hanning(windows.shape[1]).astype(np.float32), axis=1))
+    freqs = np.fft.rfftfreq(windows.shape[1], 1.0 / sample_rate)
+    centroid = (spectrum @ freqs) / np.maximum(spectrum.sum(axis=1), 1e-9)
+    mouth_form = np.clip((centroid - FORM_LOW_HZ) / (FORM_HIGH_HZ - FORM_LOW_HZ) * 2 - 1, -1.0, 1.0)
+    mouth_form *= mouth_open > 0   # the shape of a closed mouth is neutral
+
+    # A short moving average takes the jitter out without lagging behind the sound
+    if SMOOTH_FRAMES > 1 and len(windows) >= SMOOTH_FRAMES:
+        kernel = np.ones(SMOOTH_FRAMES, dtype=np.float32) / SMOOTH_FRAMES
+        mouth_open = np.convolve(mouth_open, kernel, mode="same")
+        mouth_form = np.convolve(mouth_form, kernel, mode="same")
+    return times, mouth_open.astype(np.float32), mouth_form.astype(np.float32)
+
+
+def lip_sync_wav(path, fps=LIP_SYNC_FPS):
+    with open(path, "rb") as f:
+        audio, rate = wav_bytes_to_audio(f.read())
+    return lip_sync_values(audio, rate, fps)
+
+
+class LipSync:
+    """
+    Drives the avatar's mouth from audio that is about to play. Attach it to
+    a tts.Speaker (or call play(audio, rate) right before starting playback)
+    and it sends MouthOpen / MouthSmile to VTS on each frame's playback time.
+    """
+
+    def __init__(self, vts, fps=LIP_SYNC_FPS):
+        self.vts = vts
+        self.fps = fps
+        self.task = None
+        self.late = 0     # frames skipped because sending fell behind playback
+
+    def attach(self, speaker):
+        speaker.listeners.append(self.play)
+        return self
+
+    def play(self, audio, sample_rate):
+        times, mouth_open, mouth_form = lip_sync_values(audio, sample_rate, self.fps)
+        if self.task is not None:
+            self.task.cancel()
+        self.task = asyncio.get_running_loop().create_task(self.send(times, mouth_open, mouth_form))
+
+    async def send(self, times, mouth_open, mouth_form):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            for i, at in enumerate(times):
+                delay = start + at - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif i + 1 < len(times) and start + times[i + 1] <= loop.time():
+                    self.late += 1      # already time for the next frame, this one is stale
+                    continue
+                await self.vts.inject_parameters({
+                    "MouthOpen": mouth_open[i],
+                    "MouthSmile": (mouth_form[i] + 1) / 2,
+                })
+        finally:
+            try:
+                await self.vts.inject_parameters({"MouthOpen": 0.0, "MouthSmile": 0.5})
+            except Exception:
+                pass
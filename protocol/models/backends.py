@@ -0,0 +1,215 @@
+# protocol/models/backends.py
+import os
+import sys
+import asyncio
+import importlib
+from abc import ABC, abstractmethod
+from time import perf_counter
+from collections import deque
+
+import numpy as np
+
+HEALTH_INTERVAL = float(os.getenv("HEALTH_INTERVAL", "60"))
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT", "10"))
+FIRST_CHUNK_TIMEOUT = float(os.getenv("FIRST_CHUNK_TIMEOUT", "20"))
+CHUNK_TIMEOUT = float(os.getenv("CHUNK_TIMEOUT", "30"))
+AUTO = "Auto (fastest healthy)"
+
+
+class BackendError(Exception):
+    pass
+
+
+class ModelBackend(ABC):
+    """
+    Common async interface for chat backends: stream(prompt) yields text chunks,
+    health_check() returns True when the backend can take prompts. run() wraps
+    stream() with timeouts and keeps rolling latency samples for routing.
+    """
+    name = "backend"
+
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)   # total seconds of successful replies
+        self.first_chunk = deque(maxlen=window)
+        self.healthy = True
+        self.probe_latency = None
+        self.last_error = None
+        self.failures = 0
+
+    @abstractmethod
+    def stream(self, prompt):
+        """Async generator of the reply's text chunks."""
+
+    async def health_check(self) -> bool:
+        return True
+
+    def loaded(self):
+        """Whether probing costs nothing more than the probe itself."""
+        return True
+
+    async def run(self, prompt, first_timeout=FIRST_CHUNK_TIMEOUT, chunk_timeout=CHUNK_TIMEOUT):
+        """Streams a reply, failing with BackendError when a chunk takes too long or the backend errors."""
+        loop = asyncio.get_running_loop()
+        start = perf_counter()
+        chunks = self.stream(prompt)
+        timeout = first_timeout
+        try:
+            # The deadline only runs while waiting on the backend, it is off while the caller handles a chunk
+            async with asyncio.timeout(None) as deadline:
+                while True:
+                    deadline.reschedule(loop.time() + timeout)
+                    try:
+                        chunk = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    deadline.reschedule(None)
+                    if timeout == first_timeout:
+                        self.first_chunk.append(perf_counter() - start)
+                        timeout = chunk_timeout
+                    yield chunk
+        except TimeoutError:
+            self.mark_failed(f"no reply within {timeout:g}s")
+            raise BackendError(f"{self.name} timed out after {timeout:g}s")
+        except Exception as e:
+            self.mark_failed(str(e))
+            raise BackendError(f"{self.name} failed: {e}") from e
+        finally:
+            await chunks.aclose()
+        self.latencies.append(perf_counter() - start)
+        self.failures = 0
+
+    def mark_failed(self, reason):
+        self.failures += 1
+        self.last_error = reason
+        self.healthy = False
+
+    async def probe(self, timeout=HEALTH_TIMEOUT):
+        start = perf_counter()
+        try:
+            ok = await asyncio.wait_for(self.health_check(), timeout)
+        except Exception as e:
+            ok = False
+            self.last_error = f"health check: {e}"
+        if ok:
+            self.probe_latency = perf_counter() - start
+        self.healthy = bool(ok)
+        return self.healthy
+
+    def percentile(self, q, samples=None):
+        samples = self.latencies if samples is None else samples
+        if not samples:
+            return None
+        return float(np.percentile(np.fromiter(samples, dtype=float), q))
+
+    def expected_latency(self):
+        """What routing sorts on: median reply time, or the probe time before any reply."""
+        p50 = self.percentile(50)
+        if p50 is not None:
+            return p50
+        return self.probe_latency if self.probe_latency is not None else float("inf")
+
+    def summary(self):
+        def fmt(value):
+            return f"{value:.2f}s" if value is not None else "n/a"
+        state = "healthy" if self.healthy else f"DOWN ({self.last_error})"
+        return (f"{self.name}: {state}, p50 {fmt(self.percentile(50))}, p95 {fmt(self.percentile(95))}, "
+                f"first chunk p50 {fmt(self.percentile(50, self.first_chunk))}, "
+                f"probe {fmt(self.probe_latency)}, {len(self.latencies)} samples")
+
+
+class ModuleBackend(ModelBackend):
+    """Backend whose module (and its heavy imports) loads on first use, in a worker thread."""
+
+    def __init__(self, name, module_name, stream_func, health_func="health_check", **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.module_name = module_name
+        self.stream_func = stream_func
+        self.health_func = health_func
+
+    async def module(self):
+        module = sys.modules.get(self.module_name)
+        if module is None:
+            module = await asyncio.to_thread(importlib.import_module, self.module_name)
+        return module
+
+    async def stream(self, prompt):
+        module = await self.module()
+        async for chunk in getattr(module, self.stream_func)(prompt):
+            yield chunk
+
+    def loaded(self):
+        return self.module_name in sys.modules
+
+    async def health_check(self):
+        module = await self.module()
+        return await getattr(module, self.health_func)()
+
+
+class BackendRegistry:
+    """Named backends, periodic health probes and latency-aware 'auto' routing with failover."""
+
+    def __init__(self):
+        self.backends = {}
+
+    def register(self, backend):
+        self.backends[backend.name] = backend
+        return backend
+
+    def get(self, name):
+        return self.backends.get(name)
+
+    def names(self):
+        return list(self.backends)
+
+    async def probe_all(self, warm=()):
+        """
+        Probes the backends that are loaded or whose module is in warm; the rest
+        stay unprobed until first used, so probing doesn't import them.
+        """
+        await asyncio.gather(*(backend.probe() for backend in self.backends.values()
+                               if backend.loaded() or getattr(backend, "module_name", None) in warm))
+
+    async def health_loop(self, interval=HEALTH_INTERVAL, warm=()):
+        while True:
+            await self.probe_all(warm)
+            await asyncio.sleep(interval)
+
+    def ranked(self):
+        """Healthy backends fastest first, then the unhealthy ones as a last resort."""
+        healthy = [b for b in self.backends.values() if b.healthy]
+        down = [b for b in self.backends.values() if not b.healthy]
+        return sorted(healthy, key=lambda b: b.expected_latency()) + sorted(down, key=lambda b: b.failures)
+
+    async def stream_auto(self, prompt, route=None):
+        """
+        Streams from the fastest healthy backend and fails over to the next one
+        on error or timeout, as long as nothing has been yielded yet.
+        route, if given, gets route["backend"] set to the name that answered.
+        """
+        errors = []
+        for backend in self.ranked():
+            if route is not None:
+                route["backend"] = backend.name
+            started = False
+            try:
+                async for chunk in backend.run(prompt):
+                    started = True
+                    yield chunk
+                return
+            except BackendError as e:
+                if started:
+                    raise
+                errors.append(str(e))
+        raise BackendError("No backend could answer: " + "; ".join(errors) if errors else "No backends registered")
+
+    def summary(self):
+        return "\n".join(["Backends (routing order):"] + [f"  {b.summary()}" for b in self.ranked()])
+
+
+def default_registry():
+    registry = BackendRegistry()
+    registry.register(ModuleBackend("Gemini Model", "protocol.models.geminiOllama", "stream_gemini_async"))
+    registry.register(ModuleBackend("Character.AI Model", "protocol.models.cai", "stream_cai_async"))
+    registry.register(ModuleBackend("Ollama Model", "protocol.models.ollamaProtocol", "stream_ollama_async"))
+    return registry
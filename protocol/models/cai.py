@@ -2,7 +2,11 @@
 from PyCharacterAI import get_client
 from PyCharacterAI.exceptions import SessionClosedError
 import os
+import random
+import weakref
+import asyncio
 from dotenv import load_dotenv
+from protocol.models.responseCache import cache, depends_on_state
 
 load_dotenv()
 
@@ -10,28 +14,148 @@ character_id = os.getenv("CHARACTER_ID")
 token = os.getenv("CHARACTER_TOKEN")
 chat_id = os.getenv("CHAT_ID_NEW")
 
-client = None
-
-async def init_client():
-    global client
-    if client is None:
-        client = await get_client(token=token)
-        me = await client.account.fetch_me()
-        print(f"Authenticated as @{me.username}")
-    return client
-
-async def run_cai_async(message: str) -> str:
-    try:
-        cli = await init_client()
-        # chat, greeting_message = await client.chat.create_chat(character_id)
-        # print(f"{greeting_message.author_name}: {greeting_message.get_primary_candidate().text}")
-
-        response = await cli.chat.send_message(character_id, chat_id, message)
-        return f"[{response.author_name}]: {response.get_primary_candidate().text}"
-    except SessionClosedError:
-        return "Session closed. Please restart the backend."
-    except Exception as e:
-        return f"Error: {str(e)}"
+POOL_SIZE = int(os.getenv("CAI_POOL_SIZE", "3"))
+RECONNECT_ATTEMPTS = int(os.getenv("CAI_RECONNECT_ATTEMPTS", "6"))
+
+
+class CaiClientPool:
+    """
+    Pool of authenticated PyCharacterAI clients.
+    Messages to the same chat are sent one after the other in arrival order
+    (one FIFO lock per chat), different chats run in parallel on different
+    clients. A dropped session is closed and reconnected with exponential
+    backoff, and the message is retried if nothing was streamed yet.
+    """
+
+    def __init__(self, token, size=POOL_SIZE, client_factory=get_client,
+                 attempts=RECONNECT_ATTEMPTS, base_delay=0.5, max_delay=30.0):
+        self.token = token
+        self.client_factory = client_factory
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clients = [None] * size
+        self.connect_locks = [asyncio.Lock() for _ in range(size)]
+        self.free = asyncio.Queue()
+        for slot in range(size):
+            self.free.put_nowait(slot)
+        # A chat's lock lives while someone holds or waits on it, so ids seen once don't pile up
+        self.chat_locks = weakref.WeakValueDictionary()
+        self.reconnects = 0
+
+    async def client(self, slot):
+        """The slot's client, (re)connecting with exponential backoff if it has none."""
+        async with self.connect_locks[slot]:
+            if self.clients[slot] is not None:
+                return self.clients[slot]
+            for attempt in range(self.attempts):
+                try:
+                    cli = await self.client_factory(token=self.token)
+                    me = await cli.account.fetch_me()
+                    print(f"[CAI] client {slot} authenticated as @{me.username}")
+                    self.clients[slot] = cli
+                    return cli
+                except Exception as e:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                    print(f"[CAI] client {slot} connect failed ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+            raise ConnectionError(f"Character.AI unreachable after {self.attempts} attempts")
+
+    async def drop(self, slot):
+        cli, self.clients[slot] = self.clients[slot], None
+        self.reconnects += 1
+        if cli is not None:
+            try:
+                await cli.close_session()
+            except Exception:
+                pass
+
+    async def any_client(self):
+        slot = await self.free.get()
+        try:
+            return await self.client(slot)
+        finally:
+            self.free.put_nowait(slot)
+
+    async def stream(self, chat, message):
+        """Yields the cumulative reply turns for one message, in order for its chat."""
+        lock = self.chat_locks.setdefault(chat, asyncio.Lock())
+        async with lock:
+            slot = await self.free.get()
+            try:
+                for attempt in range(self.attempts):
+                    cli = await self.client(slot)
+                    started = False
+                    try:
+                        answer = await cli.chat.send_message(character_id, chat, message, streaming=True)
+                        async for response in answer:
+                            started = True
+                            yield response
+                        return
+                    except SessionClosedError:
+                        await self.drop(slot)
+                        if started:
+                            raise ConnectionError("Character.AI session dropped mid-reply, it will reconnect on the next message.")
+                raise ConnectionError("Character.AI session keeps dropping, giving up on this message.")
+            finally:
+                self.free.put_nowait(slot)
+
+    async def create_chat(self, character=None):
+        """Starts a new chat with the character and returns its chat id."""
+        cli = await self.any_client()
+        chat, greeting = await cli.chat.create_chat(character or character_id)
+        return chat.chat_id
+
+    async def close(self):
+        for slot in range(len(self.clients)):
+            cli, self.clients[slot] = self.clients[slot], None
+            if cli is not None:
+                await cli.close_session()
+
+
+pool = None
+
+def get_pool():
+    global pool
+    if pool is None:
+        pool = CaiClientPool(token)
+    return pool
+
+async def run_cai_async(message: str, chat: str = None) -> str:
+    return "".join([chunk async for chunk in stream_cai_async(message, chat)])
+
+async def stream_cai_async(message: str, chat: str = None):
+    """Streams the character's reply as text chunks, the first one is the '[name]: ' prefix."""
+    use_cache = not depends_on_state(message)
+    cache_key = cache.make_key(message, "character.ai", character_id or "")
+    if use_cache:
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    else:
+        cache.bypass()
+    reply = ""
+    sent = 0
+    async for response in get_pool().stream(chat or chat_id, message):
+        if not reply:
+            reply = f"[{response.author_name}]: "
+            yield reply
+        # Every update carries the whole text so far, only pass on what's new
+        text = response.get_primary_candidate().text
+        if len(text) > sent:
+            reply += text[sent:]
+            yield text[sent:]
+            sent = len(text)
+    if use_cache and reply:
+        await cache.aput(cache_key, "character.ai", reply)
+
+async def health_check() -> bool:
+    """Probe: an authenticated account fetch on one of the pooled clients."""
+    cli = await get_pool().any_client()
+    me = await cli.account.fetch_me()
+    return me is not None
 
 async def close_session():
-    await client.close_session()
+    if pool is not None:
+        await pool.close()
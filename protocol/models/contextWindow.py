@@ -0,0 +1,119 @@
+# protocol/models/contextWindow.py
+import asyncio
+from langchain_core.messages import SystemMessage, HumanMessage
+
+SUMMARY_PROMPT = (
+    "You maintain the running memory of a chat between a user and Yoimiya. "
+    "Update the summary below with the new exchange. Keep names, facts, promises, "
+    "open questions and the roleplay state. Reply with the summary only, under {words} words."
+)
+
+
+def estimate_tokens(message) -> int:
+    """Cheap token estimate (~4 chars per token) so counting never costs an API call."""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = len(content) // 4 + 4
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += len(str(call.get("args", ""))) // 4 + 4
+    return tokens
+
+
+class ConversationContext:
+    """
+    Sliding context window for one chat session.
+
+    The system prompt and the most recent turns are sent verbatim. When the
+    history goes over token_budget the oldest turns are folded into a rolling
+    summary, which is refreshed incrementally (old summary + dropped turns).
+    A turn is the list of messages from one user prompt (human, ai, tool...),
+    turns are never split so tool messages always follow their tool call.
+    """
+
+    def __init__(self, system_prompt, token_budget=8000, summary_tokens=600, summarizer=None):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.summary = ""
+        self.turns = []
+        self._folding = []   # turns being summarized right now, still sent until the summary lands
+        self._lock = asyncio.Lock()
+        self.compacting = None   # background compaction task, kept so it isn't garbage collected
+
+    def system_message(self):
+        content = self.system_prompt
+        if self.summary:
+            content += "\n\n### Summary of the earlier conversation\n" + self.summary
+        return SystemMessage(content=content)
+
+    def messages(self, pending=()):
+        """Messages to send to the model, pending is the turn in progress."""
+        history = [msg for turn in self._folding + self.turns for msg in turn]
+        return [self.system_message()] + history + list(pending)
+
+    def token_count(self):
+        return sum(estimate_tokens(msg) for msg in self.messages())
+
+    def _turn_tokens(self, turn):
+        return sum(estimate_tokens(msg) for msg in turn)
+
+    def add_turn(self, turn):
+        self.turns.append(list(turn))
+
+    def over_budget(self):
+        return self.token_count() > self.token_budget
+
+    def schedule_compaction(self):
+        """
+        Compacts in the background if the window is over budget and no compaction
+        is running yet. A running one already takes every turn added before it
+        got the lock; anything later is checked again after the next turn.
+        """
+        if self.compacting is not None and not self.compacting.done():
+            return self.compacting
+        if self.over_budget():
+            self.compacting = asyncio.create_task(self.compact())
+        return self.compacting
+
+    async def compact(self):
+        """Fold the oldest turns into the summary until the window fits the budget."""
+        async with self._lock:
+            if not self.over_budget():
+                return
+            # Leave about half the budget for recent turns so we don't summarize every turn
+            target = self.token_budget // 2 - estimate_tokens(self.system_message()) - self.summary_tokens
+            recent = sum(self._turn_tokens(turn) for turn in self.turns)
+            while len(self.turns) > 1 and recent > target:
+                recent -= self._turn_tokens(self.turns[0])
+                self._folding.append(self.turns.pop(0))
+            if not self._folding:
+                return
+            try:
+                self.summary = await self._summarize(self.summary, self._folding)
+            except Exception as e:
+                print(f"[Context] summary refresh failed, keeping a short excerpt: {e}")
+                self.summary = self._excerpt(self.summary, self._folding)
+            self._folding = []
+
+    async def _summarize(self, summary, turns):
+        if self.summarizer is None:
+            return self._excerpt(summary, turns)
+        transcript = "\n".join(
+            f"{msg.type}: {msg.content}" for turn in turns for msg in turn if msg.content
+        )
+        request = [
+            SystemMessage(content=SUMMARY_PROMPT.format(words=self.summary_tokens * 3 // 4)),
+            HumanMessage(content=f"Current summary:\n{summary or '(empty)'}\n\nNew exchange:\n{transcript}"),
+        ]
+        reply = await self.summarizer.ainvoke(request)
+        return reply.content.strip()
+
+    def _excerpt(self, summary, turns):
+        # Fallback when there is no summarizer: keep what the user asked, trimmed
+        lines = [summary] if summary else []
+        for turn in turns:
+            for msg in turn:
+                if msg.type == "human":
+                    lines.append(f"- user asked: {str(msg.content)[:200]}")
+        text = "\n".join(lines)
+        return text[-self.summary_tokens * 4:]
@@ -3,33 +3,37 @@ import os
 import sys
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI, HarmBlockThreshold, HarmCategory
-from langchain_core.messages import HumanMessage, ToolMessage
-from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 # Import tools dynamically
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(current_dir, '..', '..')
 sys.path.append(project_root)
-from protocol.tools.tool import sysPrompt, toolList, toolMap
+from protocol.tools.tool import sysPrompt, toolList
+from protocol.tools.toolRunner import run_tool_calls, MAX_TOOL_ROUNDS
+from protocol.models.contextWindow import ConversationContext
+from protocol.models.responseCache import cache, depends_on_state
 
 load_dotenv()
 
-# Store conversation state
-conversation = []
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Token budget for the history sent with every call
+CONTEXT_TOKENS = int(os.getenv("GEMINI_CONTEXT_TOKENS", "8000"))
+
+# Conversation state, one context window per session
+sessions = {}
+model = None
 toolBind = None
+probe_client = None
 
 
 def init_gemini():
     """Initialize Gemini model + tools."""
-    global toolBind
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", sysPrompt),
-        ("human", "{input}")
-    ])
+    global model, toolBind
 
     model = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
+        model=GEMINI_MODEL,
         safety_settings={
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.OFF,
         },
@@ -37,42 +41,108 @@ def init_gemini():
     toolBind = model.bind_tools(toolList)
 
 
-async def run_gemini_async(user_input: str) -> str:
-    """
-    Runs a single Gemini query asynchronously.
-    :param user_input: User's query
-    :param mode: Optional mode for prompt styling
-    """
-    global conversation, toolBind
+async def health_check() -> bool:
+    """Cheap probe: fetches the model's metadata, no tokens are spent."""
+    global probe_client
+    if probe_client is None:
+        from google import genai
+        probe_client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    info = await probe_client.aio.models.get(model=GEMINI_MODEL)
+    return info is not None
 
-    if toolBind is None:
-        init_gemini()
 
-    # Add user message
-    user_msg = HumanMessage(content=user_input)
-    conversation.append(user_msg)
+def get_session(session_id: str = "default") -> ConversationContext:
+    """Returns the context window for a session, creating it on first use."""
+    if session_id not in sessions:
+        sessions[session_id] = ConversationContext(sysPrompt, token_budget=CONTEXT_TOKENS, summarizer=model)
+    return sessions[session_id]
 
-    # Model turn
-    msg = toolBind.invoke(conversation)
-    conversation.append(msg)
 
-    # Handle tool calls
-    if msg.tool_calls:
-        tool_call = msg.tool_calls[0]
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-        tool_id = tool_call["id"]
+def text_of(chunk) -> str:
+    """Text part of a message chunk, Gemini sometimes sends a list of content parts."""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content)
 
-        # Call the tool
-        result = str(toolMap[tool_name](tool_args))
 
-        # Tool response
-        tool_msg = ToolMessage(content=result, tool_call_id=tool_id)
-        conversation.append(tool_msg)
+async def run_gemini_async(user_input: str, session_id: str = "default") -> str:
+    """
+    Runs a single Gemini query and returns the whole reply.
+    :param user_input: User's query
+    :param session_id: Conversation the query belongs to
+    """
+    return "".join([chunk async for chunk in stream_gemini_async(user_input, session_id)])
 
-        # Final model response after tool output
-        fres = toolBind.invoke(conversation)
-        conversation.append(fres)
-        return fres.content
+
+async def stream_gemini_async(user_input: str, session_id: str = "default"):
+    """
+    Streams a Gemini reply as text chunks without blocking the event loop.
+    Model turns use astream and tools run in a bounded thread pool, so several
+    prompts can be in flight on the same loop at once.
+    :param user_input: User's query
+    :param session_id: Conversation the query belongs to
+    """
+    if toolBind is None:
+        init_gemini()
+    context = get_session(session_id)
+
+    # Repeated standalone prompts are answered from the cache, follow-ups always go to the model
+    use_cache = not depends_on_state(user_input)
+    cache_key = cache.make_key(user_input, GEMINI_MODEL, sysPrompt)
+    if use_cache:
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            context.add_turn([HumanMessage(content=user_input), AIMessage(content=cached)])
+            yield cached
+            return
     else:
-        return msg.content
+        cache.bypass()
+
+    # Work on a snapshot so concurrent prompts don't interleave their messages,
+    # the finished turn is added to the session history in one go
+    turn = [HumanMessage(content=user_input)]
+    reply = []
+
+    # Model turns: stream the text out, add the chunks up to get the tool calls.
+    # Every requested tool runs concurrently, the results are fed back and this
+    # repeats until the model answers in text or the round cap is hit
+    rounds = 0
+    capped = False
+    runnable = toolBind
+    wrap_up = []
+    while True:
+        msg = None
+        async for chunk in runnable.astream(context.messages(turn + wrap_up)):
+            msg = chunk if msg is None else msg + chunk
+            text = text_of(chunk)
+            if text:
+                reply.append(text)
+                yield text
+        if msg is None:
+            break
+        turn.append(msg)
+        if not msg.tool_calls or capped:
+            break
+        if rounds < MAX_TOOL_ROUNDS:
+            rounds += 1
+            turn.extend(await run_tool_calls(msg.tool_calls))
+        else:
+            # Still asking for tools after the cap, answer the calls and get a text reply from the unbound model.
+            # Without tools bound it needs telling to answer; that request isn't kept in the history
+            turn.extend(
+                ToolMessage(content="Skipped: tool round limit reached, answer with what you have.", tool_call_id=call["id"])
+                for call in msg.tool_calls
+            )
+            wrap_up = [HumanMessage(content="No more tools can be used for this message. "
+                                            "Answer my last message now with what you have found so far.")]
+            runnable = model
+            capped = True
+
+    reply = "".join(reply)
+    # Tool results are live data, only plain answers are cached
+    if use_cache and rounds == 0 and reply:
+        await cache.aput(cache_key, GEMINI_MODEL, reply)
+
+    context.add_turn(turn)
+    # Summarize in the background, the reply doesn't wait for it
+    context.schedule_compaction()
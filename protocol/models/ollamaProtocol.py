@@ -0,0 +1,64 @@
+# protocol/models/ollamaProtocol.py
+import os
+import sys
+from dotenv import load_dotenv
+from langchain_ollama import ChatOllama
+from langchain_core.messages import HumanMessage
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..', '..')
+sys.path.append(project_root)
+from protocol.tools.tool import sysPrompt
+from protocol.models.contextWindow import ConversationContext
+
+load_dotenv()
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+CONTEXT_TOKENS = int(os.getenv("OLLAMA_CONTEXT_TOKENS", "4000"))
+
+# One context window per session, same as the Gemini backend
+sessions = {}
+model = None
+
+
+def init_ollama():
+    """Initialize the local Ollama chat model."""
+    global model
+    model = ChatOllama(model=OLLAMA_MODEL, base_url=OLLAMA_URL)
+
+
+def get_session(session_id: str = "default") -> ConversationContext:
+    if session_id not in sessions:
+        sessions[session_id] = ConversationContext(sysPrompt, token_budget=CONTEXT_TOKENS, summarizer=model)
+    return sessions[session_id]
+
+
+async def run_ollama_async(user_input: str, session_id: str = "default") -> str:
+    return "".join([chunk async for chunk in stream_ollama_async(user_input, session_id)])
+
+
+async def stream_ollama_async(user_input: str, session_id: str = "default"):
+    """Streams a reply from the local model as text chunks."""
+    if model is None:
+        init_ollama()
+    context = get_session(session_id)
+
+    turn = [HumanMessage(content=user_input)]
+    msg = None
+    async for chunk in model.astream(context.messages(turn)):
+        msg = chunk if msg is None else msg + chunk
+        if chunk.content:
+            yield chunk.content
+    if msg is not None:
+        turn.append(msg)
+        context.add_turn(turn)
+    context.schedule_compaction()
+
+
+async def health_check() -> bool:
+    """Probe: the Ollama server is up and has the model pulled."""
+    import ollama
+    listing = await ollama.AsyncClient(host=OLLAMA_URL).list()
+    names = [m.model for m in listing.models]
+    return any(name == OLLAMA_MODEL or name.split(":")[0] == OLLAMA_MODEL for name in names)
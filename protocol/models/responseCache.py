@@ -0,0 +1,189 @@
+# protocol/models/responseCache.py
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("utils", "responseCache.db"))
+CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY", "256"))
+CACHE_DISK_ENTRIES = int(os.getenv("RESPONSE_CACHE_DISK", "5000"))
+
+# Follow-ups like "tell me more" or "why did you say that" only make sense with
+# the conversation so far, the same words can need a different answer every time.
+# Only explicit references back count; a pronoun alone ("what is it used for") is
+# too common in standalone questions, except in a prompt too short to stand alone
+FOLLOW_UP = re.compile(
+    r"\b(tell me more|more (about|on) (it|that|this|them|those)|go on|keep going|continue|and then|"
+    r"what about|how about|(you|we) (just )?(say|said|mentioned|talked about|were saying)|"
+    r"your (last|previous|first) (answer|reply|message|point)|"
+    r"(the )?(above|previous|earlier|same|last) (one|answer|question|reply|message|thing)|again)\b",
+    re.IGNORECASE,
+)
+PRONOUN = re.compile(r"\b(it|that|this|those|these|them|he|him|she|her|they)\b", re.IGNORECASE)
+SHORT_PROMPT_WORDS = 5      # "is that true?", "who is she"
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.casefold().split()).rstrip(" .!?")
+
+
+def depends_on_state(prompt: str) -> bool:
+    """True for turns whose answer depends on the conversation so far."""
+    if FOLLOW_UP.search(prompt):
+        return True
+    return len(prompt.split()) <= SHORT_PROMPT_WORDS and bool(PRONOUN.search(prompt))
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Exact-match reply cache keyed on (normalized prompt, model, system prompt hash).
+    Two tiers: an in-memory LRU in front of a SQLite table. Entries expire after
+    ttl seconds and each tier is trimmed back to its size cap, least recently
+    used first. Async code uses aget()/aput(), which keep SQLite off the loop.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_memory=CACHE_MEMORY_ENTRIES, max_disk=CACHE_DISK_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.memory = OrderedDict()   # key -> (created, response)
+        self.lock = threading.Lock()       # memory tier and stats
+        self.db_lock = threading.Lock()    # the SQLite connection, only held off the event loop in async code
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "stored": 0}
+        self.db = None
+
+    def _connect(self):
+        if self.db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, used REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+        return self.db
+
+    @staticmethod
+    def make_key(prompt: str, model: str, system_prompt: str = "") -> str:
+        return hash_text("\x1f".join((model, hash_text(system_prompt), normalize_prompt(prompt))))
+
+    def get(self, key):
+        now = time.time()
+        found = self._memory_get(key, now)
+        return found if found is not None else self._disk_get(key, now)
+
+    async def aget(self, key):
+        """get() for async code: the memory tier inline, SQLite on a worker thread so the loop never waits on it."""
+        now = time.time()
+        found = self._memory_get(key, now)
+        return found if found is not None else await asyncio.to_thread(self._disk_get, key, now)
+
+    def put(self, key, model, response):
+        now = time.time()
+        self._remember(key, now, response)
+        self._disk_put(key, model, response, now)
+
+    async def aput(self, key, model, response):
+        now = time.time()
+        self._remember(key, now, response)
+        await asyncio.to_thread(self._disk_put, key, model, response, now)
+
+    def _memory_get(self, key, now):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self.memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[1]
+                del self.memory[key]
+        return None
+
+    def _disk_get(self, key, now):
+        with self.db_lock:
+            db = self._connect()
+            row = db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] < self.ttl:
+                db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+                db.commit()
+            elif row is not None:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+                row = None
+        if row is None:
+            with self.lock:
+                self.stats["misses"] += 1
+            return None
+        self._remember(key, row[1], row[0])
+        with self.lock:
+            self.stats["disk_hits"] += 1
+        return row[0]
+
+    def _disk_put(self, key, model, response, now):
+        with self.lock:
+            self.stats["stored"] += 1
+            # Trim every 1% of the cap so the table never overshoots by more than that
+            evict = self.stats["stored"] % max(1, self.max_disk // 100) == 0
+        with self.db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            if evict:
+                self._evict(db, now)
+            db.commit()
+
+    def bypass(self):
+        with self.lock:
+            self.stats["bypassed"] += 1
+
+    def _remember(self, key, created, response):
+        with self.lock:
+            self.memory[key] = (created, response)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_memory:
+                self.memory.popitem(last=False)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk,),
+        )
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+        with self.db_lock:
+            db = self._connect()
+            db.execute("DELETE FROM responses")
+            db.commit()
+
+    def summary(self) -> str:
+        with self.db_lock:
+            disk_entries = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        with self.lock:
+            stats = dict(self.stats)
+            memory_entries = len(self.memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        rate = f"{hits / lookups:.0%}" if lookups else "n/a"
+        return (f"Response cache: {hits} hits ({stats['memory_hits']} memory, {stats['disk_hits']} disk), "
+                f"{stats['misses']} misses, hit rate {rate}, {stats['bypassed']} bypassed, "
+                f"{memory_entries}/{self.max_memory} in memory, {disk_entries}/{self.max_disk} on disk")
+
+
+cache = ResponseCache()
@@ -0,0 +1,205 @@
+# protocol/models/scheduler.py
+import heapq
+import asyncio
+import itertools
+import threading
+from time import monotonic
+from collections import deque
+
+# Lower runs first: prompts typed in the GUI jump ahead of bulk terminal input
+PRIORITY_GUI = 0
+PRIORITY_TERMINAL = 10
+
+# lane -> (max concurrent jobs, requests per second, burst)
+LANE_LIMITS = {
+    "Gemini Model": (4, 1.0, 5),
+    "Character.AI Model": (2, 0.5, 2),
+    "Ollama Model": (1, 10.0, 10),
+}
+DEFAULT_LIMIT = (4, 5.0, 10)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = monotonic()
+
+    def refill(self):
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def wait(self):
+        """Returns once a token is available, without taking it."""
+        while True:
+            self.refill()
+            if self.tokens >= 1:
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def take(self):
+        self.refill()
+        self.tokens -= 1
+
+    async def acquire(self):
+        await self.wait()
+        self.take()
+
+
+class Job:
+    def __init__(self, job_id, lane, factory, priority, label):
+        self.id = job_id
+        self.lane = lane
+        self.factory = factory     # () -> coroutine, only called when the job starts
+        self.priority = priority
+        self.label = label
+        self.state = "queued"      # queued, running, done, failed, cancelled
+        self.error = None
+        self.created = monotonic()
+        self.started = None
+        self.finished = None
+        self.task = None
+
+    @property
+    def queue_wait(self):
+        return (self.started or self.finished or monotonic()) - self.created
+
+    @property
+    def run_time(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or monotonic()) - self.started
+
+    def summary(self):
+        text = f"#{self.id} [{self.state}] {self.lane} p{self.priority}: {self.label[:40]}"
+        text += f" (waited {self.queue_wait:.2f}s"
+        if self.started is not None:
+            text += f", ran {self.run_time:.2f}s"
+        return text + ")"
+
+
+class Lane:
+    """Queue, concurrency cap and rate limit for one backend."""
+
+    def __init__(self, name, concurrency, rate, burst):
+        self.name = name
+        self.heap = []
+        self.ready = asyncio.Event()
+        self.slots = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.dispatcher = None
+
+    def pop(self):
+        while self.heap:
+            job = heapq.heappop(self.heap)[2]
+            if job.state == "queued":
+                return job
+        return None
+
+
+class JobScheduler:
+    """
+    Priority queues between the panel and the backends. Every lane (backend)
+    has its own concurrency cap and token-bucket rate limit; within a lane the
+    lowest priority number runs first, then submission order. submit() and
+    cancel() are safe to call from any thread, everything else runs on `loop`.
+    """
+
+    def __init__(self, loop, limits=None, on_finish=None, history=50):
+        self.loop = loop
+        self.limits = dict(LANE_LIMITS if limits is None else limits)
+        self.on_finish = on_finish
+        self.lanes = {}
+        self.jobs = {}
+        self.history = deque(maxlen=history)
+        self.ids = itertools.count(1)
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+
+    def submit(self, lane, factory, priority=PRIORITY_GUI, label=""):
+        job = Job(next(self.ids), lane, factory, priority, label)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.loop.call_soon_threadsafe(self._enqueue, job)
+        return job
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job, returns False if there is no such live job."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state not in ("queued", "running"):
+                return False
+            if job.state == "queued":
+                job.state = "cancelled"
+                self.loop.call_soon_threadsafe(self._finish, job)
+            else:
+                self.loop.call_soon_threadsafe(lambda: job.task and job.task.cancel())
+        return True
+
+    def _lane(self, name):
+        lane = self.lanes.get(name)
+        if lane is None:
+            lane = Lane(name, *self.limits.get(name, DEFAULT_LIMIT))
+            lane.dispatcher = self.loop.create_task(self._dispatch(lane))
+            self.lanes[name] = lane
+        return lane
+
+    def _enqueue(self, job):
+        lane = self._lane(job.lane)
+        heapq.heappush(lane.heap, (job.priority, next(self.seq), job))
+        lane.ready.set()
+
+    async def _dispatch(self, lane):
+        while True:
+            await lane.ready.wait()
+            await lane.slots.acquire()
+            await lane.bucket.wait()
+            # Pop only once a slot and a token are ready, so a job that came in
+            # meanwhile with a higher priority still goes first. The token is only
+            # spent on a job: if the queue turned out empty (all cancelled) it stays
+            with self.lock:
+                job = lane.pop()
+                if job is not None:
+                    job.state = "running"
+            if job is None:
+                lane.slots.release()
+                lane.ready.clear()
+                continue
+            lane.bucket.take()
+            job.started = monotonic()
+            job.task = self.loop.create_task(self._run(job, lane))
+
+    async def _run(self, job, lane):
+        try:
+            await job.factory()
+            job.state = "done"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+        except Exception as e:
+            job.state = "failed"
+            job.error = e
+        finally:
+            lane.slots.release()
+            self._finish(job)
+
+    def _finish(self, job):
+        job.finished = monotonic()
+        with self.lock:
+            self.jobs.pop(job.id, None)
+        self.history.append(job)
+        if self.on_finish:
+            self.on_finish(job)
+
+    def summary(self):
+        with self.lock:
+            live = sorted(self.jobs.values(), key=lambda job: (job.state != "running", job.priority, job.id))
+        lines = [f"Jobs: {sum(j.state == 'running' for j in live)} running, {sum(j.state == 'queued' for j in live)} queued"]
+        lines += [f"  {job.summary()}" for job in live]
+        if self.history:
+            lines.append("Recent:")
+            lines += [f"  {job.summary()}" for job in list(self.history)[-5:]]
+        return "\n".join(lines)
@@ -1,82 +1,138 @@
-import pyaudio
-import wave
-import whisper
+import os
+import sys
+import asyncio
+import contextlib
 import numpy as np
-from time import time as t
 
-FORMAT = pyaudio.paInt16
-CHANNELS = 1
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from protocol.whisperModel import get_model
+from protocol.vad import VoiceActivityDetector
+from protocol.audioCapture import get_capture
+
 RATE = 16000
-model = whisper.load_model("base", device="cuda")  # Load Whisper model
-threshold=500
-silence_duration=3
-chunk_size=512
-duration_limit=60
-    
-   
-def record_audio():
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=chunk_size)
+# Seconds listen_async waits before giving up with "", off (0) by default: like
+# the old RECORD_PPR it waits for speech however long it takes
+LISTEN_TIMEOUT = float(os.getenv("LISTEN_TIMEOUT", "0")) or None
 
-    print("Recording...")
+# Streaming mode, the end of an utterance is the VAD's hangover (VAD_HANGOVER_MS)
+PARTIAL_EVERY = 0.5      # seconds of new speech between partial hypotheses
+PARTIAL_WINDOW = 6.0     # partials decode only the last few seconds
+MAX_UTTERANCE = 30.0     # Whisper's window, longer speech is finalized in pieces
+
+
+def whisper_transcribe(audio, partial=False):
+    # The shared model loads (and warms up) on first use, see whisperModel.py
+    return get_model().transcribe(audio, partial)
+
+
+class StreamingTranscriber:
+    """
+    Transcribes while the user is still speaking. Audio chunks go in, events
+    come out: ("partial", text) every PARTIAL_EVERY seconds of speech, decoded
+    from an overlapping window over the most recent audio, and ("final", text)
+    once the VAD ends the utterance. The VAD's pre-roll keeps the first
+    syllable. Everything stays in memory; decoding runs in a worker thread so
+    feeding never blocks.
+    """
+
+    def __init__(self, transcribe=whisper_transcribe, rate=RATE, vad=None,
+                 partial_every=PARTIAL_EVERY, partial_window=PARTIAL_WINDOW, max_utterance=MAX_UTTERANCE):
+        self.transcribe = transcribe
+        self.rate = rate
+        self.vad = vad or VoiceActivityDetector(rate)
+        self.partial_every = int(partial_every * rate)
+        self.partial_window = int(partial_window * rate)
+        self.max_utterance = int(max_utterance * rate)
+        self.reset()
+
+    def reset(self):
+        self.chunks = []
+        self.samples = 0
+        self.since_partial = 0
+        self.speaking = False
+        self.partial = None     # in-flight partial decode
+
+    def audio(self, last=None):
+        audio = np.concatenate(self.chunks) if self.chunks else np.zeros(0, np.float32)
+        return audio[-last:] if last else audio
 
-    frames = []
-    silence_counter = 0
-    start_time = t()
-    
-    while True:
-        data = stream.read(chunk_size, exception_on_overflow=False)
-        frames.append(data)
-        
-        # Convert audio chunk to numpy array to analyze sound energy
-        audio_data = np.frombuffer(data, dtype=np.int16)
-        energy = np.sum(audio_data ** 2) / len(audio_data)  # Calculate energy of the audio chunk
-
-        if energy < threshold:  # If energy is low, increase silence counter
-            silence_counter += 1
-        else:
-            silence_counter = 0  # Reset counter if speaking is detected
-
-        # Stop recording after a period of silence
-        if silence_counter > silence_duration * RATE / chunk_size or t() - start_time > duration_limit:
-            print("Silence detected or time limit reached, stopping recording.")
-            break
-
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-
-    # Save the recording to a file
-    with wave.open("voice\\recorded.wav", 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-
-    # Transcribe the audio
-    result = model.transcribe("voice\\recorded.wav", fp16=False, language='English')
-    msg = result["text"]
-    
-    return (msg)
+    async def feed(self, chunk):
+        """Adds a float32 chunk, returns the events it produced."""
+        events = []
+        for kind, data in self.vad.process(chunk):
+            if kind == "end":
+                # The hangover at the end is silence, no need to decode it
+                events += await self.finalize(trim=self.vad.hangover)
+                continue
+            self.speaking = True
+            self.chunks.append(data)
+            self.samples += len(data)
+            self.since_partial += len(data)
+            if self.samples >= self.max_utterance:
+                events += await self.finalize()
+
+        if self.partial is not None and self.partial.done():
+            text = self.partial.result()
+            self.partial = None
+            if text:
+                events.append(("partial", text))
+
+        if self.speaking and self.vad.voiced and self.partial is None and self.since_partial >= self.partial_every:
+            # At most one partial decode in flight, when it's slow the next one just starts later
+            self.since_partial = 0
+            self.partial = asyncio.ensure_future(
+                asyncio.to_thread(self.transcribe, self.audio(self.partial_window), True))
+        return events
+
+    async def finalize(self, trim=0):
+        if self.partial is not None:
+            # Let an in-flight partial finish rather than decode twice at once on the same model
+            await asyncio.gather(self.partial, return_exceptions=True)
+        audio = self.audio()
+        if trim:
+            audio = audio[:max(len(audio) - trim, 0)]
+        self.reset()
+        if len(audio) == 0:
+            return []
+        text = await asyncio.to_thread(self.transcribe, audio, False)
+        return [("final", text)] if text else []
+
+    async def stream(self, chunks):
+        """Async iterator of float32 chunks -> async iterator of (kind, text) events."""
+        async for chunk in chunks:
+            for event in await self.feed(chunk):
+                yield event
+        if self.speaking:
+            for event in await self.finalize():
+                yield event
+
+
+async def listen_async(on_partial=print, capture=None, timeout=LISTEN_TIMEOUT):
+    """
+    Transcribes one utterance from the shared capture (the microphone by default), reporting partial text as it goes.
+    An utterance is at most MAX_UTTERANCE long; timeout (seconds of audio, None for no limit) caps the whole call.
+    """
+    capture = capture or get_capture()
+    transcriber = StreamingTranscriber(rate=capture.rate)
+    async with contextlib.aclosing(capture.subscribe(timeout)) as chunks:
+        async with contextlib.aclosing(transcriber.stream(chunks)) as events:
+            async for kind, text in events:
+                if kind == "partial":
+                    on_partial(text)
+                else:
+                    return text
+    return ""
+
+
+def record_audio():
+    print("Recording...")
+    return asyncio.run(listen_async(lambda text: print(f"... {text}")))
 
 def RECORD_PPR():
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=chunk_size)
-    while True:
-        data = stream.read(chunk_size, exception_on_overflow=False) #512 is the chunk size
-        audio_data = np.frombuffer(data, dtype=np.int16)
-        energyR = np.sum(audio_data ** 2) / len(audio_data)
-        print(energyR)
-
-        if energyR > 2000:
-            print("\nWaiting for next speech...\n")
-            return (record_audio())
-            
\ No newline at end of file
+    # Load Whisper while waiting for the user to start talking; the VAD waits
+    # for speech itself and its pre-roll keeps the words that triggered it
+    get_model().preload()
+    print("\nWaiting for next speech...\n")
+    return record_audio()
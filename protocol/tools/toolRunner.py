@@ -0,0 +1,129 @@
+# protocol/tools/toolRunner.py
+import os
+import asyncio
+import threading
+from time import perf_counter
+from langchain_core.messages import ToolMessage
+
+from protocol.tools.tool import toolMap
+
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "4"))
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "5"))
+
+# Tools are plain blocking functions (openCamera loops until 'q'). Each call runs
+# on its own thread, at most TOOL_WORKERS at once, so they can neither stall the
+# event loop nor starve to_thread. A call that times out gives its slot back and
+# is left to finish in the background, so a stuck tool doesn't block later ones.
+slots = threading.Semaphore(TOOL_WORKERS)
+
+# name -> {"calls", "total", "max", "last", "timeouts", "errors"}
+timings = {}
+
+
+def record(name, seconds, outcome="ok"):
+    stats = timings.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0, "last": 0.0, "timeouts": 0, "errors": 0})
+    stats["calls"] += 1
+    stats["total"] += seconds
+    stats["max"] = max(stats["max"], seconds)
+    stats["last"] = seconds
+    if outcome == "timeout":
+        stats["timeouts"] += 1
+    elif outcome == "error":
+        stats["errors"] += 1
+
+
+class ToolThread(threading.Thread):
+    """One tool call: waits for a free slot, then runs the tool and hands the outcome to the loop."""
+
+    def __init__(self, tool, args, loop):
+        super().__init__(name=f"tool-{tool.name}", daemon=True)
+        self.tool = tool
+        self.args = args
+        self.loop = loop
+        self.started = asyncio.Event()
+        self.done = loop.create_future()
+        self.start_time = None      # when the tool began running, queueing for a slot excluded
+        self.lock = threading.Lock()
+        self.released = False
+
+    def release(self):
+        # When the tool returns or when it is given up on, whichever comes first
+        with self.lock:
+            if not self.released:
+                self.released = True
+                slots.release()
+
+    def elapsed(self):
+        return perf_counter() - self.start_time
+
+    def notify(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass    # the loop has closed, nobody is waiting any more
+
+    def finish(self, result, error):
+        if self.done.done():    # timed out
+            return
+        if error is not None:
+            self.done.set_exception(error)
+        else:
+            self.done.set_result(result)
+
+    def run(self):
+        slots.acquire()
+        self.start_time = perf_counter()
+        self.notify(self.started.set)
+        result = error = None
+        try:
+            result = self.tool.invoke(self.args)
+        except Exception as e:
+            error = e
+        finally:
+            self.release()
+        self.notify(self.finish, result, error)
+
+
+async def run_tool(tool_call, timeout=TOOL_TIMEOUT) -> ToolMessage:
+    """Runs one tool call on a tool thread and turns the outcome, good or bad, into a ToolMessage."""
+    name = tool_call["name"]
+    tool_id = tool_call["id"]
+    tool = toolMap.get(name)
+    if tool is None:
+        return ToolMessage(content=f"Error: unknown tool '{name}'", tool_call_id=tool_id)
+
+    call = ToolThread(tool, tool_call["args"], asyncio.get_running_loop())
+    call.start()
+    # Waiting for a slot counts against neither the timeout nor the timings
+    await call.started.wait()
+    try:
+        result = await asyncio.wait_for(call.done, timeout)
+        record(name, call.elapsed())
+        return ToolMessage(content=str(result), tool_call_id=tool_id)
+    except asyncio.TimeoutError:
+        # The thread can't be killed, it finishes in the background without its slot
+        call.release()
+        record(name, call.elapsed(), "timeout")
+        return ToolMessage(content=f"Error: tool '{name}' timed out after {timeout:.0f}s", tool_call_id=tool_id)
+    except Exception as e:
+        record(name, call.elapsed(), "error")
+        return ToolMessage(content=f"Error: tool '{name}' failed: {e}", tool_call_id=tool_id)
+
+
+async def run_tool_calls(tool_calls, timeout=TOOL_TIMEOUT):
+    """Runs every tool call of a model turn concurrently, results come back in call order."""
+    return await asyncio.gather(*(run_tool(call, timeout) for call in tool_calls))
+
+
+def timing_summary() -> str:
+    if not timings:
+        return "No tools have run yet."
+    lines = ["Tool timings (slowest first):"]
+    for name, stats in sorted(timings.items(), key=lambda item: item[1]["total"] / item[1]["calls"], reverse=True):
+        lines.append(
+            f"  {name}: {stats['calls']} calls, avg {stats['total'] / stats['calls']:.2f}s, "
+            f"max {stats['max']:.2f}s, last {stats['last']:.2f}s, "
+            f"{stats['timeouts']} timeouts, {stats['errors']} errors"
+        )
+    return "\n".join(lines)
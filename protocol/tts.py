@@ -0,0 +1,405 @@
+# protocol/tts.py
+# Text to speech for replies. Text is cut into sentences as it arrives, the
+# first sentence starts playing while the next ones are still being
+# synthesized, and the audio of every sentence is kept in a disk cache.
+import io
+import os
+import re
+import sys
+import math
+import wave
+import time
+import shutil
+import asyncio
+import queue
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import perf_counter
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(current_dir, '..')
+sys.path.append(project_root)
+from protocol.models.responseCache import hash_text
+
+TTS_ENGINE = os.getenv("TTS_ENGINE", "auto")
+TTS_VOICE = os.getenv("TTS_VOICE", "")
+TTS_RATE = int(os.getenv("TTS_RATE", "175"))       # words per minute
+TTS_CACHE_PATH = os.getenv("TTS_CACHE_PATH", os.path.join("utils", "ttsCache"))
+TTS_CACHE_MB = float(os.getenv("TTS_CACHE_MB", "200"))
+SYNTH_AHEAD = int(os.getenv("TTS_SYNTH_AHEAD", "3"))   # sentences synthesized ahead of playback
+MAX_SENTENCE_CHARS = 220
+
+# A sentence ends at . ! ? or a line break, followed by whitespace
+SENTENCE_END = re.compile(r"([.!?…][\"')\]]*)\s+|\n+")
+
+
+class SentenceSplitter:
+    """Cuts streamed text into sentences as soon as each one is complete."""
+
+    def __init__(self, max_chars=MAX_SENTENCE_CHARS):
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        while True:
+            match = SENTENCE_END.search(self.buffer)
+            if match is None:
+                break
+            sentences.append(self.buffer[:match.end(1) if match.group(1) else match.start()])
+            self.buffer = self.buffer[match.end():]
+        # Very long run-on text is cut at the last comma or space so audio doesn't wait on it
+        while len(self.buffer) > self.max_chars:
+            cut = max(self.buffer.rfind(",", 0, self.max_chars), self.buffer.rfind(" ", 0, self.max_chars))
+            cut = cut + 1 if cut > 0 else self.max_chars
+            sentences.append(self.buffer[:cut])
+            self.buffer = self.buffer[cut:]
+        return [s.strip() for s in sentences if s.strip()]
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def split_sentences(text):
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+def to_int16(audio):
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def wav_bytes_to_audio(data):
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        rate, width, channels = wf.getframerate(), wf.getsampwidth(), wf.getnchannels()
+        frames = wf.readframes(wf.getnframes())
+    audio = np.frombuffer(frames[:len(frames) // (width * channels) * width * channels], dtype=np.int16)
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio.astype(np.float32) / 32768, rate
+
+
+# Engines: synthesize(text) -> (float32 mono audio in -1..1, sample rate). Blocking, called from a worker thread.
+
+class ToneEngine:
+    """Deterministic beeps in the rhythm of the text, for machines without a speech engine."""
+    name = "tone"
+
+    def __init__(self, sample_rate=22050, chars_per_second=15):
+        self.sample_rate = sample_rate
+        self.chars_per_second = chars_per_second
+        self.voice = ""
+
+    def synthesize(self, text):
+        t = np.arange(int(len(text) / self.chars_per_second * self.sample_rate)) / self.sample_rate
+        pitch = 180 + 40 * np.sin(2 * math.pi * 0.5 * t)
+        envelope = 0.5 + 0.5 * np.sin(2 * math.pi * 4 * t)
+        return (0.3 * envelope * np.sin(2 * math.pi * pitch * t)).astype(np.float32), self.sample_rate
+
+
+class EspeakEngine:
+    """espeak-ng (or espeak) in a subprocess, audio read straight from its stdout."""
+    name = "espeak"
+
+    def __init__(self, voice=TTS_VOICE, rate=TTS_RATE):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        if self.binary is None:
+            raise RuntimeError("espeak-ng not found")
+        self.voice = voice or "en-us"
+        self.rate = rate
+
+    def synthesize(self, text):
+        out = subprocess.run([self.binary, "--stdout", "-v", self.voice, "-s", str(self.rate), text],
+                             capture_output=True, check=True, timeout=60).stdout
+        return wav_bytes_to_audio(out)
+
+
+class Pyttsx3Engine:
+    """
+    The OS speech engine (SAPI5, NSSpeechSynthesizer or espeak) through pyttsx3.
+    SAPI5 is a COM object that belongs to the thread that made it, so the engine
+    is created and driven on one thread of its own; synthesize() hands it work.
+    """
+    name = "pyttsx3"
+
+    def __init__(self, voice=TTS_VOICE, rate=TTS_RATE):
+        self.jobs = queue.Queue()
+        ready = Future()
+        self.thread = threading.Thread(target=self.run, args=(voice, rate, ready), name="pyttsx3", daemon=True)
+        self.thread.start()
+        self.voice = ready.result()     # raises what pyttsx3.init() raised
+
+    def run(self, voice, rate, ready):
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty("rate", rate)
+            if voice:
+                engine.setProperty("voice", voice)
+            ready.set_result(voice or engine.getProperty("voice") or "")
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        while True:
+            text, path, done = self.jobs.get()
+            try:
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                done.set_result(None)
+            except Exception as e:
+                done.set_exception(e)
+
+    def synthesize(self, text):
+        # pyttsx3 can only render to a file
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            done = Future()
+            self.jobs.put((text, path, done))
+            done.result()
+            with open(path, "rb") as f:
+                return wav_bytes_to_audio(f.read())
+        finally:
+            os.remove(path)
+
+
+ENGINES = {
+    "pyttsx3": Pyttsx3Engine,
+    "espeak": EspeakEngine,
+    "tone": ToneEngine,
+}
+
+
+def make_engine(name=TTS_ENGINE):
+    """
+    Builds an engine by name, 'auto' takes the first real one that works.
+    The beeping tone engine is only used when asked for (TTS_ENGINE=tone).
+    """
+    if name != "auto":
+        return ENGINES[name]()
+    errors = []
+    for candidate in ("pyttsx3", "espeak"):
+        try:
+            engine = ENGINES[candidate]()
+        except Exception as e:
+            errors.append(f"{candidate}: {e}")
+            print(f"[TTS] {candidate} unavailable ({e})")
+            continue
+        print(f"[TTS] speaking with {candidate}")
+        return engine
+    raise RuntimeError("No speech engine available (" + "; ".join(errors) + "), "
+                       "install pyttsx3 or espeak-ng, or set TTS_ENGINE=tone")
+
+
+class PhraseCache:
+    """
+    Synthesized sentences on disk as WAV files named by the hash of
+    (engine, voice, text). The least recently used files are deleted once
+    the directory grows over max_bytes.
+    """
+
+    def __init__(self, path=TTS_CACHE_PATH, max_bytes=TTS_CACHE_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.index = None    # key -> size, least recently used first
+        self.total = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def _load(self):
+        if self.index is None:
+            os.makedirs(self.path, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(".wav"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+            self.index = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self.total = sum(self.index.values())
+
+    @staticmethod
+    def make_key(text, engine):
+        return hash_text("\x1f".join((engine.name, str(engine.voice), " ".join(text.split()))))
+
+    def file(self, key):
+        return os.path.join(self.path, key + ".wav")
+
+    def get(self, key):
+        with self.lock:
+            self._load()
+            if key not in self.index:
+                self.stats["misses"] += 1
+                return None
+            self.index.move_to_end(key)
+            self.stats["hits"] += 1
+        try:
+            with open(self.file(key), "rb") as f:
+                data = f.read()
+            os.utime(self.file(key))   # keeps the LRU order across restarts
+        except OSError:
+            with self.lock:
+                self.total -= self.index.pop(key, 0)
+            return None
+        return wav_bytes_to_audio(data)
+
+    def put(self, key, audio, sample_rate):
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(to_int16(audio).tobytes())
+        data = buf.getvalue()
+        with self.lock:
+            self._load()
+            with open(self.file(key), "wb") as f:
+                f.write(data)
+            self.total += len(data) - self.index.pop(key, 0)
+            self.index[key] = len(data)
+            self.stats["stored"] += 1
+            while self.total > self.max_bytes and len(self.index) > 1:
+                old, size = self.index.popitem(last=False)
+                self.total -= size
+                self.stats["evicted"] += 1
+                try:
+                    os.remove(self.file(old))
+                except OSError:
+                    pass
+
+    def summary(self):
+        with self.lock:
+            self._load()
+            return (f"TTS cache: {len(self.index)} phrases, {self.total / 1024 / 1024:.1f}/"
+                    f"{self.max_bytes / 1024 / 1024:.0f} MB, {self.stats['hits']} hits, "
+                    f"{self.stats['misses']} misses, {self.stats['evicted']} evicted")
+
+
+# Players: play(audio, sample_rate) blocks until the audio has been played
+
+class SoundDevicePlayer:
+    name = "sounddevice"
+
+    def __init__(self):
+        import sounddevice
+        self.sd = sounddevice
+
+    def play(self, audio, sample_rate):
+        self.sd.play(audio, sample_rate)
+        self.sd.wait()
+
+
+class NullPlayer:
+    """Takes as long as the audio lasts (divided by speed) without making a sound."""
+    name = "none"
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+
+    def play(self, audio, sample_rate):
+        time.sleep(len(audio) / sample_rate / self.speed)
+
+
+def make_player():
+    try:
+        player = SoundDevicePlayer()
+    except Exception as e:
+        print(f"[TTS] no audio output ({e}), replies will be silent")
+        return NullPlayer()
+    print(f"[TTS] playing through {player.name}")
+    return player
+
+
+DEFAULT_CACHE = object()   # Speaker's default: a PhraseCache at TTS_CACHE_PATH; cache=None turns caching off
+
+
+class Speaker:
+    """
+    Speaks text or a stream of text chunks: one task synthesizes sentence by
+    sentence (up to SYNTH_AHEAD ahead), another plays them in order.
+    Listeners get every sentence's audio just before it plays, e.g. for lip-sync.
+    """
+
+    def __init__(self, engine=None, player=None, cache=DEFAULT_CACHE, ahead=SYNTH_AHEAD):
+        self.engine = engine or make_engine()
+        self.player = player or make_player()
+        self.cache = PhraseCache() if cache is DEFAULT_CACHE else cache
+        self.ahead = ahead
+        self.listeners = []
+
+    async def synthesize(self, sentence):
+        key = self.cache.make_key(sentence, self.engine) if self.cache is not None else None
+        if key is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+        audio, rate = await asyncio.to_thread(self.engine.synthesize, sentence)
+        if key is not None:
+            await asyncio.to_thread(self.cache.put, key, audio, rate)
+        return audio, rate
+
+    async def speak(self, text):
+        """
+        Speaks `text` (a string or an async iterator of chunks, like a model reply stream).
+        Returns timings: time to first audio, total time and the number of sentences.
+        """
+        start = perf_counter()
+        queue = asyncio.Queue(maxsize=self.ahead)
+        stats = {"sentences": 0, "first_audio": None}
+
+        async def sentences():
+            splitter = SentenceSplitter()
+            if isinstance(text, str):
+                for sentence in splitter.feed(text):
+                    yield sentence
+            else:
+                async for chunk in text:
+                    for sentence in splitter.feed(chunk):
+                        yield sentence
+            for sentence in splitter.flush():
+                yield sentence
+
+        async def produce():
+            try:
+                async for sentence in sentences():
+                    await queue.put(await self.synthesize(sentence))
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                audio, rate = item
+                if stats["first_audio"] is None:
+                    stats["first_audio"] = perf_counter() - start
+                for listener in self.listeners:
+                    listener(audio, rate)
+                await asyncio.to_thread(self.player.play, audio, rate)
+                stats["sentences"] += 1
+            await producer
+        finally:
+            producer.cancel()
+        stats["total"] = perf_counter() - start
+        return stats
+
+
+speaker = None
+
+def get_speaker():
+    global speaker
+    if speaker is None:
+        speaker = Speaker()
+    return speaker
+
+async def speak_async(text):
+    return await get_speaker().speak(text)
+
+
+if __name__ == "__main__":
+    print(asyncio.run(speak_async(" ".join(sys.argv[1:]) or "Hello! This is a text to speech test.")))
@@ -0,0 +1,121 @@
+# protocol/vad.py
+# Voice activity detection on float audio. Energy and zero-crossing rate are
+# computed for all frames of a chunk at once; a small per-frame state machine
+# then applies the adaptive noise floor, hysteresis and hangover.
+import os
+from collections import deque
+
+import numpy as np
+
+FRAME_MS = 20
+START_DB = float(os.getenv("VAD_START_DB", "12"))    # over the noise floor to start speech
+STOP_DB = float(os.getenv("VAD_STOP_DB", "6"))       # over the noise floor to stay in speech
+START_FRAMES = 3          # frames in a row over START_DB before speech starts
+HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "700"))
+PREROLL_MS = 300
+ZCR_MAX = 0.35            # noise-like frames cross zero far more often than voiced speech
+LOUD_DB = 25              # inside speech, this far over the floor counts whatever the ZCR (fricatives)
+MIN_FLOOR_DB = -75.0
+
+
+def frame_features(frames):
+    """Energy in dBFS and zero-crossing rate for every row of a (frames, samples) array."""
+    energy = 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-12)
+    zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+    return energy, zcr
+
+
+class VoiceActivityDetector:
+    """
+    process(chunk) takes float32 audio of any length and returns events:
+      ("start", audio)   speech began, audio includes the pre-roll before it
+      ("speech", audio)  more audio of the current utterance (hangover included)
+      ("end", (start, end))  the hangover ran out; the utterance's sample range in
+                             the whole stream, pre-roll and hangover left out
+    The noise floor follows the background level: it drops quickly to quieter
+    frames and only creeps up, and only outside speech.
+    """
+
+    def __init__(self, rate=16000, frame_ms=FRAME_MS, start_db=START_DB, stop_db=STOP_DB,
+                 start_frames=START_FRAMES, hangover_ms=HANGOVER_MS, preroll_ms=PREROLL_MS):
+        self.rate = rate
+        self.frame = rate * frame_ms // 1000
+        self.start_db = start_db
+        self.stop_db = stop_db
+        self.start_frames = start_frames
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.hangover = self.hangover_frames * self.frame
+        self.preroll = deque(maxlen=max(1, preroll_ms // frame_ms) + start_frames)
+        self.remainder = np.zeros(0, np.float32)
+        self.floor = None
+        self.active = False
+        self.voiced = False       # whether the last frame itself was speech (not hangover)
+        self.run = 0              # consecutive frames over START_DB while inactive
+        self.quiet = 0            # frames since the last voiced frame while active
+        self.frames_seen = 0
+        self.started_at = 0       # first speech sample of the current utterance
+
+    def process(self, chunk):
+        audio = np.concatenate([self.remainder, chunk]) if len(self.remainder) else np.asarray(chunk, np.float32)
+        count = len(audio) // self.frame
+        self.remainder = audio[count * self.frame:]
+        if count == 0:
+            return []
+        frames = audio[:count * self.frame].reshape(count, self.frame)
+        energy, zcr = frame_features(frames)
+
+        events = []
+        speech = []    # frames of the current utterance, sent as one event per call
+
+        def flush():
+            if speech:
+                events.append(("speech", np.concatenate(speech)))
+                speech.clear()
+
+        for i in range(count):
+            db = energy[i]
+            if self.floor is None:
+                self.floor = max(db, MIN_FLOOR_DB)
+            over = db - self.floor
+            voiced_like = zcr[i] <= ZCR_MAX
+            self.frames_seen += 1
+
+            if not self.active:
+                self.preroll.append(frames[i])
+                # Only voiced-sounding frames can start speech, so clicks and hiss don't
+                self.run = self.run + 1 if over >= self.start_db and voiced_like else 0
+                if self.run >= self.start_frames:
+                    self.active = self.voiced = True
+                    self.quiet = 0
+                    self.started_at = (self.frames_seen - self.start_frames) * self.frame
+                    events.append(("start", np.concatenate(self.preroll)))
+                    self.preroll.clear()
+                else:
+                    self.voiced = False
+                    self.track_floor(db)
+                continue
+
+            self.voiced = over >= self.stop_db and (voiced_like or over >= LOUD_DB)
+            self.quiet = 0 if self.voiced else self.quiet + 1
+            speech.append(frames[i])
+            if self.quiet >= self.hangover_frames:
+                flush()
+                self.active = False
+                self.run = 0
+                events.append(("end", (self.started_at, (self.frames_seen - self.quiet) * self.frame)))
+        flush()
+        return events
+
+    def track_floor(self, db):
+        if db < self.floor:
+            self.floor += 0.5 * (db - self.floor)
+        else:
+            self.floor += 0.01 * (db - self.floor)
+        self.floor = max(self.floor, MIN_FLOOR_DB)
+
+    def segments(self, audio):
+        """(start, end) sample ranges of the speech in a whole buffer."""
+        found = [span for kind, span in self.process(audio) if kind == "end"]
+        if self.active:
+            found.append((self.started_at, (self.frames_seen - self.quiet) * self.frame))
+        return found
@@ -0,0 +1,149 @@
+# protocol/whisperModel.py
+# One shared Whisper model, loaded on first use on the best device available.
+# On CUDA it runs in fp16. On CPU it uses faster-whisper int8 when installed,
+# otherwise openai-whisper with its Linear layers dynamically quantized.
+import os
+import threading
+from time import perf_counter
+
+import numpy as np
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")          # tiny, base, small, medium, large-v3, ...
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")        # auto, cuda, cpu
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "auto")      # auto, faster-whisper, openai
+WHISPER_QUANTIZE = os.getenv("WHISPER_QUANTIZE", "1") != "0"  # int8 on CPU
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "1") != "0"
+LANGUAGE = "en"
+SAMPLE_RATE = 16000
+
+
+def cuda_available():
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        try:
+            import ctranslate2
+            return ctranslate2.get_cuda_device_count() > 0
+        except ImportError:
+            return False
+
+
+class WhisperManager:
+    """
+    Lazily loaded Whisper model shared by everything in the process.
+    transcribe() and segments() are serialized with a lock, so the mic loop
+    and a batch job can use the same instance from different threads.
+    """
+
+    def __init__(self, size=WHISPER_MODEL, device=WHISPER_DEVICE, backend=WHISPER_BACKEND,
+                 quantize=WHISPER_QUANTIZE, warmup=WHISPER_WARMUP):
+        self.size = size
+        self.device = device
+        self.backend = backend
+        self.quantize = quantize
+        self.warmup_on_load = warmup
+        self.model = None
+        self.precision = None
+        self.load_time = None
+        self.load_lock = threading.Lock()
+        self.run_lock = threading.Lock()
+
+    def load(self):
+        if self.model is not None:
+            return self.model
+        with self.load_lock:
+            if self.model is None:
+                start = perf_counter()
+                device = self.device if self.device != "auto" else ("cuda" if cuda_available() else "cpu")
+                try:
+                    self._load(device)
+                except Exception as e:
+                    if device == "cpu":
+                        raise
+                    print(f"[Whisper] loading on {device} failed ({e}), falling back to CPU")
+                    self._load("cpu")
+                self.load_time = perf_counter() - start
+                print(f"[Whisper] {self.summary()}")
+                if self.warmup_on_load:
+                    self.warmup()
+        return self.model
+
+    def _load(self, device):
+        backend = self.backend
+        if backend == "auto":
+            # faster-whisper's int8 CPU kernels are much quicker than torch's, prefer it there
+            backend = "openai"
+            if device == "cpu":
+                try:
+                    import faster_whisper  # noqa: F401
+                    backend = "faster-whisper"
+                except ImportError:
+                    pass
+        if backend == "faster-whisper":
+            from faster_whisper import WhisperModel
+            precision = "float16" if device == "cuda" else ("int8" if self.quantize else "float32")
+            model = WhisperModel(self.size, device=device, compute_type=precision)
+        else:
+            import whisper
+            model = whisper.load_model(self.size, device=device)
+            precision = "float16" if device == "cuda" else "float32"
+            if device == "cpu" and self.quantize:
+                import torch
+                # whisper's layers are its own nn.Linear subclass, and quantize_dynamic matches exact types
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear, whisper.model.Linear},
+                                                            dtype=torch.qint8)
+                swapped = sum(isinstance(m, torch.nn.quantized.dynamic.Linear) for m in model.modules())
+                if swapped:
+                    precision = f"int8 (dynamic, {swapped} layers)"
+                else:
+                    print("[Whisper] dynamic quantization found no Linear layers, running float32")
+        # segments() reads backend and device once it sees the model, so they go first
+        self.backend = backend
+        self.device = device
+        self.precision = precision
+        self.model = model
+
+    def warmup(self):
+        """One short decode so the first real utterance doesn't pay for kernel setup."""
+        start = perf_counter()
+        self.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+        print(f"[Whisper] warmed up in {perf_counter() - start:.2f}s")
+
+    def preload(self):
+        """Loads (and warms up) in a background thread, returns the thread."""
+        thread = threading.Thread(target=self.load, daemon=True)
+        thread.start()
+        return thread
+
+    def segments(self, audio, partial=False):
+        """[(start seconds, end seconds, text)] for 16 kHz float32 audio."""
+        model = self.load()
+        with self.run_lock:
+            if self.backend == "faster-whisper":
+                found, _ = model.transcribe(audio, language=LANGUAGE, beam_size=1 if partial else 5,
+                                            condition_on_previous_text=False, without_timestamps=partial)
+                return [(s.start, s.end, s.text.strip()) for s in found]
+            result = model.transcribe(audio, language=LANGUAGE, fp16=self.device == "cuda",
+                                      condition_on_previous_text=False, without_timestamps=partial)
+            return [(s["start"], s["end"], s["text"].strip()) for s in result["segments"]]
+
+    def transcribe(self, audio, partial=False):
+        return " ".join(text for _, _, text in self.segments(audio, partial) if text)
+
+    def summary(self):
+        if self.model is None:
+            return f"{self.size} (not loaded)"
+        return f"{self.size} on {self.device} via {self.backend}, {self.precision}, loaded in {self.load_time:.1f}s"
+
+
+shared = None
+shared_lock = threading.Lock()
+
+def get_model():
+    """The process-wide model manager (not loaded until first used)."""
+    global shared
+    with shared_lock:
+        if shared is None:
+            shared = WhisperManager()
+        return shared
@@ -0,0 +1,90 @@
+# Labelled WAV fixtures for the speech benchmarks. Each fixture is a plan of
+# (kind, seconds) parts; the speech parts' ranges are written next to the WAV
+# as <name>.json so real recordings can be labelled the same way.
+import os
+import json
+import wave
+
+import numpy as np
+
+RATE = 16000
+
+
+def speech_like(seconds, rate, rng, level=0.3):
+    """Voiced tones with syllable-rate loudness changes and unvoiced (noisy) consonants."""
+    t = np.arange(int(seconds * rate)) / rate
+    syllables = 0.4 + 0.6 * np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, 6)), 0, None)
+    pitch = 120 + 50 * np.sin(2 * np.pi * 0.4 * t + rng.uniform(0, 6))
+    voiced = np.sin(2 * np.pi * np.cumsum(pitch) / rate) + 0.4 * np.sin(4 * np.pi * np.cumsum(pitch) / rate)
+    consonants = (np.sin(2 * np.pi * 4 * t) < -0.8) * rng.standard_normal(len(t)) * 0.3
+    return (level * (syllables * voiced + consonants)).astype(np.float32)
+
+
+def render(plan, rate=RATE, noise_db=-60.0, noise_ramp_db=0.0, seed=0):
+    """Audio and speech labels [(start s, end s)] for a plan like [("silence", 1), ("speech", 2.5)]."""
+    rng = np.random.default_rng(seed)
+    parts, labels, position = [], [], 0.0
+    for kind, seconds, *level in plan:
+        n = int(seconds * rate)
+        if kind == "speech":
+            parts.append(speech_like(seconds, rate, rng, *level))
+            labels.append((position, position + n / rate))
+        elif kind == "noise":   # keyboard / fan bursts: loud but not speech
+            parts.append((rng.standard_normal(n) * (level[0] if level else 0.05)).astype(np.float32))
+        else:
+            parts.append(np.zeros(n, np.float32))
+        position += n / rate
+    audio = np.concatenate(parts)
+    # Background noise, optionally getting louder over the take
+    gain = 10 ** ((noise_db + np.linspace(0, noise_ramp_db, len(audio))) / 20)
+    audio += (rng.standard_normal(len(audio)) * gain).astype(np.float32)
+    return np.clip(audio, -1, 1), labels
+
+
+def write(path, audio, labels, rate=RATE):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes((audio * 32767).astype(np.int16).tobytes())
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump({"speech": labels}, f)
+    return path
+
+
+def load(path):
+    """(float32 audio, rate, speech labels or None)"""
+    with wave.open(path, "rb") as wf:
+        rate = wf.getframerate()
+        audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768
+    try:
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            labels = [tuple(span) for span in json.load(f)["speech"]]
+    except OSError:
+        labels = None
+    return audio, rate, labels
+
+
+FIXTURES = {
+    "quiet": dict(plan=[("silence", 1), ("speech", 2), ("silence", 1.5), ("speech", 3), ("silence", 2)]),
+    "noisy": dict(plan=[("silence", 1), ("speech", 2), ("silence", 1.5), ("speech", 3), ("silence", 2)],
+                  noise_db=-32),
+    "soft": dict(plan=[("silence", 1), ("speech", 2, 0.03), ("silence", 1.5), ("speech", 2.5, 0.03), ("silence", 2)],
+                 noise_db=-55),
+    "rising_noise": dict(plan=[("silence", 2), ("speech", 2), ("silence", 3), ("speech", 2), ("silence", 3)],
+                         noise_db=-60, noise_ramp_db=25),
+    "keyboard": dict(plan=[("silence", 1), ("noise", 0.05, 0.3), ("silence", 0.3), ("noise", 0.05, 0.3),
+                           ("silence", 1), ("speech", 2.5), ("silence", 1), ("noise", 0.08, 0.3), ("silence", 2)],
+                     noise_db=-50),
+}
+
+
+def generate(folder, names=None):
+    """Writes the built-in fixtures into folder, returns their paths."""
+    paths = []
+    for seed, (name, spec) in enumerate(FIXTURES.items()):
+        if names and name not in names:
+            continue
+        audio, labels = render(seed=seed, **spec)
+        paths.append(write(os.path.join(folder, f"{name}.wav"), audio, labels))
+    return paths
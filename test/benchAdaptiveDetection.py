@@ -0,0 +1,146 @@
+# CPU against accuracy for adaptive detection (detect every N frames, track
+# with optical flow in between). Every run is compared with detecting on
+# every frame, point by point, on the same clip. The synthetic clip moves a
+# textured target through still parts, smooth motion, a sudden jump and fast
+# motion; the stand-in detector finds it by template matching, which costs
+# real CPU. With mediapipe installed, --mediapipe uses face mesh on [video].
+#   python test/benchAdaptiveDetection.py [video] [--mediapipe]
+import os
+import sys
+import tempfile
+from time import process_time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol.framePipeline import FramePipeline, FrameSource, Processor, NullSink
+from protocol.adaptiveDetection import AdaptiveProcessor
+
+FPS = 30
+SIZE = (640, 480)
+PATCH = 96
+
+
+def target_path(seconds=8, fps=FPS):
+    """Top-left corner of the target for every frame."""
+    path = []
+    for i in range(seconds * fps):
+        t = i / fps
+        if t < 1.5:                 # still
+            x, y = 120, 150
+        elif t < 4.5:               # slow circle
+            a = (t - 1.5) / 3 * 2 * np.pi
+            x, y = 120 + 150 * (1 - np.cos(a)), 150 + 100 * np.sin(a)
+        elif t < 5.5:               # still
+            x, y = 120, 150
+        elif t < 6.5:               # jumped across the frame
+            x, y = 420, 300
+        else:                       # fast sweep back
+            k = (t - 6.5) / 1.5
+            x, y = 420 - 300 * k, 300 - 150 * k
+        path.append((int(x), int(y)))
+    return path
+
+
+def texture(seed=1):
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur(rng.integers(0, 255, (PATCH, PATCH, 3), dtype=np.uint8), (3, 3), 0)
+
+
+def synthetic_video(path):
+    rng = np.random.default_rng(0)
+    background = cv2.GaussianBlur(rng.integers(60, 120, (SIZE[1], SIZE[0], 3), dtype=np.uint8), (31, 31), 0)
+    patch = texture()
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, SIZE)
+    for x, y in target_path():
+        frame = background.copy()
+        frame[y:y + PATCH, x:x + PATCH] = patch
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class TemplateDetector(Processor):
+    """Finds the target anywhere in the frame; its points are a 4x4 grid over it."""
+    name = key = "template"
+
+    def open(self):
+        self.template = cv2.cvtColor(texture(), cv2.COLOR_BGR2GRAY)
+        offsets = np.linspace(PATCH * 0.15, PATCH * 0.85, 4)
+        self.grid = np.array([(ox, oy) for oy in offsets for ox in offsets], np.float32)
+
+    def process(self, rgb):
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        scores = cv2.matchTemplate(gray, self.template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (x, y) = cv2.minMaxLoc(scores)
+        if best < 0.5:
+            return None
+        return (self.grid + (x, y)) / (gray.shape[1], gray.shape[0])
+
+    def points(self, results):
+        return results
+
+    def moved(self, results, points):
+        return points
+
+
+def mediapipe_face_mesh():
+    from protocol import CameraProtocol
+
+    class FaceMeshPoints(CameraProtocol.FaceMeshProcessor):
+        def to_record(self, results):
+            return self.points(results)
+    return FaceMeshPoints()
+
+
+def run(video, processor):
+    records = []
+    pipeline = FramePipeline(processor, FrameSource(video, realtime=False, drop=False), NullSink(),
+                             report_every=0, on_record=lambda r: records.append(r[processor.key]))
+    cpu = process_time()
+    pipeline.run()
+    return records, process_time() - cpu
+
+
+def errors(records, reference, width):
+    """Mean point distance in pixels per frame where the reference found something, and the misses."""
+    found, missed = [], 0
+    for got, want in zip(records, reference):
+        if want is None:
+            continue
+        if got is None or len(got) != len(want):
+            missed += 1
+            continue
+        found.append(np.mean(np.linalg.norm((np.asarray(got) - want)[:, :2], axis=1)) * width)
+    return np.array(found or [0.0]), missed
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if "--mediapipe" in sys.argv:
+        video, make = args[0], mediapipe_face_mesh
+    else:
+        video = args[0] if args else synthetic_video(os.path.join(tempfile.mkdtemp(), "clip.avi"))
+        make = TemplateDetector
+    width = cv2.VideoCapture(video).get(cv2.CAP_PROP_FRAME_WIDTH)
+
+    reference, base_cpu = run(video, make())
+    frames = len(reference)
+    _, decode_cpu = run(video, Processor())
+    print(f"{frames} frames, {make().name} detection on every frame: {base_cpu / frames * 1000:.2f} ms CPU/frame "
+          f"(decode + RGB alone: {decode_cpu / frames * 1000:.2f})\n")
+    print(f"{'every':>5} {'CPU ms/frame':>12} {'CPU saved':>9} {'detected':>8} {'interval':>8} {'quality':>7} "
+          f"{'motion':>6} {'err p50 px':>10} {'p95':>6} {'max':>6} {'missed':>6}")
+    for every in (2, 3, 5, 10, 20):
+        processor = AdaptiveProcessor(make(), every)
+        records, cpu = run(video, processor)
+        err, missed = errors(records, reference, width)
+        s = processor.stats()
+        print(f"{every:>5} {cpu / frames * 1000:>12.2f} {1 - cpu / base_cpu:>9.0%} {s['detect_share']:>8.0%} "
+              f"{s['interval']:>8} {s['quality']:>7} {s['motion']:>6} {np.percentile(err, 50):>10.2f} "
+              f"{np.percentile(err, 95):>6.2f} {err.max():>6.1f} {missed:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Audio capture fan-out without a microphone: a synthetic source (or a WAV
+# file) runs faster than real time into the ring buffer while several async
+# consumers read it: a VAD, a level meter and a deliberately slow consumer.
+# Reports the cost of the audio callback, wake-up latency per consumer and
+# what the slow one lost.
+#   python test/benchAudioCapture.py [wav] [speed]
+import os
+import sys
+import asyncio
+from time import perf_counter, process_time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol import audioCapture
+from protocol.vad import VoiceActivityDetector
+
+SECONDS = 60
+
+
+class StampedCapture(audioCapture.AudioCapture):
+    """Remembers when each chunk landed, to measure consumer wake-up latency."""
+
+    def on_audio(self, chunk):
+        self.last_write = perf_counter()
+        super().on_audio(chunk)
+
+
+async def consume(capture, name, work=None, delay=0.0):
+    latencies, samples = [], 0
+    sub = capture.subscribe(from_start=True)
+    async for chunk in sub:
+        latencies.append(perf_counter() - capture.last_write)
+        samples += len(chunk)
+        if work:
+            work(chunk)
+        if delay:
+            await asyncio.sleep(delay)
+    lat = np.array(latencies) * 1e6
+    print(f"{name:>8} {samples / capture.rate:8.1f} {sub.lost / capture.rate:8.1f} {len(latencies):>8} "
+          f"{np.percentile(lat, 50):8.0f} {np.percentile(lat, 99):8.0f}")
+
+
+async def main():
+    args = sys.argv[1:]
+    speed = float(args[1]) if len(args) > 1 else 20.0
+    if args and args[0] != "synthetic":
+        source = audioCapture.FileSource(args[0], speed=speed)
+    else:
+        source = audioCapture.SyntheticSource(speed=speed)
+    # Keep the synthetic source finite
+    if isinstance(source, audioCapture.SyntheticSource):
+        read = source.read
+        source.read = lambda n: read(n) if source.position < SECONDS * source.rate else None
+
+    capture = StampedCapture(source, buffer_seconds=5)
+    capture.last_write = perf_counter()
+    vad = VoiceActivityDetector(capture.rate)
+    segments = []
+    levels = []
+    print(f"source {source.name} at {speed:g}x real time, 5 s ring buffer")
+    print(f"{'consumer':>8} {'got s':>8} {'lost s':>8} {'wakeups':>8} {'p50 us':>8} {'p99 us':>8}")
+    cpu, wall = process_time(), perf_counter()
+    consumers = asyncio.gather(
+        consume(capture, "vad", lambda c: segments.extend(e for e in vad.process(c) if e[0] == "end")),
+        consume(capture, "meter", lambda c: levels.append(capture.level())),
+        consume(capture, "slow", delay=0.5),
+    )
+    await asyncio.sleep(0)   # subscribe before the source starts
+    capture.start()
+    await consumers
+    cpu, wall = process_time() - cpu, perf_counter() - wall
+    audio_seconds = capture.ring.written / capture.rate
+    print(f"callback: {capture.callback_time / capture.callbacks * 1e6:.1f} us per chunk over {capture.callbacks} chunks")
+    print(f"{audio_seconds:.0f}s of audio in {wall:.1f}s, process CPU {cpu / audio_seconds * 1000:.1f} ms per audio second, "
+          f"{len(segments)} speech segments, meter {np.mean(levels):.1f} dBFS mean")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
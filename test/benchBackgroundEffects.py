@@ -0,0 +1,85 @@
+# Frame rate of the background effects at 720p and 1080p. "old" is what
+# choice 5 did (with cv2.where fixed to np.where): the full frame goes to
+# the model and its mask comes back at full size, then a 55x55 blur and a
+# hard select over the whole frame. The stand-in segmenter costs the same in
+# both paths apart from that resizing, so the difference is all ours.
+#   python test/benchBackgroundEffects.py
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol.backgroundEffects import BackgroundEffect, refine_mask, MODEL_SIZES, replacement_background
+
+FRAMES = 30
+MODEL = MODEL_SIZES[1]
+
+
+def person_mask(width, height):
+    """Model confidence for a head-and-shoulders shape, at the given size."""
+    mask = np.zeros((height, width), np.float32)
+    cv2.ellipse(mask, (width // 2, height * 2 // 5), (width // 9, height // 4), 0, 0, 360, 1, -1)
+    cv2.ellipse(mask, (width // 2, height), (width // 4, height * 2 // 5), 0, 0, 360, 1, -1)
+    return cv2.GaussianBlur(mask, (0, 0), max(1, width / 200))
+
+
+def segment(rgb):
+    """Stand-in for SelfieSegmentation.process: resizes to the model input, mask back at the input size."""
+    height, width = rgb.shape[:2]
+    if (width, height) == MODEL:
+        return person_mask(*MODEL)
+    cv2.resize(rgb, MODEL, interpolation=cv2.INTER_AREA)     # the model's own input scaling
+    return cv2.resize(person_mask(*MODEL), (width, height))
+
+
+def old_path(frame):
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    condition = segment(rgb) > 0.1
+    bg_image = cv2.GaussianBlur(frame, (55, 55), 0)
+    return np.where(condition[..., None], frame, bg_image)
+
+
+def new_path(effect):
+    def run(frame):
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        small = cv2.resize(rgb, MODEL, interpolation=cv2.INTER_AREA)
+        return effect.apply(frame, refine_mask(segment(small)))
+    return run
+
+
+def fps(run, frame):
+    run(frame)
+    start = perf_counter()
+    for _ in range(FRAMES):
+        run(frame)
+    return FRAMES / (perf_counter() - start)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    wallpaper = os.path.join(tempfile.mkdtemp(), "wallpaper.png")
+    cv2.imwrite(wallpaper, cv2.GaussianBlur(rng.integers(0, 255, (1200, 1600, 3), dtype=np.uint8), (0, 0), 8))
+    runs = [
+        ("old: full-res blur + np.where", old_path),
+        ("blur at 1/4", new_path(BackgroundEffect("blur"))),
+        ("blur at 1/2", new_path(BackgroundEffect("blur", blur_scale=0.5))),
+        ("color", new_path(BackgroundEffect("color"))),
+        ("image (cached)", new_path(BackgroundEffect("image", image=wallpaper))),
+    ]
+    print(f"{'':>30} {'720p fps':>9} {'1080p fps':>9}")
+    for label, run in runs:
+        rates = []
+        for width, height in ((1280, 720), (1920, 1080)):
+            frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+            frame = cv2.GaussianBlur(frame, (0, 0), 3)
+            rates.append(fps(run, frame))
+        print(f"{label:>30} {rates[0]:>9.1f} {rates[1]:>9.1f}")
+    print(f"\nbackground cache: {replacement_background.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Headless landmark extraction throughput (frames per wall-second) for 1, 2
+# and 4 worker processes over a folder of generated clips (one of them at a
+# smaller size), then adaptive extraction (--every) against every frame, a
+# resume check (one output deleted, another only half-written: the rerun
+# redoes just those two), and a broken video that must be reported as failed.
+# Without mediapipe (or with --fake) the workers use the template-matching
+# stand-in from benchAdaptiveDetection, plus a fixed inference time for the
+# model.
+#   python test/benchBatchLandmarks.py [folder] [--fake]
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+from time import sleep
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol import batchLandmarks
+from benchAdaptiveDetection import TemplateDetector, synthetic_video
+
+FILES = 6
+INFERENCE_MS = 10
+
+
+class FakeModel(TemplateDetector):
+    def process(self, rgb):
+        sleep(INFERENCE_MS / 1000)
+        return super().process(rgb)
+
+    def to_record(self, results):
+        return [] if results is None else [results]
+
+
+def resized_copy(source, path, size):
+    cap = cv2.VideoCapture(source)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), cap.get(cv2.CAP_PROP_FPS), size)
+    while True:
+        success, frame = cap.read()
+        if not success:
+            break
+        writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+    writer.release()
+    cap.release()
+
+
+def make_folder(folder):
+    for i in range(FILES):
+        os.makedirs(os.path.join(folder, f"day{i % 2}"), exist_ok=True)
+        synthetic_video(os.path.join(folder, f"day{i % 2}", f"take{i:02}.avi"))
+    # Comes right after day0/ in a single worker, so tracking state must not carry over
+    resized_copy(os.path.join(folder, "day0", "take00.avi"), os.path.join(folder, "day1", "small.avi"), (320, 240))
+    return folder
+
+
+def outputs_in(folder):
+    return sorted(os.path.join(root, name) for root, _, files in os.walk(folder) for name in files)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    folder = args[0] if args else make_folder(tempfile.mkdtemp())
+    real = "--fake" not in sys.argv and importlib.util.find_spec("mediapipe")
+    solution, factory = ("face_mesh", None) if real else ("template", FakeModel)
+    if not real:
+        batchLandmarks.COLUMNS["template"] = (1, (16, 2), list)
+    print(f"{len(batchLandmarks.find_videos([folder]))} videos, {'mediapipe ' + solution if real else 'stand-in'}")
+    print(f"{'workers':>7} {'frames':>7} {'wall s':>7} {'fps':>7}")
+    for workers in (1, 2, 4):
+        out = tempfile.mkdtemp()
+        frames, wall, failed = batchLandmarks.run([folder], out, solution, workers, factory=factory, progress=False)
+        assert not failed, failed
+        print(f"{workers:>7} {frames:>7} {wall:7.1f} {frames / wall:7.1f}")
+
+    outputs = outputs_in(out)
+    data = batchLandmarks.load(outputs[0])
+    print(f"\n{os.path.relpath(outputs[0], out)}: " + ", ".join(
+        f"{name} {value.shape} {value.dtype}" for name, value in data.items() if value.ndim))
+    assert np.all(np.diff(data["t"]) > 0), "timestamps must increase"
+
+    # Adaptive: one worker gets every video in turn, including the smaller one
+    adaptive = tempfile.mkdtemp()
+    frames, wall, failed = batchLandmarks.run([folder], adaptive, solution, 1, every=5, factory=factory,
+                                              progress=False)
+    assert not failed, failed
+    errors = []
+    for full, tracked in zip(outputs, outputs_in(adaptive)):
+        a, b = batchLandmarks.load(full), batchLandmarks.load(tracked)
+        diff = np.abs(a["landmarks"] - b["landmarks"])
+        errors.append(np.max(diff, initial=0, where=~np.isnan(diff)) * a["width"])
+        assert np.array_equal(a["count"], b["count"]), f"{tracked}: detections differ"
+    print(f"--every 5: {frames} frames in {wall:.1f}s ({frames / wall:.1f} fps), "
+          f"worst point error against every frame {max(errors):.2f} px")
+
+    # Resume: one output lost, one cut off mid-write (so never renamed into place)
+    os.remove(outputs[1])
+    os.remove(outputs[2])
+    with open(outputs[2] + ".partial.npz", "wb") as f:
+        f.write(b"PK\x03\x04 cut off")
+    frames, wall, failed = batchLandmarks.run([folder], out, solution, 2, factory=factory, progress=False)
+    print(f"resume: {frames} frames redone in {wall:.1f}s (two videos of {len(data['t'])}), "
+          f"all outputs present: {all(os.path.exists(p) for p in outputs)}")
+
+    # Files with the same name from different folders, and one that isn't a video at all
+    other = tempfile.mkdtemp()
+    shutil.copy(os.path.join(folder, "day0", "take00.avi"), other)
+    broken = os.path.join(other, "broken.avi")
+    with open(broken, "wb") as f:
+        f.write(b"not a video")
+    files = [os.path.join(folder, "day0", "take00.avi"), os.path.join(other, "take00.avi"), broken]
+    out = tempfile.mkdtemp()
+    frames, wall, failed = batchLandmarks.run(files, out, solution, 2, factory=factory, progress=False)
+    print(f"files: {len(outputs_in(out))} outputs for 2 same-named videos, {frames} frames, "
+          f"failed: {[os.path.basename(v) for v in failed]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Batch transcription throughput (audio-seconds per wall-second) for 1, 2 and
+# 4 worker processes on a generated archive, then a resume check: the JSONL is
+# cut short as if the run had been killed, and the rerun only redoes what is
+# missing. Last, a corrupt WAV next to a good file: the good one must still
+# finish and the bad one be reported. Without whisper (or with --fake) workers
+# use a stand-in decoder with a fixed real-time factor.
+#   python test/benchBatchTranscribe.py [folder] [--fake]
+import os
+import sys
+import json
+import tempfile
+import importlib.util
+from time import sleep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol import batchTranscribe
+import audioFixtures
+
+FILES = 8
+DECODE_RTF = 0.1
+
+
+def fake_segments(audio):
+    sleep(len(audio) / batchTranscribe.RATE * DECODE_RTF)
+    return [(0.0, len(audio) / batchTranscribe.RATE, f"{len(audio) / batchTranscribe.RATE:.1f} seconds of speech")]
+
+
+def make_archive(folder):
+    for i in range(FILES):
+        plan = []
+        for j in range(12):
+            plan += [("speech", 2 + (i + j) % 5), ("silence", 1 + j % 3)]
+        audio, labels = audioFixtures.render(plan, noise_db=-50, seed=i)
+        audioFixtures.write(os.path.join(folder, f"session{i:02}.wav"), audio, labels)
+    return folder
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    folder = args[0] if args else make_archive(tempfile.mkdtemp())
+    real = "--fake" not in sys.argv and (importlib.util.find_spec("whisper") or importlib.util.find_spec("faster_whisper"))
+    segments = None if real else fake_segments
+    print(f"{len(batchTranscribe.find_audio(folder))} files, {'whisper' if real else 'stand-in decoder'}")
+    print(f"{'workers':>7} {'audio s':>8} {'wall s':>7} {'x real time':>11}")
+    for workers in (1, 2, 4):
+        out = os.path.join(tempfile.mkdtemp(), "out.jsonl")
+        audio_seconds, wall, failed = batchTranscribe.run(folder, out, workers, segments=segments, progress=False)
+        assert not failed, failed
+        print(f"{workers:>7} {audio_seconds:8.0f} {wall:7.1f} {audio_seconds / wall:11.1f}")
+
+    # Resume: keep the first third of the lines plus half a line, as if killed mid-write
+    with open(out) as f:
+        lines = f.readlines()
+    with open(out, "w") as f:
+        f.writelines(lines[:len(lines) // 3])
+        f.write(lines[len(lines) // 3][:20])
+    audio_seconds, wall, failed = batchTranscribe.run(folder, out, 4, segments=segments, progress=False)
+    with open(out) as f:
+        records = [json.loads(line) for line in f]
+    pieces = {(r["file"], r["piece"]) for r in records if not r.get("done")}
+    done = {r["file"] for r in records if r.get("done")}
+    print(f"resumed: finished {audio_seconds:.0f}s of audio in {wall:.1f}s, {len(done)}/{FILES} files complete, "
+          f"{len(pieces)} unique pieces, {sum(not r.get('done') for r in records) - len(pieces)} duplicates")
+
+    # One corrupt file must not stop the others
+    broken = tempfile.mkdtemp()
+    with open(os.path.join(folder, batchTranscribe.find_audio(folder)[0]), "rb") as f:
+        data = f.read()
+    with open(os.path.join(broken, "a_corrupt.wav"), "wb") as f:
+        f.write(b"RIFF" + os.urandom(64))
+    with open(os.path.join(broken, "b_good.wav"), "wb") as f:
+        f.write(data)
+    out = os.path.join(tempfile.mkdtemp(), "out.jsonl")
+    audio_seconds, wall, failed = batchTranscribe.run(broken, out, 2, segments=segments, progress=False)
+    with open(out) as f:
+        done = [r["file"] for r in map(json.loads, f) if r.get("done")]
+    print(f"corrupt file: failed {sorted(failed)}, finished {done}")
+
+
+if __name__ == "__main__":
+    main()
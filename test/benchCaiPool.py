@@ -0,0 +1,130 @@
+# Load test for the Character.AI client pool against a local fake client.
+# Sends bursts of messages to several chats at once, drops sessions at random
+# and checks that every chat still gets its messages in order.
+# Reports p50/p99 latency per pool size.
+#   python test/benchCaiPool.py [messages] [chats] [drop_rate]
+import os
+import sys
+import random
+import asyncio
+from time import perf_counter
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyCharacterAI.exceptions import SessionClosedError
+from protocol.models import cai
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+CHATS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+DROP_RATE = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+LATENCY = (0.05, 0.15)   # seconds per reply, uniform
+CHUNKS = 5
+
+
+class FakeCandidate:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeTurn:
+    author_name = "Yoimiya"
+
+    def __init__(self, text):
+        self.text = text
+
+    def get_primary_candidate(self):
+        return FakeCandidate(self.text)
+
+
+class FakeServer:
+    """Shared state of the fake service: what each chat received, in order."""
+
+    def __init__(self):
+        self.received = {}
+        self.busy = set()       # chats with a reply in progress, must never overlap
+        self.overlaps = 0
+        self.connects = 0
+
+
+class FakeClient:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+        self.account = self
+        self.chat = self
+
+    async def fetch_me(self):
+        await asyncio.sleep(0.01)
+        return type("Me", (), {"username": "bench"})()
+
+    async def send_message(self, character_id, chat_id, text, streaming=False):
+        if self.closed or random.random() < DROP_RATE:
+            self.closed = True
+            raise SessionClosedError()
+        return self.reply(chat_id, text)
+
+    async def reply(self, chat_id, text):
+        if chat_id in self.server.busy:
+            self.server.overlaps += 1
+        self.server.busy.add(chat_id)
+        self.server.received.setdefault(chat_id, []).append(text)
+        try:
+            step = random.uniform(*LATENCY) / CHUNKS
+            so_far = ""
+            for i in range(CHUNKS):
+                await asyncio.sleep(step)
+                so_far += f"part{i} "
+                yield FakeTurn(so_far)
+        finally:
+            self.server.busy.discard(chat_id)
+
+    async def close_session(self):
+        self.closed = True
+
+
+async def run(pool_size):
+    server = FakeServer()
+
+    async def factory(token):
+        server.connects += 1
+        return FakeClient(server)
+
+    pool = cai.CaiClientPool("fake-token", size=pool_size, client_factory=factory, base_delay=0.01)
+    latencies = []
+
+    async def send(i):
+        chat = f"chat{i % CHATS}"
+        start = perf_counter()
+        try:
+            async for _ in pool.stream(chat, f"{i}"):
+                pass
+            latencies.append(perf_counter() - start)
+        except ConnectionError:
+            pass   # dropped mid-reply, counted as a failure
+
+    start = perf_counter()
+    # All tasks are created in order, so each chat's lock is queued in send order
+    await asyncio.gather(*(send(i) for i in range(MESSAGES)))
+    wall = perf_counter() - start
+
+    in_order = all(
+        [int(m) for m in msgs] == sorted(int(m) for m in msgs) for msgs in server.received.values()
+    )
+    lat = np.array(latencies) * 1000
+    print(f"{pool_size:>5} {wall:>8.2f} {len(latencies) / wall:>8.1f} {np.percentile(lat, 50):>8.1f} "
+          f"{np.percentile(lat, 99):>8.1f} {MESSAGES - len(latencies):>7} {pool.reconnects:>6} "
+          f"{'yes' if in_order and not server.overlaps else 'NO'}")
+
+
+async def main():
+    random.seed(7)
+    print(f"{MESSAGES} messages over {CHATS} chats, {DROP_RATE:.0%} session drops, "
+          f"{LATENCY[0] * 1000:.0f}-{LATENCY[1] * 1000:.0f} ms per reply")
+    print(f"{'pool':>5} {'wall s':>8} {'msg/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7} {'drops':>6} ordered")
+    for size in (1, 2, 4, 8):
+        await run(size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+# Throughput check for the AdminPanel console: several threads log as fast as
+# they can while the Tk thread drains the queue. Reports lines/s and the worst
+# gap seen by a 10 ms UI heartbeat (how long the UI was blocked).
+#   python test/benchConsoleLog.py [lines_per_thread] [threads]
+import os
+import sys
+import threading
+import tkinter as tk
+from time import perf_counter
+
+# In front of this folder, which has an app.py of its own
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import app
+from panel.consoleLog import ConsoleLog
+
+LINES = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+
+class Harness:
+    """Just the parts of AdminPanel that flush_console touches."""
+
+    def __init__(self, root):
+        self.root = root
+        self.console = tk.Text(root)
+        self.console.pack()
+        self.console_log = ConsoleLog(max_lines=app.CONSOLE_MAX_LINES)
+        self.after = root.after
+
+    log = app.AdminPanel.log
+    flush_console = app.AdminPanel.flush_console
+
+
+def main():
+    root = tk.Tk()
+    panel = Harness(root)
+    total = LINES * THREADS
+    state = {"gap": 0.0, "last": perf_counter(), "start": None, "done": 0}
+
+    def producer(n):
+        for i in range(LINES):
+            panel.log(f"thread {n} line {i}")
+
+    def heartbeat():
+        now = perf_counter()
+        state["gap"] = max(state["gap"], now - state["last"])
+        state["last"] = now
+        if state["done"] == THREADS and panel.console_log.pending() == 0:
+            wall = now - state["start"]
+            widget_lines = int(panel.console.index("end-1c").split(".")[0]) - 1
+            print(f"{total} lines from {THREADS} threads in {wall:.2f}s -> {total / wall:,.0f} lines/s", file=sys.__stdout__)
+            print(f"worst UI heartbeat gap: {state['gap'] * 1000:.1f} ms", file=sys.__stdout__)
+            print(f"widget lines: {widget_lines} (cap {app.CONSOLE_MAX_LINES}), ring: {len(panel.console_log.lines)}", file=sys.__stdout__)
+            root.destroy()
+            return
+        root.after(10, heartbeat)
+
+    def start():
+        state["start"] = state["last"] = perf_counter()
+        threads = [threading.Thread(target=producer, args=(n,)) for n in range(THREADS)]
+        for th in threads:
+            th.start()
+
+        def join():
+            for th in threads:
+                th.join()
+            state["done"] = THREADS
+        threading.Thread(target=join, daemon=True).start()
+        heartbeat()
+
+    # flush_console echoes every batch to stdout too, keep the report readable
+    sys.stdout = open(os.devnull, "w")
+    root.after(0, panel.flush_console)
+    root.after(100, start)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
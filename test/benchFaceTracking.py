@@ -0,0 +1,108 @@
+# Capture-to-send latency of the face tracking stream, from a recorded video
+# into the local fake VTS server. Without mediapipe (or with --fake) a stand-in
+# landmarker with a fixed inference time is used, to show that latency stays
+# flat while inference slows down: frames get skipped instead of queued.
+# Last, a landmarker that raises must end the stream with its error.
+#   python test/benchFaceTracking.py [video] [--fake]
+import os
+import sys
+import asyncio
+import tempfile
+from time import sleep
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from auth.vtsClient import VTSClient
+from protocol import faceTracking
+from fakeVts import FakeVTS
+
+SECONDS = 4
+FPS = 30
+
+
+def synthetic_video(path, seconds=SECONDS, fps=FPS, size=(640, 480)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((size[1], size[0], 3), 40, np.uint8)
+        x = int(size[0] / 2 + 100 * np.sin(i / 10))
+        cv2.circle(frame, (x, size[1] // 2), 90, (180, 200, 230), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def neutral_face():
+    rng = np.random.default_rng(0)
+    lm = rng.uniform(0.3, 0.7, (468, 3)).astype(np.float32)
+    points = {
+        faceTracking.NOSE: (0.5, 0.5), faceTracking.CHIN: (0.5, 0.75), faceTracking.FOREHEAD: (0.5, 0.2),
+        faceTracking.CHEEK_L: (0.35, 0.5), faceTracking.CHEEK_R: (0.65, 0.5),
+        159: (0.43, 0.42), 145: (0.43, 0.44), 33: (0.40, 0.43), 133: (0.46, 0.43),
+        386: (0.57, 0.42), 374: (0.57, 0.44), 263: (0.60, 0.43), 362: (0.54, 0.43),
+        13: (0.5, 0.62), 14: (0.5, 0.64), 61: (0.46, 0.63), 291: (0.54, 0.63),
+    }
+    for index, (x, y) in points.items():
+        lm[index, :2] = (x, y)
+    return lm
+
+
+def fake_mesh(inference_ms):
+    def factory():
+        face = neutral_face()
+
+        def detect(frame_rgb):
+            sleep(inference_ms / 1000)
+            return face
+        return detect
+    return factory
+
+
+def failing_mesh():
+    def detect(frame_rgb):
+        raise RuntimeError("bad frame")
+    return detect
+
+
+async def run(server, video, label, mesh_factory):
+    tracker = faceTracking.FaceTracker(video, rate=60, mesh_factory=mesh_factory)
+    async with VTSClient(server.url, token_file=os.path.join(tempfile.mkdtemp(), "token.json")) as vts:
+        tracker.start()
+        try:
+            await tracker.stream(vts)
+        finally:
+            tracker.stop()
+    s = tracker.stats()
+    print(f"{label:>14} {s['captured']:>8} {s['inferred']:>8} {s['skipped_frames']:>8} {s['sent']:>6} "
+          f"{s['stale']:>6} {s['latency_p50_ms']:>8.1f} {s['latency_p99_ms']:>8.1f}")
+
+
+async def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    video = args[0] if args else synthetic_video(os.path.join(tempfile.mkdtemp(), "clip.avi"))
+    try:
+        import mediapipe   # noqa: F401
+        use_fake = "--fake" in sys.argv
+    except ImportError:
+        use_fake = True
+    server = await FakeVTS().start()
+    print(f"{'inference':>14} {'captured':>8} {'inferred':>8} {'skipped':>8} {'sent':>6} {'stale':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    if use_fake:
+        for ms in (5, 20, 50, 120, 300):
+            await run(server, video, f"fake {ms} ms", fake_mesh(ms))
+    else:
+        await run(server, video, "mediapipe", faceTracking.make_face_mesh)
+
+    # A landmarker that fails must end the stream with its error, not leave it sending nothing forever
+    try:
+        await asyncio.wait_for(run(server, video, "failing", failing_mesh), 10)
+        print("failing mesh: stream ended without an error")
+    except RuntimeError as e:
+        print(f"failing mesh: stream raised {e!r}")
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+# Camera loop throughput and latency: the old serial read -> infer -> draw ->
+# imshow loop against the threaded frame pipeline, on a synthetic 30 fps clip
+# with stand-in processors of fixed inference time and a fixed display cost.
+# The serial loop reads from a simulated camera with a 4-frame driver buffer,
+# like V4L2/DirectShow, so it shows frames that waited in that buffer.
+#   python test/benchFramePipeline.py [video]
+import os
+import sys
+import queue
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol.framePipeline import FramePipeline, FrameSource, Processor, NullSink
+
+SECONDS = 5
+FPS = 30
+DISPLAY_MS = 8      # drawing + imshow/waitKey on a typical desktop
+DRIVER_BUFFERS = 4
+
+
+def synthetic_video(path, seconds=SECONDS, fps=FPS, size=(640, 480)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((size[1], size[0], 3), 40, np.uint8)
+        x = int(size[0] / 2 + 100 * np.sin(i / 10))
+        cv2.circle(frame, (x, size[1] // 2), 90, (180, 200, 230), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class SleepProcessor(Processor):
+    def __init__(self, inference_ms):
+        self.inference_ms = inference_ms
+        self.name = f"fake {inference_ms} ms"
+
+    def process(self, rgb):
+        sleep(self.inference_ms / 1000)
+        return rgb.shape
+
+    def draw(self, frame, results):
+        cv2.putText(frame, str(results), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        return frame
+
+
+class SlowSink(NullSink):
+    def show(self, image):
+        sleep(DISPLAY_MS / 1000)
+        return True
+
+
+def camera(video, buffers):
+    """Frames at the clip's rate into a small driver queue; when it is full new frames are lost."""
+    out = queue.Queue(buffers)
+    source = FrameSource(video)
+    source.start()
+
+    def feed():
+        seen = 0
+        while True:
+            seq, frame = source.frames.wait(seen)
+            if seq == seen:
+                if source.frames.closed:
+                    break
+                continue
+            seen = seq
+            try:
+                out.put_nowait(frame)
+            except queue.Full:
+                pass
+        out.put(None)
+    threading.Thread(target=feed, daemon=True).start()
+    return out, source
+
+
+def serial(video, processor):
+    frames, source = camera(video, DRIVER_BUFFERS)
+    sink = SlowSink()
+    shown, latencies = 0, []
+    start = perf_counter()
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+        rgb = cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB)
+        sink.show(processor.draw(frame.image, processor.process(rgb)))
+        latencies.append(perf_counter() - frame.captured_at)
+        shown += 1
+    wall = perf_counter() - start
+    return {"fps": shown / wall, "latency_ms": float(np.median(latencies)) * 1000,
+            "dropped": source.captured - shown}
+
+
+def pipelined(video, processor):
+    pipeline = FramePipeline(processor, video, SlowSink(), report_every=0)
+    start = perf_counter()
+    s = pipeline.run()
+    return {"fps": s["shown"] / (perf_counter() - start), "latency_ms": s["latency_ms"],
+            "dropped": s["dropped"], "stages": s}
+
+
+def main():
+    video = sys.argv[1] if len(sys.argv) > 1 else synthetic_video(os.path.join(tempfile.mkdtemp(), "clip.avi"))
+    print(f"{'inference':>12} | {'serial fps':>10} {'p50 ms':>8} {'dropped':>7} | "
+          f"{'pipeline fps':>12} {'p50 ms':>8} {'dropped':>7} | {'wait':>6} {'infer':>6} {'show':>6}")
+    for ms in (5, 20, 40, 80):
+        old = serial(video, SleepProcessor(ms))
+        new = pipelined(video, SleepProcessor(ms))
+        st = new["stages"]
+        print(f"{ms:>9} ms | {old['fps']:>10.1f} {old['latency_ms']:>8.1f} {old['dropped']:>7} | "
+              f"{new['fps']:>12.1f} {new['latency_ms']:>8.1f} {new['dropped']:>7} | "
+              f"{st['wait_ms']:>6.1f} {st['inference_ms']:>6.1f} {st['display_ms']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Benchmark for run_gemini_async with a fake model of fixed latency.
+# Throughput should grow with the number of prompts in flight on one loop.
+#   python test/benchGeminiAsync.py
+import os
+import sys
+import asyncio
+from time import perf_counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from langchain_core.messages import AIMessage, AIMessageChunk
+from protocol.models import geminiOllama
+from protocol.models.responseCache import ResponseCache
+
+LATENCY = 0.2      # seconds per model call
+PROMPTS = 32
+
+
+class FakeModel:
+    """Stands in for the bound Gemini model, every call takes LATENCY seconds."""
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(LATENCY)
+        return AIMessage(content=f"echo: {messages[-1].content}")
+
+    async def astream(self, messages):
+        await asyncio.sleep(LATENCY)
+        for word in f"echo: {messages[-1].content}".split(" "):
+            yield AIMessageChunk(content=word + " ")
+
+
+async def run_batch(concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            await geminiOllama.run_gemini_async(f"prompt {i}")
+
+    start = perf_counter()
+    await asyncio.gather(*(one(i) for i in range(PROMPTS)))
+    return perf_counter() - start
+
+
+async def main():
+    geminiOllama.model = geminiOllama.toolBind = FakeModel()
+    geminiOllama.cache = ResponseCache(path=":memory:")
+    print(f"{PROMPTS} prompts, {LATENCY * 1000:.0f} ms per model call")
+    print(f"{'concurrency':>12} {'wall (s)':>10} {'prompts/s':>10}")
+    for concurrency in (1, 2, 4, 8, 16, 32):
+        geminiOllama.sessions.clear()
+        geminiOllama.cache.clear()   # every run should pay the model latency
+        wall = await run_batch(concurrency)
+        print(f"{concurrency:>12} {wall:>10.2f} {PROMPTS / wall:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# Lip-sync throughput on one core: seconds of audio analysed per second of
+# wall time, on ten minutes of synthetic speech-like audio, then a short
+# clip streamed in step with "playback" into the fake VTS server.
+#   python test/benchLipSync.py [wav]
+import os
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+import sys
+import asyncio
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from auth.vtsClient import VTSClient
+from protocol import lipSync, tts
+from fakeVts import FakeVTS
+
+MINUTES = 10
+
+
+def speech_like(seconds, rate):
+    """Voiced tones with syllable-rate loudness changes, pauses and a little noise."""
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * rate)) / rate
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.5)
+    pitch = 140 + 60 * np.sin(2 * np.pi * 0.3 * t)
+    voiced = np.sin(2 * np.pi * np.cumsum(pitch) / rate) + 0.3 * np.sin(2 * np.pi * 3 * np.cumsum(pitch) / rate)
+    return (0.3 * syllables * voiced + 0.003 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+async def stream_clip(audio, rate):
+    server = await FakeVTS().start()
+    async with VTSClient(server.url, token_file=os.path.join(tempfile.mkdtemp(), "token.json")) as vts:
+        sync = lipSync.LipSync(vts)
+        sync.play(audio, rate)
+        await sync.task
+    values = np.array([v["MouthOpen"] for _, v in server.injected])
+    await server.stop()
+    print(f"streamed {len(audio) / rate:.1f}s clip: {len(values)} updates, {sync.late} late, "
+          f"mouth open mean {values.mean():.2f} max {values.max():.2f}")
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            clips = [tts.wav_bytes_to_audio(f.read())]
+    else:
+        clips = [(speech_like(MINUTES * 60, rate), rate) for rate in (16000, 22050, 48000)]
+    for audio, rate in clips:
+        seconds = len(audio) / rate
+        lipSync.lip_sync_values(audio[:rate], rate)   # warm up
+        start = perf_counter()
+        times, mouth_open, mouth_form = lipSync.lip_sync_values(audio, rate)
+        wall = perf_counter() - start
+        print(f"{rate:>6} Hz, {seconds:6.0f}s of audio: {wall * 1000:7.1f} ms, {seconds / wall:7.0f}x real time, "
+              f"{len(times)} frames, open {mouth_open.mean():.2f}, form {mouth_form.mean():+.2f}")
+    audio, rate = clips[0]
+    asyncio.run(stream_clip(audio[:3 * rate], rate))
+
+
+if __name__ == "__main__":
+    main()
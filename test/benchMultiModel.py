@@ -0,0 +1,82 @@
+# Face mesh + hands + pose over the same clip: one mode after another (each
+# decoding and converting every frame itself) against the combined mode that
+# decodes and converts once and runs the models in parallel. Frames are read
+# as fast as they decode, so this is throughput, not camera-paced.
+# Without mediapipe (or with --fake) stand-in models are used whose inference
+# time is spent outside the GIL, the way MediaPipe's C++ graphs spend it.
+#   python test/benchMultiModel.py [video] [--fake]
+import os
+import sys
+import json
+import tempfile
+from time import perf_counter, sleep
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol.framePipeline import FramePipeline, FrameSource, Processor, MultiProcessor, NullSink
+from benchFramePipeline import synthetic_video
+
+SECONDS = 4
+
+
+class FakeModel(Processor):
+    """Resizes to its input size like MediaPipe does, then 'infers' for a fixed time."""
+
+    def __init__(self, key, size, inference_ms):
+        self.key = self.name = key
+        self.size = size
+        self.inference_ms = inference_ms
+
+    def process(self, rgb):
+        small = cv2.resize(rgb, self.size)
+        sleep(self.inference_ms / 1000)
+        return float(small[0, 0, 0])
+
+
+def fake_models():
+    return [FakeModel("face_mesh", (192, 192), 10), FakeModel("hands", (224, 224), 14),
+            FakeModel("pose", (256, 256), 20)]
+
+
+def real_models():
+    from protocol import CameraProtocol
+    return [CameraProtocol.PROCESSORS[mode]() for mode in "234"]
+
+
+def run(video, processor, records=None):
+    pipeline = FramePipeline(processor, FrameSource(video, realtime=False, drop=False), NullSink(), report_every=0,
+                             on_record=records.append if records is not None else None)
+    start = perf_counter()
+    s = pipeline.run()
+    return perf_counter() - start, s
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    video = args[0] if args else synthetic_video(os.path.join(tempfile.mkdtemp(), "clip.avi"), SECONDS,
+                                                 size=(1280, 720))
+    try:
+        import mediapipe   # noqa: F401
+        make_models = fake_models if "--fake" in sys.argv else real_models
+    except ImportError:
+        make_models = fake_models
+
+    print(f"{'run':>24} {'frames':>7} {'wall s':>7} {'frames/s':>9}")
+    total, frames = 0.0, 0
+    for model in make_models():
+        wall, s = run(video, model)
+        total += wall
+        frames = s["inferred"]
+        print(f"{model.key + ' alone':>24} {s['inferred']:>7} {wall:>7.2f} {s['inferred'] / wall:>9.1f}")
+    print(f"{'one after another':>24} {frames:>7} {total:>7.2f} {frames / total:>9.1f}")
+
+    records = []
+    wall, s = run(video, MultiProcessor(make_models()), records)
+    print(f"{'combined, one pass':>24} {s['inferred']:>7} {wall:>7.2f} {s['inferred'] / wall:>9.1f}"
+          f"   ({total / wall:.1f}x)")
+    print(f"\n{len(records)} records, e.g. {json.dumps(records[len(records) // 2])[:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Cold-start benchmark for main.py.
+# Runs `python -X importtime main.py` with STARTUP_PROBE=1, so the panel reports
+# process start -> first paint and quits, then lists the slowest imports.
+# Exits with status 1 when the median first paint goes over the budget.
+#   python test/benchStartup.py [--runs 5] [--budget 2.0] [--top 15]
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run_once():
+    # Background warm-up is off so its imports don't mix into the startup numbers
+    env = dict(os.environ, STARTUP_PROBE="1", WARM_BACKENDS="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py"],
+        cwd=ROOT, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=120,
+    )
+    match = re.search(r"FIRST_PAINT ([\d.]+)", proc.stdout)
+    if match is None:
+        raise RuntimeError(f"main.py did not report a first paint:\n{proc.stdout}\n{proc.stderr[-2000:]}")
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        found = IMPORT_LINE.match(line)
+        if found:
+            self_us, cumulative_us, indent, name = found.groups()
+            imports.append((name, int(cumulative_us), len(indent)))
+    return float(match.group(1)), imports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET", "2.0")),
+                        help="seconds from process start to first paint")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # First run warms the OS file cache and writes .pyc files, it isn't counted
+    run_once()
+    paints, imports = [], []
+    for _ in range(args.runs):
+        paint, imports = run_once()
+        paints.append(paint)
+
+    # importtime indents each nesting level by two spaces: 1 = top level, 3 = imported by it
+    total_import = sum(us for _, us, indent in imports if indent == 1) / 1e6
+    shallow = [(name, us) for name, us, indent in imports if indent <= 3]
+    print(f"first paint: median {statistics.median(paints):.3f}s, "
+          f"min {min(paints):.3f}s, max {max(paints):.3f}s over {args.runs} runs")
+    print(f"imports before first paint: {total_import:.3f}s")
+    print("slowest imports (top two levels):")
+    for name, us in sorted(shallow, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    median = statistics.median(paints)
+    if median > args.budget:
+        print(f"FAIL: first paint {median:.3f}s is over the {args.budget:.3f}s budget")
+        sys.exit(1)
+    print(f"OK: within the {args.budget:.3f}s budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Speech-end to final-text latency of the streaming transcriber on WAV
+# fixtures, fed at real-time pace like a microphone. Also shows what the old
+# record-then-transcribe flow cost: the full silence timeout plus decoding the
+# whole take. Without whisper, a stand-in decoder with a fixed real-time
+# factor is used. Fixtures are generated unless WAV paths are given, labels
+# are read from <wav>.json (see audioFixtures.py).
+#   python test/benchStreamingStt.py [wav ...]
+import os
+import sys
+import asyncio
+import importlib.util
+import tempfile
+from time import perf_counter, sleep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol import sst
+import audioFixtures
+
+DECODE_RTF = 0.08        # stand-in decoder: seconds of decoding per second of audio
+DECODE_OVERHEAD = 0.05
+CHUNK = 512
+OLD_SILENCE = 3.0        # the old record_audio stopped after 3 s of silence
+
+
+def fake_transcribe(audio, partial=False):
+    sleep(DECODE_OVERHEAD + len(audio) / sst.RATE * DECODE_RTF)
+    return f"{'partial' if partial else 'final'} text for {len(audio) / sst.RATE:.1f}s"
+
+
+async def run(path, transcribe):
+    audio, rate, labels = audioFixtures.load(path)
+    end = labels[-1][1]
+    start = perf_counter()
+
+    async def realtime():
+        for i in range(0, len(audio), CHUNK):
+            delay = start + i / sst.RATE - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield audio[i:i + CHUNK]
+
+    partials, final_at = 0, None
+    async for kind, text in sst.StreamingTranscriber(transcribe).stream(realtime()):
+        if kind == "partial":
+            partials += 1
+        else:
+            final_at = perf_counter() - start   # the last final, for the end of the last utterance
+    # The old flow: wait the full silence timeout, then decode everything recorded
+    t0 = perf_counter()
+    transcribe(audio[:int((end + OLD_SILENCE) * sst.RATE)], False)
+    old = OLD_SILENCE + perf_counter() - t0
+    print(f"{os.path.basename(path):>16} {end:7.2f} {partials:>8} {final_at - end:>10.3f} {old:>10.3f}")
+
+
+async def main():
+    paths = sys.argv[1:]
+    if not paths:
+        folder = tempfile.mkdtemp()
+        for seconds in (2, 5, 10, 20):
+            audio, labels = audioFixtures.render([("silence", 0.5), ("speech", seconds), ("silence", 2.0)],
+                                                 noise_db=-50, seed=seconds)
+            paths.append(audioFixtures.write(os.path.join(folder, f"speech{seconds}s.wav"), audio, labels))
+    if importlib.util.find_spec("whisper") or importlib.util.find_spec("faster_whisper"):
+        transcribe = sst.whisper_transcribe
+        sst.get_model().load()
+    else:
+        transcribe = fake_transcribe
+    print(f"{'fixture':>16} {'end s':>7} {'partials':>8} {'final s':>10} {'old s':>10}")
+    for path in paths:
+        await run(path, transcribe)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+# Time to first audio for long replies: synthesizing the whole reply before
+# playing vs sentence streaming (cold and warm phrase cache, and fed from a
+# simulated model stream). Uses the tone engine slowed down to a fixed
+# real-time factor so numbers don't depend on the speech engine installed;
+# pass an engine name (pyttsx3, espeak) to time a real one.
+#   python test/benchTts.py [engine]
+import os
+import sys
+import asyncio
+import tempfile
+from time import perf_counter, sleep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol import tts
+
+REAL_TIME_FACTOR = 0.15    # seconds of synthesis per second of audio
+PLAYBACK_SPEED = 50        # audio "plays" 50x faster so the runs stay short
+
+REPLY = " ".join([
+    "Oh, fireworks? I could talk about them all day!",
+    "The trick is in the stars, the little pellets packed inside the shell.",
+    "Each one burns a different colour depending on the metal salts mixed in,",
+    "copper for blue, strontium for red, sodium for that warm golden yellow.",
+    "When the lift charge fires, the shell climbs for a few seconds,",
+    "and then the time fuse reaches the burst charge and everything spreads out at once.",
+    "Getting a perfect sphere means packing the stars evenly, which takes a steady hand and a lot of patience.",
+    "My father taught me that a good firework isn't about how loud it is.",
+    "It's about the moment everyone looks up together!",
+] * 3)
+
+
+class SlowEngine(tts.ToneEngine):
+    name = "tone-slow"
+
+    def synthesize(self, text):
+        audio, rate = super().synthesize(text)
+        sleep(len(audio) / rate * REAL_TIME_FACTOR)
+        return audio, rate
+
+
+async def model_stream(text, chunk=24, delay=0.02):
+    for i in range(0, len(text), chunk):
+        await asyncio.sleep(delay)
+        yield text[i:i + chunk]
+
+
+async def main():
+    engine = tts.make_engine(sys.argv[1]) if len(sys.argv) > 1 else SlowEngine()
+    cache = tts.PhraseCache(tempfile.mkdtemp(), max_bytes=50 * 1024 * 1024)
+    player = tts.NullPlayer(PLAYBACK_SPEED)
+    print(f"engine {engine.name}, reply of {len(REPLY)} chars, {len(tts.split_sentences(REPLY))} sentences")
+
+    start = perf_counter()
+    audio, rate = await asyncio.to_thread(engine.synthesize, REPLY)
+    print(f"{'whole reply':>22}: first audio {perf_counter() - start:7.3f}s ({len(audio) / rate:.0f}s of audio)")
+
+    runs = [
+        ("sentences, cold cache", lambda: REPLY, tts.Speaker(engine, player, cache)),
+        ("sentences, warm cache", lambda: REPLY, tts.Speaker(engine, player, cache)),
+        ("from model stream", lambda: model_stream(REPLY), tts.Speaker(engine, player, None)),
+    ]
+    for label, text, speaker in runs:
+        stats = await speaker.speak(text())
+        print(f"{label:>22}: first audio {stats['first_audio']:7.3f}s, done in {stats['total']:.2f}s")
+    print(cache.summary())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+# Voice activity detector accuracy and CPU cost on labelled WAV fixtures,
+# next to the old fixed int16 energy threshold (512-sample chunks, > 500).
+# Frame accuracy is per 20 ms frame against the labels; "lost" is how much
+# of the speech before the detector triggered is missing from what it keeps
+# (pre-roll included).
+#   python test/benchVad.py [wav ...]    (labels are read from <wav>.json)
+import os
+import sys
+import tempfile
+from time import process_time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from protocol.vad import VoiceActivityDetector
+import audioFixtures
+
+REPEAT = 20
+
+
+def label_mask(labels, frames, frame, rate):
+    mask = np.zeros(frames, bool)
+    for start, end in labels:
+        mask[int(start * rate) // frame:int(end * rate) // frame] = True
+    return mask
+
+
+def span_mask(spans, frames, frame):
+    mask = np.zeros(frames, bool)
+    for start, end in spans:
+        mask[start // frame:end // frame] = True
+    return mask
+
+
+def old_spans(audio, chunk=512, threshold=500, silence=3.0, rate=16000):
+    """What record_audio used to do, int16 overflow and all."""
+    pcm = (audio * 32767).astype(np.int16)
+    spans, start, quiet = [], None, 0
+    for i in range(0, len(pcm) - chunk + 1, chunk):
+        data = pcm[i:i + chunk]
+        loud = np.sum(data ** 2) / len(data) >= threshold
+        if start is None:
+            if loud:
+                start = i
+            continue
+        quiet = 0 if loud else quiet + 1
+        if quiet > silence * rate / chunk:
+            spans.append((start, i - quiet * chunk))
+            start, quiet = None, 0
+    if start is not None:
+        spans.append((start, len(pcm)))
+    return spans
+
+
+def score(mask, truth):
+    tp = np.sum(mask & truth)
+    precision = tp / max(mask.sum(), 1)
+    recall = tp / max(truth.sum(), 1)
+    return np.mean(mask == truth), precision, recall
+
+
+def main():
+    paths = sys.argv[1:] or audioFixtures.generate(tempfile.mkdtemp())
+    print(f"{'fixture':>13} {'method':>6} {'acc':>6} {'prec':>6} {'recall':>6} {'segs':>5}/{'true':<4} "
+          f"{'lost ms':>8} {'cpu us/s':>9}")
+    for path in paths:
+        audio, rate, labels = audioFixtures.load(path)
+        seconds = len(audio) / rate
+        frame = rate * 20 // 1000
+        frames = len(audio) // frame
+        truth = label_mask(labels, frames, frame, rate)
+
+        start = process_time()
+        for _ in range(REPEAT):
+            vad = VoiceActivityDetector(rate)
+            kept = []
+            for i in range(0, len(audio), 512):   # fed like a microphone
+                for kind, data in vad.process(audio[i:i + 512]):
+                    if kind == "start":
+                        kept.append(len(data))
+        cpu = (process_time() - start) / REPEAT / seconds * 1e6
+        spans = VoiceActivityDetector(rate).segments(audio)
+        # Speech lost at the start: true onset vs where the kept audio (pre-roll included) begins
+        lost_ms = []
+        for (t_start, _), (s, _), pre in zip(labels, spans, kept):
+            kept_from = s + vad.start_frames * frame - pre
+            lost_ms.append(max(0, kept_from - t_start * rate) / rate * 1000)
+        acc, precision, recall = score(span_mask(spans, frames, frame), truth)
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"{name:>13} {'vad':>6} {acc:6.1%} {precision:6.1%} {recall:6.1%} {len(spans):>5}/{len(labels):<4} "
+              f"{max(lost_ms, default=0):8.0f} {cpu:9.0f}")
+
+        old = old_spans(audio, rate=rate)
+        acc, precision, recall = score(span_mask(old, frames, frame), truth)
+        print(f"{'':>13} {'old':>6} {acc:6.1%} {precision:6.1%} {recall:6.1%} {len(old):>5}/{len(labels):<4}")
+
+
+if __name__ == "__main__":
+    main()
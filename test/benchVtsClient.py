@@ -0,0 +1,71 @@
+# Checks the multiplexed VTube Studio client against a local fake VTS server:
+# token caching, concurrent requests matched by requestID, throughput against
+# one-request-at-a-time, and reconnecting after the server drops the socket.
+#   python test/benchVtsClient.py [requests]
+import os
+import sys
+import asyncio
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from auth.vtsClient import VTSClient
+from auth.authMsg import current_Stat
+from fakeVts import FakeVTS
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+
+async def timed(vts, i, latencies):
+    start = perf_counter()
+    data = await vts.request("StatisticsRequest", {"n": i})
+    latencies.append(perf_counter() - start)
+    assert data["echo"]["n"] == i, f"request {i} got the reply for {data['echo']['n']}"
+
+
+async def main():
+    server = await FakeVTS().start()
+    token_file = os.path.join(tempfile.mkdtemp(), "token.json")
+
+    async with VTSClient(server.url, token_file=token_file) as vts:
+        assert server.token_requests == 1
+        await vts.send(current_Stat)
+
+        latencies = []
+        start = perf_counter()
+        for i in range(REQUESTS // 10):
+            await timed(vts, i, latencies)
+        serial = (REQUESTS // 10) / (perf_counter() - start)
+
+        latencies = []
+        start = perf_counter()
+        await asyncio.gather(*(timed(vts, i, latencies) for i in range(REQUESTS)))
+        concurrent = REQUESTS / (perf_counter() - start)
+        lat = np.array(latencies) * 1000
+        print(f"serial     {serial:8.1f} req/s")
+        print(f"concurrent {concurrent:8.1f} req/s, p50 {np.percentile(lat, 50):.1f} ms, "
+              f"p99 {np.percentile(lat, 99):.1f} ms, all replies matched")
+
+        # Server restart: pending requests fail, the client reconnects with the cached token
+        pending = asyncio.gather(*(vts.request("StatisticsRequest", {"n": i}) for i in range(20)),
+                                 return_exceptions=True)
+        await asyncio.sleep(0)
+        await server.drop()
+        failed = sum(isinstance(r, ConnectionError) for r in await pending)
+        start = perf_counter()
+        await vts.request("StatisticsRequest", {"n": 0})
+        print(f"reconnect  {(perf_counter() - start) * 1000:8.1f} ms, {failed} in-flight requests failed, "
+              f"{vts.reconnects} reconnect(s)")
+
+    # A new client reuses the token on disk instead of asking VTS again
+    async with VTSClient(server.url, token_file=token_file) as vts:
+        await vts.send(current_Stat)
+    print(f"token requests {server.token_requests}, auth requests {server.auth_requests}")
+    assert server.token_requests == 1
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
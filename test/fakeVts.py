@@ -0,0 +1,91 @@
+# Minimal stand-in for the VTube Studio API, for benchmarks and client checks.
+# Answers the auth handshake, echoes every other request after a random delay
+# (so replies come back out of order) and records injected parameters.
+import json
+import random
+import asyncio
+from time import perf_counter
+
+import websockets
+
+TOKEN = "fake-vts-token"
+
+
+class FakeVTS:
+    def __init__(self, host="127.0.0.1", port=0, delay=(0.0, 0.02)):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.server = None
+        self.connections = set()
+        self.token_requests = 0
+        self.auth_requests = 0
+        self.requests = 0
+        self.injected = []       # (receive time, {parameter: value})
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await websockets.serve(self.handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def drop(self):
+        """Closes every client connection, like VTS being restarted."""
+        for ws in list(self.connections):
+            await ws.close()
+
+    async def handler(self, ws):
+        self.connections.add(ws)
+        authenticated = False
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                kind = message["messageType"]
+                if kind == "AuthenticationTokenRequest":
+                    self.token_requests += 1
+                    await self.reply(ws, message, "AuthenticationTokenResponse", {"authenticationToken": TOKEN})
+                elif kind == "AuthenticationRequest":
+                    self.auth_requests += 1
+                    authenticated = message["data"].get("authenticationToken") == TOKEN
+                    await self.reply(ws, message, "AuthenticationResponse",
+                                     {"authenticated": authenticated, "reason": "" if authenticated else "bad token"})
+                elif not authenticated:
+                    await self.reply(ws, message, "APIError", {"errorID": 8, "message": "not authenticated"})
+                else:
+                    self.requests += 1
+                    if kind == "InjectParameterDataRequest":
+                        values = {p["id"]: p["value"] for p in message["data"]["parameterValues"]}
+                        self.injected.append((perf_counter(), values))
+                        await self.reply(ws, message, "InjectParameterDataResponse", {})
+                    else:
+                        # Answer in the background so later requests can overtake this one
+                        asyncio.create_task(self.delayed_reply(ws, message))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(ws)
+
+    async def delayed_reply(self, ws, message):
+        await asyncio.sleep(random.uniform(*self.delay))
+        try:
+            await self.reply(ws, message, message["messageType"].replace("Request", "Response"),
+                             {"echo": message.get("data")})
+        except websockets.ConnectionClosed:
+            pass
+
+    async def reply(self, ws, message, kind, data):
+        await ws.send(json.dumps({
+            "apiName": "VTubeStudioPublicAPI",
+            "apiVersion": "1.0",
+            "timestamp": 0,
+            "requestID": message["requestID"],
+            "messageType": kind,
+            "data": data,
+        }))